@@ -11,9 +11,10 @@ import click
 from pythonjsonlogger import jsonlogger
 
 from honeycomb import __version__
-from honeycomb.defs import DEBUG_LOG_FILE, INTEGRATIONS, SERVICES
+from honeycomb.defs import DEBUG_LOG_FILE, INTEGRATIONS, SERVICES, GITHUB_RAW
 from honeycomb.commands import commands_list
-from honeycomb.utils.config_utils import process_config
+from honeycomb.utils.cache import PluginCache, default_cache_dir, DEFAULT_CACHE_SIZE
+from honeycomb.utils.plugin_index import PluginIndex
 
 
 CONTEXT_SETTINGS = dict(
@@ -35,9 +36,17 @@ logger = logging.getLogger(__name__)
 @click.option("--config", "-c", type=click.Path(exists=True, dir_okay=False, resolve_path=True),
               help="Path to a honeycomb.yml file that provides instructions")
 @click.option("--verbose", "-v", envvar="DEBUG", is_flag=True, default=False, help="Enable verbose logging")
+@click.option("--cache-dir", default=default_cache_dir(), type=click.Path(file_okay=False), show_default=True,
+              help="Plugin download cache path, can be shared between homes")
+@click.option("--cache-size", default=DEFAULT_CACHE_SIZE, type=click.IntRange(min=0), show_default=True,
+              help="Maximum plugin cache size in MiB, least recently used plugins are evicted")
+@click.option("--no-cache", is_flag=True, default=False, help="Do not use the plugin cache")
+@click.option("--offline", is_flag=True, default=False, help="Install plugins from the plugin cache only")
+@click.option("--repo", help="Plugin repository URL or local mirror path (see `honeycomb repo mirror`) "
+                             "[default: {}]".format(GITHUB_RAW))
 @click.pass_context
 @click.version_option(version=__version__, message="Honeycomb, version %(version)s")
-def cli(ctx, home, iamroot, config, verbose):
+def cli(ctx, home, iamroot, config, verbose, cache_dir, cache_size, no_cache, offline, repo):
     """Honeycomb is a honeypot framework."""
     _mkhome(home)
     setup_logging(home, verbose)
@@ -59,10 +68,16 @@ def cli(ctx, home, iamroot, config, verbose):
         logger.warn("running as root!")
 
     ctx.obj["HOME"] = home
+    ctx.obj["INDEX"] = PluginIndex(home)
+    ctx.obj["REPO"] = repo
+    if no_cache and offline:
+        raise click.BadParameter("cannot install plugins offline without the plugin cache", param_hint="--offline")
+    ctx.obj["CACHE"] = None if no_cache else PluginCache(cache_dir, cache_size * 1024 * 1024, offline)
 
     logger.debug("ctx: {}".format(ctx.obj))
 
     if config:
+        from honeycomb.utils.config_utils import process_config
         return process_config(ctx, config)
 
 
@@ -1,13 +1,23 @@
 # -*- coding: utf-8 -*-
-"""Honeycomb commands."""
+"""Honeycomb commands.
+
+Command groups and their commands are listed in :mod:`honeycomb.commands._manifest` so the CLI can be built and
+its help shown without walking the commands folder or importing any command. A command module is only imported
+when the command runs. The manifest is generated with ``python -m honeycomb.commands`` after adding, removing or
+renaming a command (a test checks it is up to date).
+"""
 
 import os
+import json
 import importlib
 
 import click
 
+from honeycomb.commands._manifest import GROUPS, COMMANDS
+
 commands_list = {}
 cwd = os.path.dirname(__file__)
+MANIFEST_PATH = os.path.join(cwd, "_manifest.py")
 
 
 class MyGroup(click.Group):
@@ -25,26 +35,65 @@ class MyGroup(click.Group):
         self.name = folder
 
     def list_commands(self, ctx):
-        """List commands from folder."""
-        rv = []
-        files = [_ for _ in next(os.walk(self.folder))[2] if not _.startswith("_") and _.endswith(".py")]
-        for filename in files:
-            rv.append(filename[:-3])
-        rv.sort()
-        return rv
+        """List commands from the manifest."""
+        return sorted(COMMANDS[self.name])
 
     def get_command(self, ctx, name):
-        """Fetch command from folder."""
-        plugin = os.path.basename(self.folder)
+        """Import a command from folder."""
         try:
-            command = importlib.import_module("honeycomb.commands.{}.{}".format(plugin, name))
+            command = importlib.import_module("honeycomb.commands.{}.{}".format(self.name, name))
         except ImportError:
-            raise click.UsageError("No such command {} {}\n\n{}".format(plugin, name, self.get_help(ctx)))
+            if os.path.exists(os.path.join(self.folder, "{}.py".format(name))):
+                raise  # the command exists, something it imports is missing
+            raise click.UsageError("No such command {} {}\n\n{}".format(self.name, name, self.get_help(ctx)))
         return getattr(command, name)
 
+    def format_commands(self, ctx, formatter):
+        """List commands with their short help from the manifest, without importing them."""
+        rows = [(name, COMMANDS[self.name][name]) for name in self.list_commands(ctx)]
+        if rows:
+            with formatter.section("Commands"):
+                formatter.write_dl(rows)
+
+
+def build_manifest():
+    """Walk the commands folder and import every command, return the groups and commands for the manifest.
+
+    :returns: Tuple of {group: help} and {group: {command: short help}}
+    """
+    groups = {}
+    commands = {}
+    for group in next(os.walk(os.path.realpath(cwd)))[1]:
+        if group.startswith("_"):
+            continue
+        groups[group] = importlib.import_module("honeycomb.commands.{}".format(group)).__doc__
+        commands[group] = {}
+        for filename in next(os.walk(os.path.join(cwd, group)))[2]:
+            if filename.startswith("_") or not filename.endswith(".py"):
+                continue
+            name = filename[:-3]
+            command = getattr(importlib.import_module("honeycomb.commands.{}.{}".format(group, name)), name)
+            commands[group][name] = command.short_help or command.help.split("\n")[0]
+    return groups, commands
+
+
+def write_manifest(path=MANIFEST_PATH):
+    """Write :func:`build_manifest` to :mod:`honeycomb.commands._manifest`."""
+    groups, commands = build_manifest()
+    lines = ["# -*- coding: utf-8 -*-",
+             '"""Honeycomb command manifest, generated by ``python -m honeycomb.commands``. Do not edit."""',
+             "", "GROUPS = {"]
+    lines.extend("    {}: {},".format(json.dumps(group), json.dumps(groups[group])) for group in sorted(groups))
+    lines.extend(["}", "", "COMMANDS = {"])
+    for group in sorted(commands):
+        lines.append("    {}: {{".format(json.dumps(group)))
+        lines.extend("        {}: {},".format(json.dumps(name), json.dumps(commands[group][name]))
+                     for name in sorted(commands[group]))
+        lines.append("    },")
+    lines.append("}")
+    with open(path, "w") as f:
+        f.write("\n".join(lines) + "\n")
+
 
-for command in [_ for _ in next(os.walk(os.path.realpath(cwd)))[1]]:
-    if command.startswith("_"):
-        continue
-    command_module = "honeycomb.commands.{}".format(command)
-    commands_list[command] = MyGroup(folder=command, help=importlib.import_module(command_module).__doc__)
+for command in GROUPS:
+    commands_list[command] = MyGroup(folder=command, help=GROUPS[command])
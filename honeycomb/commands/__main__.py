@@ -0,0 +1,12 @@
+# -*- coding: utf-8 -*-
+"""Regenerate the command manifest.
+
+.. code-block:: bash
+    $ python -m honeycomb.commands
+"""
+
+from honeycomb.commands import MANIFEST_PATH, write_manifest
+
+if __name__ == "__main__":
+    write_manifest()
+    print("wrote {}".format(MANIFEST_PATH))
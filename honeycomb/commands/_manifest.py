@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+"""Honeycomb command manifest, generated by ``python -m honeycomb.commands``. Do not edit."""
+
+GROUPS = {
+    "bundle": "Honeycomb offline deployment bundle commands.",
+    "integration": "Honeycomb integration commands.",
+    "repo": "Honeycomb plugin repository commands.",
+    "service": "Honeycomb service commands.",
+    "supervisor": "Honeycomb service supervisor (honeycombd) commands.",
+}
+
+COMMANDS = {
+    "bundle": {
+        "create": "Pack installed plugins into an offline bundle",
+        "load": "Install the plugins of an offline bundle",
+    },
+    "integration": {
+        "configure": "Configure an integration with default parameters",
+        "install": "Install an integration",
+        "list": "List available integrations",
+        "show": "Show detailed information about a integration",
+        "test": "Test an integration",
+        "uninstall": "Uninstall an integration",
+        "upgrade": "Upgrade an integration",
+    },
+    "repo": {
+        "mirror": "Sync a local mirror of the plugin repository",
+    },
+    "service": {
+        "install": "Install a service",
+        "list": "List available services",
+        "logs": "Show logs for a daemonized service.",
+        "restart": "Restart a service run by honeycombd",
+        "run": "Load and run a specific service",
+        "show": "Show detailed information about a service",
+        "status": "Shows status of installed service(s)",
+        "stop": "Stop a running service daemon",
+        "test": "Test a running service",
+        "uninstall": "Uninstall a service",
+        "upgrade": "Upgrade a service",
+    },
+    "supervisor": {
+        "start": "Start honeycombd, the service supervisor",
+        "status": "Show honeycombd and its services with their resource usage",
+        "stop": "Stop honeycombd and its services",
+    },
+}
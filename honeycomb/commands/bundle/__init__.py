@@ -0,0 +1 @@
+"""Honeycomb offline deployment bundle commands."""
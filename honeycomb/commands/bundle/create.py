@@ -0,0 +1,27 @@
+# -*- coding: utf-8 -*-
+"""Honeycomb bundle create command."""
+
+import logging
+
+import click
+
+from honeycomb.utils import bundle
+
+logger = logging.getLogger(__name__)
+
+
+@click.command(short_help="Pack installed plugins into an offline bundle")
+@click.pass_context
+@click.argument("path", type=click.Path(dir_okay=False))
+@click.option("-s", "--service", "services", multiple=True, help="Service to bundle (default: all installed)")
+@click.option("-i", "--integration", "integrations", multiple=True,
+              help="Integration to bundle (default: all installed)")
+@click.option("-y", "--yml", type=click.Path(exists=True, dir_okay=False),
+              help="honeycomb.yml to include in the bundle")
+def create(ctx, path, services, integrations, yml):
+    """Pack installed plugins with their dependencies and arguments into PATH, install it with `bundle load`."""
+    logger.debug("running command %s (%s)", ctx.command.name, ctx.params,
+                 extra={"command": ctx.command.name, "params": ctx.params})
+
+    sha256sum, files = bundle.create_bundle(ctx.obj["HOME"], path, services or None, integrations or None, yml)
+    click.secho("[+] Bundled {} files into {} (sha256 {})".format(files, path, sha256sum))
@@ -0,0 +1,26 @@
+# -*- coding: utf-8 -*-
+"""Honeycomb bundle load command."""
+
+import logging
+
+import click
+
+from honeycomb.utils import bundle
+
+logger = logging.getLogger(__name__)
+
+
+@click.command(short_help="Install the plugins of an offline bundle")
+@click.pass_context
+@click.argument("path", type=click.Path(exists=True, dir_okay=False))
+@click.option("--sha256", help="Expected SHA-256 of the bundle (default: read from PATH.sha256 if it exists)")
+@click.option("-f", "--force", is_flag=True, default=False, help="Replace plugins that are already installed")
+def load(ctx, path, sha256, force):
+    """Install the plugins of a bundle created with `bundle create`, without network access or pip."""
+    logger.debug("running command %s (%s)", ctx.command.name, ctx.params,
+                 extra={"command": ctx.command.name, "params": ctx.params})
+
+    services, integrations, yml = bundle.load_bundle(path, ctx.obj["HOME"], sha256, force)
+    click.secho("[+] Loaded {} services and {} integrations".format(len(services), len(integrations)))
+    if yml:
+        click.secho("[*] Start them with `honeycomb --home {} --config {}`".format(ctx.obj["HOME"], yml))
@@ -33,7 +33,7 @@ def configure(ctx, integration, args, show_args, editable):
                  extra={"command": ctx.command.name, "params": ctx.params})
 
     logger.debug("loading {} ({})".format(integration, integration_path))
-    integration = register_integration(integration_path)
+    integration = register_integration(integration_path, ctx.obj["INDEX"])
 
     if show_args:
         return plugin_utils.print_plugin_args(integration_path)
@@ -2,12 +2,10 @@
 """Honeycomb integration install command."""
 
 import os
-import errno
 import logging
 
 import click
 
-from honeycomb import exceptions
 from honeycomb.defs import INTEGRATION, INTEGRATIONS
 from honeycomb.utils import plugin_utils
 from honeycomb.integrationmanager.registration import register_integration
@@ -18,7 +16,15 @@ logger = logging.getLogger(__name__)
 @click.command(short_help="Install an integration")
 @click.pass_context
 @click.argument("integrations", nargs=-1)
-def install(ctx, integrations, delete_after_install=False):
+@click.option("-j", "--jobs", type=click.IntRange(min=1), default=plugin_utils.DEFAULT_INSTALL_JOBS, show_default=True,
+              help="Number of integrations to install in parallel")
+@click.option("-e", "--editable", is_flag=True, default=False,
+              help="Symlink plugin folders instead of copying them (mainly for dev)")
+@click.option("--bytecode", type=click.Choice(plugin_utils.BYTECODE_MODES), default=plugin_utils.BYTECODE_TIMESTAMP,
+              show_default=True, help="Precompile plugin and dependency modules at install time")
+@click.option("--zip-deps", is_flag=True, default=False,
+              help="Pack pure python dependencies into a zip imported with zipimport")
+def install(ctx, integrations, jobs, editable, bytecode, zip_deps, delete_after_install=False):
     """Install a honeycomb integration from the online library, local path or zipfile."""
     logger.debug("running command %s (%s)", ctx.command.name, ctx.params,
                  extra={"command": ctx.command.name, "params": ctx.params})
@@ -26,13 +32,7 @@ def install(ctx, integrations, delete_after_install=False):
     home = ctx.obj["HOME"]
     integrations_path = os.path.join(home, INTEGRATIONS)
 
-    installed_all_plugins = True
-    for integration in integrations:
-        try:
-            plugin_utils.install_plugin(integration, INTEGRATION, integrations_path, register_integration)
-        except exceptions.PluginAlreadyInstalled as exc:
-            click.echo(exc)
-            installed_all_plugins = False
-
-    if not installed_all_plugins:
-        raise ctx.exit(errno.EEXIST)
+    errors = plugin_utils.install_plugins(integrations, INTEGRATION, integrations_path, register_integration,
+                                          ctx.obj["CACHE"], jobs, editable=editable, bytecode=bytecode,
+                                          pack_deps=zip_deps, repo=ctx.obj["REPO"])
+    plugin_utils.raise_install_errors(ctx, errors)
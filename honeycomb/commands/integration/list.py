@@ -29,7 +29,7 @@ def list(ctx, remote):
 
     def get_integration_details(integration_name):
         logger.debug("loading {}".format(integration_name))
-        integration = register_integration(os.path.join(integrations_path, integration_name))
+        integration = register_integration(os.path.join(integrations_path, integration_name), ctx.obj["INDEX"])
         supported_event_types = integration.supported_event_types
         if not supported_event_types:
             supported_event_types = "All"
@@ -37,10 +37,11 @@ def list(ctx, remote):
         return "{:s} ({:s}) [Supported event types: {}]".format(integration.name, integration.description,
                                                                 supported_event_types)
 
-    installed_integrations = list_local_plugins(plugin_type, integrations_path, get_integration_details)
+    with ctx.obj["INDEX"].batch():
+        installed_integrations = list_local_plugins(plugin_type, integrations_path, get_integration_details)
 
     if remote:
-        list_remote_plugins(installed_integrations, plugin_type)
+        list_remote_plugins(installed_integrations, plugin_type, ctx.obj["CACHE"], ctx.obj["REPO"])
     else:
         click.secho("\n[*] Try running `honeycomb integrations list -r` "
                     "to see integrations available from our repository")
@@ -31,7 +31,7 @@ def test(ctx, integrations, editable):
         integration_path = plugin_utils.get_plugin_path(home, INTEGRATIONS, integration, editable)
 
         logger.debug("loading {} ({})".format(integration, integration_path))
-        integration = register_integration(integration_path)
+        integration = register_integration(integration_path, ctx.obj["INDEX"])
         integration_module = get_integration_module(integration_path)
 
         if not integration.test_connection_enabled:
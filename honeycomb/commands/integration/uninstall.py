@@ -25,3 +25,7 @@ def uninstall(ctx, yes, integrations):
     for integration in integrations:
         integration_path = plugin_utils.get_plugin_path(home, INTEGRATIONS, integration)
         plugin_utils.uninstall_plugin(integration_path, yes)
+
+    if ctx.obj["CACHE"]:
+        # drop dependency files no other plugin shares
+        ctx.obj["CACHE"].prune_store()
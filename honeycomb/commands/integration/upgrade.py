@@ -0,0 +1,36 @@
+# -*- coding: utf-8 -*-
+"""Honeycomb integration upgrade command."""
+
+import os
+import logging
+
+import click
+
+from honeycomb.defs import INTEGRATION, INTEGRATIONS
+from honeycomb.utils import plugin_utils
+from honeycomb.integrationmanager.registration import register_integration
+
+logger = logging.getLogger(__name__)
+
+
+@click.command(short_help="Upgrade an integration")
+@click.pass_context
+@click.argument("integrations", nargs=-1)
+@click.option("--bytecode", type=click.Choice(plugin_utils.BYTECODE_MODES), default=plugin_utils.BYTECODE_TIMESTAMP,
+              show_default=True, help="Precompile plugin and dependency modules at install time")
+@click.option("--zip-deps", is_flag=True, default=False,
+              help="Pack pure python dependencies into a zip imported with zipimport")
+def upgrade(ctx, integrations, bytecode, zip_deps):
+    """Upgrade installed honeycomb integrations from the online library, local path or zipfile.
+
+    Only files that changed are copied and dependencies are only reinstalled if requirements.txt changed.
+    """
+    logger.debug("running command %s (%s)", ctx.command.name, ctx.params,
+                 extra={"command": ctx.command.name, "params": ctx.params})
+
+    home = ctx.obj["HOME"]
+    integrations_path = os.path.join(home, INTEGRATIONS)
+
+    for integration in integrations:
+        plugin_utils.upgrade_plugin(integration, INTEGRATION, integrations_path, register_integration, ctx.obj["CACHE"],
+                                    bytecode=bytecode, pack_deps=zip_deps, repo=ctx.obj["REPO"])
@@ -0,0 +1 @@
+"""Honeycomb plugin repository commands."""
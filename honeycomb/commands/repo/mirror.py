@@ -0,0 +1,27 @@
+# -*- coding: utf-8 -*-
+"""Honeycomb repo mirror command."""
+
+import logging
+
+import click
+
+from honeycomb.utils import repo as repo_utils
+
+logger = logging.getLogger(__name__)
+
+
+@click.command(short_help="Sync a local mirror of the plugin repository")
+@click.pass_context
+@click.argument("path", type=click.Path(file_okay=False))
+@click.option("-j", "--jobs", type=click.IntRange(min=1), default=repo_utils.MIRROR_JOBS, show_default=True,
+              help="Number of plugins to download in parallel")
+def mirror(ctx, path, jobs):
+    """Download (or update) every plugin of the repository into PATH, install from it with `--repo PATH`."""
+    logger.debug("running command %s (%s)", ctx.command.name, ctx.params,
+                 extra={"command": ctx.command.name, "params": ctx.params})
+
+    click.secho("[*] Mirroring {} to {}".format(repo_utils.get_repo_url(ctx.obj["REPO"]), path))
+    downloaded, current, failed = repo_utils.mirror(path, ctx.obj["REPO"], jobs)
+    click.secho("[+] {} plugins downloaded, {} up to date".format(len(downloaded), len(current)))
+    if failed:
+        raise click.ClickException("Failed mirroring {}".format(", ".join(failed)))
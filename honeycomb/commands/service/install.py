@@ -2,23 +2,45 @@
 """Honeycomb service install command."""
 
 import os
-import errno
 import logging
 
 import click
 
-from honeycomb import exceptions
 from honeycomb.defs import SERVICE, SERVICES
 from honeycomb.utils import plugin_utils
-from honeycomb.servicemanager.registration import register_service
+from honeycomb.servicemanager.base_service import DockerService
+from honeycomb.servicemanager.registration import register_service, get_service_module
 
 logger = logging.getLogger(__name__)
 
 
+def pull_service_image(service_path):
+    """Pull the image of a docker service so its first run does not wait for it, failures are not fatal."""
+    try:
+        service_class = get_service_module(service_path).service_class
+        if not issubclass(service_class, DockerService):
+            return
+        service = service_class(alert_types=[])
+        click.secho("[*] Pulling {}".format(service.docker_image_name))
+        service.pull_image()
+    except Exception as exc:
+        logger.debug(str(exc), exc_info=True)
+        click.secho("[-] Could not pull the image of {}, it will be pulled when the service runs".format(
+            os.path.basename(service_path)))
+
+
 @click.command(short_help="Install a service")
 @click.pass_context
 @click.argument("services", nargs=-1)
-def install(ctx, services, delete_after_install=False):
+@click.option("-j", "--jobs", type=click.IntRange(min=1), default=plugin_utils.DEFAULT_INSTALL_JOBS, show_default=True,
+              help="Number of services to install in parallel")
+@click.option("-e", "--editable", is_flag=True, default=False,
+              help="Symlink plugin folders instead of copying them (mainly for dev)")
+@click.option("--bytecode", type=click.Choice(plugin_utils.BYTECODE_MODES), default=plugin_utils.BYTECODE_TIMESTAMP,
+              show_default=True, help="Precompile plugin and dependency modules at install time")
+@click.option("--zip-deps", is_flag=True, default=False,
+              help="Pack pure python dependencies into a zip imported with zipimport")
+def install(ctx, services, jobs, editable, bytecode, zip_deps, delete_after_install=False):
     """Install a honeypot service from the online library, local path or zipfile."""
     logger.debug("running command %s (%s)", ctx.command.name, ctx.params,
                  extra={"command": ctx.command.name, "params": ctx.params})
@@ -26,13 +48,7 @@ def install(ctx, services, delete_after_install=False):
     home = ctx.obj["HOME"]
     services_path = os.path.join(home, SERVICES)
 
-    installed_all_plugins = True
-    for service in services:
-        try:
-            plugin_utils.install_plugin(service, SERVICE, services_path, register_service)
-        except exceptions.PluginAlreadyInstalled as exc:
-            click.echo(exc)
-            installed_all_plugins = False
-
-    if not installed_all_plugins:
-        raise ctx.exit(errno.EEXIST)
+    errors = plugin_utils.install_plugins(services, SERVICE, services_path, register_service, ctx.obj["CACHE"], jobs,
+                                          post_install=pull_service_image, editable=editable, bytecode=bytecode,
+                                          pack_deps=zip_deps, repo=ctx.obj["REPO"])
+    plugin_utils.raise_install_errors(ctx, errors)
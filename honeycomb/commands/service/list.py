@@ -29,7 +29,7 @@ def list(ctx, remote):
 
     def get_service_details(service_name):
         logger.debug("loading {}".format(service_name))
-        service = register_service(os.path.join(services_path, service_name))
+        service = register_service(os.path.join(services_path, service_name), ctx.obj["INDEX"])
         if service.ports:
             ports = ", ".join("{}/{}".format(port["port"], port["protocol"]) for port in service.ports)
         else:
@@ -37,10 +37,11 @@ def list(ctx, remote):
         return "{:s} (Ports: {}) [Alerts: {}]".format(service.name, ports,
                                                       ", ".join([_.name for _ in service.alert_types]))
 
-    installed_services = list_local_plugins(plugin_type, services_path, get_service_details)
+    with ctx.obj["INDEX"].batch():
+        installed_services = list_local_plugins(plugin_type, services_path, get_service_details)
 
     if remote:
-        list_remote_plugins(installed_services, plugin_type)
+        list_remote_plugins(installed_services, plugin_type, ctx.obj["CACHE"], ctx.obj["REPO"])
     else:
         click.secho("\n[*] Try running `honeycomb services list -r` "
                     "to see services available from our repository")
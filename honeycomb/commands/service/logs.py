@@ -3,23 +3,28 @@
 
 import os
 import logging
-import threading
 
 import click
 
 from honeycomb.defs import SERVICES
-from honeycomb.utils.tailer import Tailer
+from honeycomb.utils.tailer import MultiTailer
 from honeycomb.servicemanager.defs import STDOUTLOG, LOGS_DIR
 
 logger = logging.getLogger(__name__)
 
+TIME_FORMATS = ["%Y-%m-%d %H:%M:%S", "%Y-%m-%dT%H:%M:%S", "%Y-%m-%d %H:%M", "%Y-%m-%d"]
+
 
 @click.command(short_help="Show logs for a daemonized service.")
 @click.option("-n", "--num", type=int, default=10, help="Number of lines to read from end of file", show_default=True)
 @click.option("-f", "--follow", is_flag=True, default=False, help="Follow log output")
+@click.option("-s", "--since", type=click.DateTime(formats=TIME_FORMATS),
+              help="Show lines logged since this time (ignores --num)")
+@click.option("-u", "--until", type=click.DateTime(formats=TIME_FORMATS),
+              help="Show lines logged up to this time (ignores --num)")
 @click.argument("services", required=True, nargs=-1)
 @click.pass_context
-def logs(ctx, services, num, follow):
+def logs(ctx, services, num, follow, since, until):
     """Show logs of daemonized service."""
     logger.debug("running command %s (%s)", ctx.command.name, ctx.params,
                  extra={"command": ctx.command.name, "params": ctx.params})
@@ -27,20 +32,16 @@ def logs(ctx, services, num, follow):
     home = ctx.obj["HOME"]
     services_path = os.path.join(home, SERVICES)
 
-    tail_threads = []
+    logpaths = {}
     for service in services:
         logpath = os.path.join(services_path, service, LOGS_DIR, STDOUTLOG)
         if os.path.exists(logpath):
             logger.debug("tailing %s", logpath)
-            # TODO: Print log lines from multiple services sorted by timestamp
-            t = threading.Thread(target=Tailer, kwargs={"name": service,
-                                                        "nlines": num,
-                                                        "filepath": logpath,
-                                                        "follow": follow})
-            t.daemon = True
-            t.start()
-            tail_threads.append(t)
-
-    if tail_threads:
-        while tail_threads[0].isAlive():
-            tail_threads[0].join(0.1)
+            logpaths[service] = logpath
+
+    if logpaths:
+        tailer = MultiTailer(filepaths=logpaths, nlines=num, follow=follow, since=since, until=until)
+        try:
+            tailer.run()
+        except KeyboardInterrupt:
+            tailer.stop()
@@ -0,0 +1,30 @@
+# -*- coding: utf-8 -*-
+"""Honeycomb service restart command."""
+
+import os
+import logging
+
+import click
+
+from honeycomb.defs import SERVICES
+from honeycomb.utils import plugin_utils
+from honeycomb.servicemanager.supervisor import SupervisorClient
+
+logger = logging.getLogger(__name__)
+
+
+@click.command(short_help="Restart a service run by honeycombd")
+@click.argument("services", required=True, nargs=-1)
+@click.option("-e", "--editable", is_flag=True, default=False,
+              help="Load service directly from specified path without installing (mainly for dev)")
+@click.pass_context
+def restart(ctx, services, editable):
+    """Restart services run by honeycombd with the same arguments, without loading them again."""
+    logger.debug("running command %s (%s)", ctx.command.name, ctx.params,
+                 extra={"command": ctx.command.name, "params": ctx.params})
+
+    supervisor = SupervisorClient(ctx.obj["HOME"])
+    for service in services:
+        name = os.path.basename(plugin_utils.get_plugin_path(ctx.obj["HOME"], SERVICES, service, editable))
+        info = supervisor.call("restart", service=name)
+        click.secho("[+] Restarted {} (pid: {})".format(name, info["pid"]))
@@ -10,10 +10,10 @@ import click
 
 from honeycomb.defs import SERVICES, INTEGRATIONS, ARGS_JSON
 from honeycomb.utils import plugin_utils, config_utils
-from honeycomb.utils.daemon import myRunner
 from honeycomb.integrationmanager.tasks import configure_integration
 from honeycomb.servicemanager.defs import STDOUTLOG, STDERRLOG, LOGS_DIR
 from honeycomb.servicemanager.registration import register_service, get_service_module
+from honeycomb.servicemanager.supervisor import get_supervisor
 
 logger = logging.getLogger(__name__)
 
@@ -27,7 +27,11 @@ logger = logging.getLogger(__name__)
               help="Load service directly from specified path without installing (mainly for dev)")
 @click.option("-a", "--show-args", is_flag=True, default=False, help="Show available service arguments")
 @click.option("-i", "--integration", multiple=True, help="Enable an integration")
-def run(ctx, service, args, show_args, daemon, editable, integration):
+@click.option("-k", "--keep-container", is_flag=True, default=False,
+              help="Keep the service container when stopped and restart it on the next run (docker services)")
+@click.option("-r", "--replicas", type=click.IntRange(min=1), default=1,
+              help="Number of containers to run, on consecutive host port ranges (docker services)")
+def run(ctx, service, args, show_args, daemon, editable, integration, keep_container, replicas):
     """Load and run a specific service."""
     home = ctx.obj["HOME"]
     service_path = plugin_utils.get_plugin_path(home, SERVICES, service, editable)
@@ -37,21 +41,42 @@ def run(ctx, service, args, show_args, daemon, editable, integration):
                  extra={"command": ctx.command.name, "params": ctx.params})
 
     logger.debug("loading {} ({})".format(service, service_path))
-    service = register_service(service_path)
+    service = register_service(service_path, ctx.obj["INDEX"])
 
     if show_args:
         return plugin_utils.print_plugin_args(service_path)
 
+    supervisor = get_supervisor(home) if daemon else None
+    if supervisor:
+        options = {}
+        if keep_container:
+            options["keep_container"] = True
+        if replicas > 1:
+            options["replicas"] = replicas
+        info = supervisor.call("start", service=service_path if editable else service.name, args=list(args),
+                               integrations=[plugin_utils.get_plugin_path(home, INTEGRATIONS, _, editable)
+                                             if editable else _ for _ in integration],
+                               editable=editable, options=options)
+        click.secho("[+] Launched {} under honeycombd (pid: {})".format(service.name, info["pid"]))
+        return
+
     # get our service class instance
     service_module = get_service_module(service_path)
     service_args = plugin_utils.parse_plugin_args(args, config_utils.get_config_parameters(service_path))
-    service_obj = service_module.service_class(alert_types=service.alert_types, service_args=service_args)
+    service_obj = service_module.service_class(alert_types=service.alert_types, service_args=service_args,
+                                               log_rules=service.log_rules)
+    if keep_container:
+        service_obj.keep_container = True
+    if replicas > 1:
+        service_obj.replicas = replicas
 
     if not os.path.exists(service_log_path):
         os.mkdir(service_log_path)
 
     # prepare runner
     if daemon:
+        from honeycomb.utils.daemon import myRunner  # python-daemon is only needed to daemonize
+
         runner = myRunner(service_obj,
                           pidfile=service_path + ".pid",
                           stdout=open(os.path.join(service_log_path, STDOUTLOG), "ab"),
@@ -6,10 +6,11 @@ import logging
 
 import click
 import requests
-from requests.adapters import HTTPAdapter
 
 from honeycomb import defs
 from honeycomb.utils import plugin_utils
+from honeycomb.utils.catalog import get_plugin_info
+from honeycomb.utils.repo import get_session, get_repo_url, plugin_location
 from honeycomb.servicemanager.registration import register_service
 
 PKG_INFO_TEMPLATE = """Name: {name}
@@ -36,7 +37,7 @@ def show(ctx, service, remote):
 
     def collect_local_info(service, service_path):
         logger.debug("loading {} from {}".format(service, service_path))
-        service = register_service(service_path)
+        service = register_service(service_path, ctx.obj["INDEX"])
         try:
             with open(os.path.join(service_path, "requirements.txt"), "r") as fh:
                 info["requirements"] = " ".join(fh.readlines())
@@ -49,8 +50,22 @@ def show(ctx, service, remote):
         return info
 
     def collect_remote_info(service):
-        rsession = requests.Session()
-        rsession.mount("https://", HTTPAdapter(max_retries=3))
+        repo = ctx.obj["REPO"]
+        entry = get_plugin_info(defs.SERVICES, service, ctx.obj["CACHE"], repo=repo)
+        if entry is not None:
+            logger.debug("found %s in remote catalog", service)
+            info["name"] = service
+            info["label"] = entry.get(defs.LABEL, "")
+            info["location"] = plugin_location(defs.SERVICE, service, repo)
+            info["commit_revision"] = entry.get("version", info["commit_revision"])
+            info["commit_date"] = entry.get("updated", info["commit_date"])
+            info["requirements"] = " ".join(entry.get("requirements", [])) or "None"
+            return info
+
+        if get_repo_url(repo) != get_repo_url(defs.GITHUB_RAW):
+            # other repositories only have to publish the zips, the plugin folders are on github
+            raise click.ClickException("Cannot find package {} in the repository catalog".format(service))
+        rsession = get_session()
 
         try:
             r = rsession.get(defs.GITHUB_RAW_URL.format(plugin_type=defs.SERVICES,
@@ -7,6 +7,7 @@ import logging
 import click
 
 from honeycomb.defs import SERVICES
+from honeycomb.servicemanager.supervisor import get_supervisor
 
 logger = logging.getLogger(__name__)
 
@@ -22,10 +23,16 @@ def status(ctx, services, show_all):
 
     home = ctx.obj["HOME"]
     services_path = os.path.join(home, SERVICES)
+    supervisor = get_supervisor(home)
+    supervised = supervisor.call("status") if supervisor else {}
 
     def print_status(service):
         service_dir = os.path.join(services_path, service)
-        if os.path.exists(service_dir):
+        if supervised.get(service, {}).get("active"):
+            info = supervised[service]
+            status = "{} (pid: {}, honeycombd)".format(info["status"], info["pid"]) if info["running"] else \
+                "{} (honeycombd)".format(info["status"])
+        elif os.path.exists(service_dir):
             pidfile = service_dir + ".pid"
             if os.path.exists(pidfile):
                 try:
@@ -43,7 +50,8 @@ def status(ctx, services, show_all):
 
     if show_all:
         for service in next(os.walk(services_path))[1]:
-            print_status(service)
+            if not service.startswith("."):  # skip staging folders of installs in progress
+                print_status(service)
     elif services:
         for service in services:
             print_status(service)
@@ -6,12 +6,11 @@ import json
 import logging
 
 import click
-import daemon.runner
 
 from honeycomb.defs import SERVICES, ARGS_JSON
 from honeycomb.utils import plugin_utils
-from honeycomb.utils.daemon import myRunner
 from honeycomb.servicemanager.registration import get_service_module, register_service
+from honeycomb.servicemanager.supervisor import get_supervisor
 
 logger = logging.getLogger(__name__)
 
@@ -29,8 +28,18 @@ def stop(ctx, service, editable):
     home = ctx.obj["HOME"]
     service_path = plugin_utils.get_plugin_path(home, SERVICES, service, editable)
 
+    supervisor = get_supervisor(home)
+    name = os.path.basename(service_path)
+    if supervisor and supervisor.call("status", services=[name]).get(name, {}).get("active"):
+        click.secho("[*] Stopping {}".format(name))
+        supervisor.call("stop", service=name)
+        return
+
+    import daemon.runner
+    from honeycomb.utils.daemon import myRunner
+
     logger.debug("loading {}".format(service))
-    service = register_service(service_path)
+    service = register_service(service_path, ctx.obj["INDEX"])
 
     try:
         with open(os.path.join(service_path, ARGS_JSON)) as f:
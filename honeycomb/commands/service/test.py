@@ -13,6 +13,7 @@ from honeycomb.utils import plugin_utils
 from honeycomb.utils.wait import wait_until, search_json_log, TimeoutException
 from honeycomb.servicemanager.defs import EVENT_TYPE
 from honeycomb.servicemanager.registration import register_service, get_service_module
+from honeycomb.servicemanager.supervisor import get_supervisor
 
 logger = logging.getLogger(__name__)
 
@@ -32,44 +33,24 @@ def test(ctx, services, force, editable):
                  extra={"command": ctx.command.name, "params": ctx.params})
 
     home = ctx.obj["HOME"]
+    supervisor = get_supervisor(home)
+    supervised = supervisor.call("status") if supervisor else {}
 
     for service in services:
         service_path = plugin_utils.get_plugin_path(home, SERVICES, service, editable)
 
         logger.debug("loading {} ({})".format(service, service_path))
-        service = register_service(service_path)
-        service_module = get_service_module(service_path)
-
-        if not force:
-            if os.path.exists(service_path):
-                pidfile = service_path + ".pid"
-                if os.path.exists(pidfile):
-                    try:
-                        with open(pidfile) as fh:
-                            pid = int(fh.read().strip())
-                        os.kill(pid, 0)
-                        logger.debug("service is running (pid: {})".format(pid))
-                    except OSError:
-                        logger.debug("service is not running (stale pidfile, pid: {})".format(pid), exc_info=True)
-                        raise click.ClickException("Unable to test {} because it is not running".format(service.name))
-                else:
-                    logger.debug("service is not running (no pidfile)")
-                    raise click.ClickException("Unable to test {} because it is not running".format(service.name))
+        service = register_service(service_path, ctx.obj["INDEX"])
+
+        name = os.path.basename(service_path)
+        if supervised.get(name, {}).get("running"):
+            # honeycombd already has the service module and arguments
+            logger.debug("testing service with honeycombd")
+            event_types = supervisor.call("test", service=name)
+        else:
+            event_types = _test_service(service, service_path, force)
 
-        try:
-            with open(os.path.join(service_path, ARGS_JSON)) as f:
-                service_args = json.loads(f.read())
-        except IOError as exc:
-            logger.debug(str(exc), exc_info=True)
-            raise click.ClickException("Cannot load service args, are you sure server is running?")
-        logger.debug("loading service {} with args {}".format(service, service_args))
-        service_obj = service_module.service_class(alert_types=service.alert_types, service_args=service_args)
-        logger.debug("loaded service {}".format(service_obj))
-
-        if hasattr(service_obj, "test"):
-            click.secho("[+] Executing internal test method for service..")
-            logger.debug("executing internal test method for service")
-            event_types = service_obj.test()
+        if event_types is not None:
             for event_type in event_types:
                 try:
                     wait_until(search_json_log, filepath=os.path.join(home, DEBUG_LOG_FILE),
@@ -91,3 +72,40 @@ def test(ctx, services, force, editable):
                 except Exception as exc:
                     logger.debug(str(exc), exc_info=True)
                     raise click.ClickException("Unable to connect to service port {}".format(port["port"]))
+
+
+def _test_service(service, service_path, force):
+    """Load a service run without honeycombd and execute its test method, return None if it has none."""
+    service_module = get_service_module(service_path)
+
+    if not force:
+        if os.path.exists(service_path):
+            pidfile = service_path + ".pid"
+            if os.path.exists(pidfile):
+                try:
+                    with open(pidfile) as fh:
+                        pid = int(fh.read().strip())
+                    os.kill(pid, 0)
+                    logger.debug("service is running (pid: {})".format(pid))
+                except OSError:
+                    logger.debug("service is not running (stale pidfile, pid: {})".format(pid), exc_info=True)
+                    raise click.ClickException("Unable to test {} because it is not running".format(service.name))
+            else:
+                logger.debug("service is not running (no pidfile)")
+                raise click.ClickException("Unable to test {} because it is not running".format(service.name))
+
+    try:
+        with open(os.path.join(service_path, ARGS_JSON)) as f:
+            service_args = json.loads(f.read())
+    except IOError as exc:
+        logger.debug(str(exc), exc_info=True)
+        raise click.ClickException("Cannot load service args, are you sure server is running?")
+    logger.debug("loading service {} with args {}".format(service, service_args))
+    service_obj = service_module.service_class(alert_types=service.alert_types, service_args=service_args)
+    logger.debug("loaded service {}".format(service_obj))
+
+    if hasattr(service_obj, "test"):
+        click.secho("[+] Executing internal test method for service..")
+        logger.debug("executing internal test method for service")
+        return service_obj.test()
+    return None
@@ -25,3 +25,7 @@ def uninstall(ctx, yes, services):
     for service in services:
         service_path = plugin_utils.get_plugin_path(home, SERVICES, service)
         plugin_utils.uninstall_plugin(service_path, yes)
+
+    if ctx.obj["CACHE"]:
+        # drop dependency files no other plugin shares
+        ctx.obj["CACHE"].prune_store()
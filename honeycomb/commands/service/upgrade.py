@@ -0,0 +1,36 @@
+# -*- coding: utf-8 -*-
+"""Honeycomb service upgrade command."""
+
+import os
+import logging
+
+import click
+
+from honeycomb.defs import SERVICE, SERVICES
+from honeycomb.utils import plugin_utils
+from honeycomb.servicemanager.registration import register_service
+
+logger = logging.getLogger(__name__)
+
+
+@click.command(short_help="Upgrade a service")
+@click.pass_context
+@click.argument("services", nargs=-1)
+@click.option("--bytecode", type=click.Choice(plugin_utils.BYTECODE_MODES), default=plugin_utils.BYTECODE_TIMESTAMP,
+              show_default=True, help="Precompile plugin and dependency modules at install time")
+@click.option("--zip-deps", is_flag=True, default=False,
+              help="Pack pure python dependencies into a zip imported with zipimport")
+def upgrade(ctx, services, bytecode, zip_deps):
+    """Upgrade installed honeypot services from the online library, local path or zipfile.
+
+    Only files that changed are copied and dependencies are only reinstalled if requirements.txt changed.
+    """
+    logger.debug("running command %s (%s)", ctx.command.name, ctx.params,
+                 extra={"command": ctx.command.name, "params": ctx.params})
+
+    home = ctx.obj["HOME"]
+    services_path = os.path.join(home, SERVICES)
+
+    for service in services:
+        plugin_utils.upgrade_plugin(service, SERVICE, services_path, register_service, ctx.obj["CACHE"],
+                                    bytecode=bytecode, pack_deps=zip_deps, repo=ctx.obj["REPO"])
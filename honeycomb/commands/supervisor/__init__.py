@@ -0,0 +1 @@
+"""Honeycomb service supervisor (honeycombd) commands."""
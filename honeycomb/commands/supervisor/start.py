@@ -0,0 +1,37 @@
+# -*- coding: utf-8 -*-
+"""Honeycomb supervisor start command."""
+
+import os
+import logging
+
+import click
+
+from honeycomb.servicemanager.defs import SUPERVISOR_LOG
+from honeycomb.servicemanager.supervisor import Supervisor, daemonize
+
+logger = logging.getLogger(__name__)
+
+
+@click.command(short_help="Start honeycombd, the service supervisor")
+@click.pass_context
+@click.option("-d", "--daemon", is_flag=True, default=False, help="Run honeycombd in the background")
+def start(ctx, daemon):
+    """Start honeycombd, which runs services and answers honeycomb commands on a socket in honeycomb home.
+
+    While honeycombd is running, `service run --daemon` starts services under it and `service status/stop/restart/
+    test` ask it about them instead of loading the service again.
+    """
+    logger.debug("running command %s (%s)", ctx.command.name, ctx.params,
+                 extra={"command": ctx.command.name, "params": ctx.params})
+
+    supervisor = Supervisor(ctx.obj["HOME"], ctx.obj["INDEX"])
+    supervisor.bind()
+    click.secho("[+] honeycombd listening on {}".format(supervisor.socket_path))
+    if daemon:
+        daemonize(supervisor, open(os.path.join(supervisor.home, SUPERVISOR_LOG), "ab"))
+
+    try:
+        supervisor.serve()
+    except KeyboardInterrupt:
+        pass
+    click.secho("[*] honeycombd has stopped")
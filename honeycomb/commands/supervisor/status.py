@@ -0,0 +1,36 @@
+# -*- coding: utf-8 -*-
+"""Honeycomb supervisor status command."""
+
+import logging
+from datetime import timedelta
+
+import click
+
+from honeycomb.servicemanager.supervisor import SupervisorClient
+
+logger = logging.getLogger(__name__)
+
+
+def _format_metrics(info):
+    if info["pid"] is None:
+        return ""
+    metrics = ["pid: {}".format(info["pid"]), "uptime: {}".format(timedelta(seconds=int(info["uptime"])))]
+    if "restarts" in info:
+        metrics.append("restarts: {}".format(info["restarts"]))
+    if info["cpu"] is not None:
+        metrics.extend(["cpu: {:.2f}s".format(info["cpu"]), "rss: {:.1f}MiB".format(info["rss"] / 1024.0 / 1024)])
+    return " ({})".format(", ".join(metrics))
+
+
+@click.command(short_help="Show honeycombd and its services with their resource usage")
+@click.pass_context
+def status(ctx):
+    """Show honeycombd and the services it runs, with their uptime, restarts, cpu time and memory usage."""
+    logger.debug("running command %s (%s)", ctx.command.name, ctx.params,
+                 extra={"command": ctx.command.name, "params": ctx.params})
+
+    metrics = SupervisorClient(ctx.obj["HOME"]).call("metrics")
+    click.secho("honeycombd {} - running{}".format(metrics["version"], _format_metrics(metrics)))
+    for name in sorted(metrics["services"]):
+        info = metrics["services"][name]
+        click.secho("{} - {}{}".format(name, info["status"], _format_metrics(info)))
@@ -0,0 +1,22 @@
+# -*- coding: utf-8 -*-
+"""Honeycomb supervisor stop command."""
+
+import logging
+
+import click
+
+from honeycomb.servicemanager.supervisor import SupervisorClient
+
+logger = logging.getLogger(__name__)
+
+
+@click.command(short_help="Stop honeycombd and its services")
+@click.pass_context
+def stop(ctx):
+    """Stop all services run by honeycombd, then honeycombd itself."""
+    logger.debug("running command %s (%s)", ctx.command.name, ctx.params,
+                 extra={"command": ctx.command.name, "params": ctx.params})
+
+    for service in SupervisorClient(ctx.obj["HOME"]).call("shutdown"):
+        click.secho("[*] Stopped {}".format(service))
+    click.secho("[*] Stopped honeycombd")
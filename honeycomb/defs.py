@@ -47,6 +47,7 @@ class ConfigField(object):
 
 
 DEPS_DIR = "venv"
+DEPS_ZIP = "venv.zip"  # dependencies packed for zipimport, see plugin_utils.zip_deps
 DEBUG_LOG_FILE = "honeycomb.debug.log"
 
 SERVICE = "service"
@@ -59,6 +60,17 @@ GITHUB_RAW = "https://cymmetria.github.io/honeycomb_plugins"
 GITHUB_RAW_URL = "https://raw.githubusercontent.com/Cymmetria/honeycomb_plugins/master/" \
                  "{plugin_type}/{plugin}/{filename}"
 
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+DOWNLOAD_RETRIES = 3
+DOWNLOAD_PROGRESS_INTERVAL = 0.1
+CHECKSUM_SUFFIX = ".sha256"
+PARTIAL_DOWNLOAD_SUFFIX = ".part"
+STAGING_PREFIX = ".installing-"  # plugin zips are extracted next to their install path, then renamed
+STALE_STAGING_AGE = 60 * 60  # seconds, staging folders without a live owner pid are removed after that
+MANIFEST_FILE = ".manifest.json"  # sha256 of every plugin file, see plugin_utils.upgrade_plugin
+CATALOG_FILE = "catalog.json"
+CATALOG_TTL = 60 * 60  # seconds
+
 
 """Config constants."""
 NAME = "name"
@@ -71,6 +83,7 @@ CONFIG_FILE_NAME = "config.json"
 PARAMETERS = "parameters"
 
 ARGS_JSON = ".args.json"
+RUNTIME_FILES = (ARGS_JSON, "logs")  # written next to plugin files when they run (servicemanager.defs.LOGS_DIR)
 
 MIN = "min"
 MAX = "max"
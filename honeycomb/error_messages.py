@@ -17,5 +17,11 @@ PARAMETERS_DEFAULT_DOESNT_MATCH_TYPE = "Parameters: Bad value for {}={} (must be
 PARAMETERS_REQUIRED_FIELD_MISSING = "Parameters: '{}' is missing (use --show_args to see all parameters)"
 
 PLUGIN_ALREADY_INSTALLED = "{} is already installed"
+PLUGIN_NOT_INSTALLED = "{} is not installed"
 PLUGIN_NOT_FOUND_IN_ONLINE_REPO = "Cannot find {} in online repository"
 PLUGIN_REPO_CONNECTION_ERROR = "Unable to access online repository (check debug logs for detailed info)"
+PLUGIN_NOT_CACHED = "Cannot find {} in the plugin cache (running offline)"
+PLUGIN_CHECKSUM_MISMATCH = "Downloaded {} does not match its published SHA-256 checksum"
+
+INVALID_BUNDLE = "{} is not a valid honeycomb bundle: {}"
+BUNDLE_CHECKSUM_MISMATCH = "{} does not match its SHA-256 checksums"
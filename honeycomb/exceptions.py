@@ -64,6 +64,12 @@ class PluginAlreadyInstalled(PluginError):
     msg_format = error_messages.PLUGIN_ALREADY_INSTALLED
 
 
+class PluginNotInstalled(PluginError):
+    """Plugin not installed."""
+
+    msg_format = error_messages.PLUGIN_NOT_INSTALLED
+
+
 class PluginNotFoundInOnlineRepo(PluginError):
     """Plugin not found in online repo."""
 
@@ -76,6 +82,34 @@ class PluginRepoConnectionError(PluginError):
     msg_format = error_messages.PLUGIN_REPO_CONNECTION_ERROR
 
 
+class PluginNotCached(PluginError):
+    """Plugin is not in the cache and installing from the online repo is not allowed."""
+
+    msg_format = error_messages.PLUGIN_NOT_CACHED
+
+
+class PluginChecksumMismatch(PluginError):
+    """Downloaded plugin does not match its published checksum."""
+
+    msg_format = error_messages.PLUGIN_CHECKSUM_MISMATCH
+
+
+class BundleError(BaseHoneycombException):
+    """Base Bundle Exception."""
+
+
+class InvalidBundle(BundleError):
+    """Bundle cannot be read or has unexpected contents."""
+
+    msg_format = error_messages.INVALID_BUNDLE
+
+
+class BundleChecksumMismatch(BundleError):
+    """Bundle or its files do not match their checksums."""
+
+    msg_format = error_messages.BUNDLE_CHECKSUM_MISMATCH
+
+
 class ConfigValidationError(BaseHoneycombException):
     """Base config validation error."""
 
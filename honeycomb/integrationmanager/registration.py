@@ -4,17 +4,16 @@
 from __future__ import unicode_literals, absolute_import
 
 import os
-import sys
-import json
 import logging
-import importlib
 
 import six
 
-from honeycomb.defs import DEPS_DIR, CONFIG_FILE_NAME, INTEGRATION
+from honeycomb.defs import CONFIG_FILE_NAME, INTEGRATION, INTEGRATIONS
 
 from honeycomb.exceptions import ConfigFileNotFound
 from honeycomb.utils.config_utils import validate_config, validate_config_parameters
+from honeycomb.utils.plugin_index import load_config
+from honeycomb.utils.plugin_loader import load_plugin_module
 from honeycomb.integrationmanager import defs
 from honeycomb.integrationmanager.models import Integration
 from honeycomb.integrationmanager.exceptions import IntegrationNotFound
@@ -23,32 +22,18 @@ logger = logging.getLogger(__name__)
 
 
 def get_integration_module(integration_path):
-    """Add custom paths to sys and import integration module.
+    """Import the module of an integration, see :func:`honeycomb.utils.plugin_loader.load_plugin_module`.
 
     :param integration_path: Path to integration folder
     """
-    # add custom paths so imports would work
-    paths = [
-        os.path.join(__file__, "..", ".."),  # to import integrationmanager
-        os.path.join(integration_path, ".."),  # to import integration itself
-        os.path.join(integration_path, DEPS_DIR),  # to import integration deps
-    ]
+    return load_plugin_module(integration_path, INTEGRATIONS, INTEGRATION, "honeycomb")
 
-    for path in paths:
-        path = os.path.realpath(path)
-        logger.debug("adding %s to path", path)
-        sys.path.insert(0, path)
 
-    # get our integration class instance
-    integration_name = os.path.basename(integration_path)
-    logger.debug("importing %s", ".".join([integration_name, INTEGRATION]))
-    return importlib.import_module(".".join([integration_name, INTEGRATION]))
-
-
-def register_integration(package_folder):
+def register_integration(package_folder, index=None):
     """Register a honeycomb integration.
 
     :param package_folder: Path to folder with integration to load
+    :param index: Optional :class:`honeycomb.utils.plugin_index.PluginIndex` of already validated configs
     :returns: Validated integration object
     :rtype: :func:`honeycomb.utils.defs.Integration`
     """
@@ -61,19 +46,19 @@ def register_integration(package_folder):
     if not os.path.exists(json_config_path):
         raise ConfigFileNotFound(json_config_path)
 
-    with open(json_config_path, "r") as f:
-        config_json = json.load(f)
+    config_json = load_config(json_config_path, _validate_config, index)
+    integration_type = _create_integration_object(config_json)
+
+    return integration_type
+
 
+def _validate_config(config_json):
     # Validate integration and alert config
     validate_config(config_json, defs.INTEGRATION_VALIDATE_CONFIG_FIELDS)
     validate_config_parameters(config_json,
                                defs.INTEGRATION_PARAMETERS_ALLOWED_KEYS,
                                defs.INTEGRATION_PARAMETERS_ALLOWED_TYPES)
 
-    integration_type = _create_integration_object(config_json)
-
-    return integration_type
-
 
 def _create_integration_object(config):
     integration_type_create_kwargs = {
@@ -38,6 +38,16 @@ class _UTC(tzinfo):
 
 def configure_integration(path):
     """Configure and enable an integration."""
+    configured_integrations.append(create_configured_integration(path))
+
+
+def create_configured_integration(path):
+    """Load an integration with its configured arguments, without enabling it.
+
+    Enable it by adding it to :obj:`configured_integrations`, e.g., in every service process that shares it.
+
+    :returns: :class:`honeycomb.integrationmanager.models.ConfiguredIntegration`
+    """
     integration = register_integration(path)
     integration_args = {}
     try:
@@ -54,8 +64,7 @@ def configure_integration(path):
     configured_integration = ConfiguredIntegration(name=integration.name, integration=integration, path=path)
     configured_integration.data = integration_args
     configured_integration.integration.module = get_integration_module(path).IntegrationActionsClass(integration_args)
-
-    configured_integrations.append(configured_integration)
+    return configured_integration
 
 
 def send_alert_to_subscribed_integrations(alert):
@@ -2,20 +2,24 @@
 """Custom Service implementation from MazeRunner."""
 from __future__ import unicode_literals, absolute_import
 
-import os
 import sys
+import json
 import time
+import hashlib
 import logging
 from threading import Thread
 from multiprocessing import Process
 
 import six
-import docker
-from attr import attrs, attrib
+from attr import attrs, attrib, Factory
 from six.moves.queue import Queue, Full, Empty
 
 from honeycomb.decoymanager.models import Alert
-from honeycomb.servicemanager.defs import SERVICE_ALERT_QUEUE_SIZE
+from honeycomb.utils.tailer import LineBuffer
+from honeycomb.utils.watcher import FileFollower
+from honeycomb.servicemanager.defs import (SERVICE_ALERT_QUEUE_SIZE, CONTAINER_SERVICE_LABEL, CONTAINER_PARAMS_LABEL,
+                                           CONTAINER_REPLICA_LABEL)
+from honeycomb.servicemanager.log_rules import LogRules
 from honeycomb.servicemanager.error_messages import INVALID_ALERT_TYPE
 from honeycomb.integrationmanager.tasks import send_alert_to_subscribed_integrations
 
@@ -29,6 +33,8 @@ class ServerCustomService(Process):
 
     alerts_queue = None
     thread_server = None
+    ready_event = None
+    """Event set by :func:`signal_ready`, honeycombd waits on it when starting services"""
 
     logger = logging.getLogger(__name__)
     """Logger to be used by plugins and collected by main logger."""
@@ -39,11 +45,16 @@ class ServerCustomService(Process):
     service_args = attrib(type=dict, default={})
     """Validated dictionary of service arguments (see: :func:`honeycomb.utils.plugin_utils.parse_plugin_args`)"""
 
+    log_rules = attrib(type=list, default=Factory(list))
+    """Declarative log parsing rules, parsed from config.json (see :mod:`honeycomb.servicemanager.log_rules`)"""
+
     logger.setLevel(logging.DEBUG)
 
     def signal_ready(self):
         """Signal the service manager this service is ready for incoming connections."""
         self.logger.debug("service is ready")
+        if self.ready_event is not None:
+            self.ready_event.set()
 
     def on_server_start(self):
         """Service run loop function.
@@ -133,13 +144,46 @@ class ServerCustomService(Process):
         raise SystemExit()
 
 
+def _skip_bytes(chunks, skip):
+    """Drop the first skip bytes of a stream of log chunks."""
+    for chunk in chunks:
+        if skip:
+            chunk, skip = chunk[skip:], max(skip - len(chunk), 0)
+            if not chunk:
+                continue
+        yield chunk
+
+
 class DockerService(ServerCustomService):
     """Provides an ability to run a Docker container that will be monitored for events."""
 
+    keep_container = False
+    """Stop (instead of remove) the container on shutdown and restart it on the next run.
+
+    Containers are labeled with the service name and a hash of the image and :attr:`docker_params`, a kept
+    container is only reused if neither changed since it was created.
+    """
+
+    replicas = 1
+    """Number of containers to run, see :func:`replica_docker_params` for how host ports are assigned."""
+
     def __init__(self, *args, **kwargs):
         super(DockerService, self).__init__(*args, **kwargs)
         self._container = None
+        self._containers = []
+        import docker  # slow to import, only docker services need it
         self._docker_client = docker.from_env()
+        self._compiled_log_rules = None
+        self._logs_since = {}
+        self.startup_times = {}
+        """Lists of (phase, seconds) tuples measured by :func:`start_container`, by replica index."""
+
+    @property
+    def compiled_log_rules(self):
+        """Return :attr:`log_rules` compiled into a :class:`honeycomb.servicemanager.log_rules.LogRules`."""
+        if self._compiled_log_rules is None:
+            self._compiled_log_rules = LogRules(self.log_rules)
+        return self._compiled_log_rules
 
     @property
     def docker_params(self):
@@ -157,77 +201,311 @@ class DockerService(ServerCustomService):
         """Return docker image name."""
         raise NotImplementedError
 
+    @property
+    def service_name(self):
+        """Return the service name used to label containers."""
+        if self.alert_types:
+            return self.alert_types[0].service_type.name
+        return type(self).__name__
+
+    def replica_name(self, index):
+        """Return the decoy name reported in alerts of replica index."""
+        return "{}-{}".format(self.service_name, index)
+
+    def replica_docker_params(self, index):
+        """Return the docker run parameters of replica index.
+
+        Replicas are assigned consecutive blocks of host ports: every host port in :attr:`docker_params` is
+        shifted by index times the size of the range they span, e.g., with ``{80: 8080, 443: 8443}`` replica 1 gets
+        ``{80: 8444, 443: 8807}``. Ports without a fixed host port (e.g., ``None``) are left for docker to assign.
+        """
+        params = dict(self.docker_params)
+        ports = params.get("ports")
+        if not index or not ports:
+            return params
+
+        def host_port(binding):
+            if isinstance(binding, six.integer_types):
+                return binding
+            if isinstance(binding, tuple) and len(binding) == 2:
+                return binding[1]
+            return None
+
+        def shift(binding, offset):
+            if isinstance(binding, six.integer_types):
+                return binding + offset
+            if isinstance(binding, tuple) and len(binding) == 2:
+                return binding[0], binding[1] + offset
+            if isinstance(binding, list):
+                return [shift(_, offset) for _ in binding]
+            return binding
+
+        host_ports = [port for binding in ports.values()
+                      for port in map(host_port, binding if isinstance(binding, list) else [binding]) if port]
+        step = max(host_ports) - min(host_ports) + 1 if host_ports else 0
+        params["ports"] = {container_port: shift(binding, index * step) for container_port, binding in ports.items()}
+        return params
+
+    def container_labels(self, params, index=0):
+        """Return the labels identifying a replica container and its configuration.
+
+        :param params: Docker run parameters of the replica
+        :param index: Replica index
+        """
+        config = json.dumps([self.docker_image_name, params], sort_keys=True, default=repr)
+        return {
+            CONTAINER_SERVICE_LABEL: self.service_name,
+            CONTAINER_REPLICA_LABEL: str(index),
+            CONTAINER_PARAMS_LABEL: hashlib.sha1(config.encode("utf-8")).hexdigest(),
+        }
+
+    def pull_image(self):
+        """Pull :attr:`docker_image_name` unless it is already available locally.
+
+        :return: True if the image was pulled
+        """
+        import docker.errors
+        import docker.utils
+        try:
+            self._docker_client.images.get(self.docker_image_name)
+            return False
+        except docker.errors.ImageNotFound:
+            pass
+
+        repository, tag = docker.utils.parse_repository_tag(self.docker_image_name)
+        self.logger.debug("pulling %s", self.docker_image_name)
+        self._docker_client.images.pull(repository, tag=tag or "latest")
+        return True
+
+    def _find_container(self, labels):
+        """Return a kept container matching labels, removing stale containers of this replica."""
+        found = None
+        filters = {"label": ["{}={}".format(label, labels[label])
+                             for label in (CONTAINER_SERVICE_LABEL, CONTAINER_REPLICA_LABEL)]}
+        for container in self._docker_client.containers.list(all=True, filters=filters):
+            if not found and container.labels.get(CONTAINER_PARAMS_LABEL) == labels[CONTAINER_PARAMS_LABEL]:
+                found = container
+            else:
+                self.logger.debug("removing stale container %s", container.id)
+                container.remove(v=True, force=True)
+        return found
+
+    def start_container(self, index=0):
+        """Start a service container, reusing a kept container when :attr:`keep_container` is set.
+
+        The time spent in every phase is stored in :attr:`startup_times` under index and logged.
+
+        :param index: Replica index
+        :return: The running container
+        """
+        startup_times = self.startup_times[index] = []
+        started = last = time.time()
+
+        def phase(name):
+            now = time.time()
+            startup_times.append((name, now - last))
+            return now
+
+        params = self.replica_docker_params(index)
+        labels = dict(params.pop("labels", {}), **self.container_labels(params, index))
+
+        container = None
+        if self.keep_container:
+            container = self._find_container(labels)
+            last = phase("lookup")
+
+        if container:
+            # only stream what the container logs from now on, the previous run was already parsed. since has
+            # whole second precision, remember how much the previous run logged in this second to skip it
+            since = int(time.time())
+            self._logs_since[container.id] = (since, len(container.logs(since=since)))
+            if container.status != "running":
+                container.start()
+            last = phase("restart")
+        else:
+            self.pull_image()
+            last = phase("image")
+            container = self._docker_client.containers.run(self.docker_image_name, detach=True, labels=labels,
+                                                           **params)
+            last = phase("create")
+
+        self.logger.info("container %s started in %.2fs (%s)", container.id, last - started,
+                         ", ".join("{} {:.2f}s".format(name, seconds) for name, seconds in startup_times))
+        return container
+
     def parse_line(self, line):
-        """Parse line and return dictionary if its an alert, else None / {}."""
+        """Parse line and return dictionary if its an alert, else None / {}.
+
+        Services that declare ``log_rules`` in config.json do not need to override this.
+
+        :param line: A complete, decoded log line without the trailing newline
+        """
+        if self.log_rules:
+            return self.compiled_log_rules.match(line)
         raise NotImplementedError
 
+    def parse_lines(self, lines):
+        """Parse a batch of lines and return a list of alert dictionaries.
+
+        Override this to handle a whole batch at once, the default implementation matches the batch against
+        ``log_rules`` if the service has any, otherwise it calls :func:`parse_line` for every line.
+
+        :param lines: List of complete, decoded log lines
+        """
+        if self.log_rules and six.get_unbound_function(type(self).parse_line) is _default_parse_line:
+            return self.compiled_log_rules.match_lines(lines)
+
+        alerts = []
+        for line in lines:
+            try:
+                alert_dict = self.parse_line(line)
+                if alert_dict:
+                    alerts.append(alert_dict)
+            except Exception:
+                self.logger.exception(None)
+        return alerts
+
     def get_lines(self):
         """Fetch log lines from the docker service.
 
         :return: A blocking logs generator
         """
-        return self._container.logs(stream=True)
+        return self.get_container_lines(self._container)
+
+    def get_container_lines(self, container):
+        """Fetch log lines of a specific container (used for every replica when :attr:`replicas` is set).
+
+        :return: A blocking logs generator
+        """
+        if container.id in self._logs_since:
+            since, skip = self._logs_since[container.id]
+            return _skip_bytes(container.logs(stream=True, since=since), skip)
+        return container.logs(stream=True)
+
+    def get_line_batches(self, chunks=None):
+        """Reassemble the chunks returned by :func:`get_lines` into batches of complete lines.
+
+        Docker streams logs in arbitrary chunks, a chunk may hold part of a line or many lines. Complete lines are
+        cut from the buffered bytes and decoded in bulk. Text returned by :func:`get_lines` (e.g. when it is
+        overridden to use :func:`read_lines`) is passed through as a single line batch. Either way, lines are handed
+        out without their trailing newline.
+
+        .. note:: Text lines used to be passed to :func:`parse_line` with their trailing newline, services that
+            override :func:`get_lines` to use :func:`read_lines` and relied on it (e.g. patterns matching the
+            newline) need to be updated. Anchor patterns with ``$`` instead.
+
+        :param chunks: Iterable of chunks to reassemble instead of :func:`get_lines`
+        :return: A blocking generator of lists of lines
+        """
+        line_buffer = LineBuffer()
+        for chunk in self.get_lines() if chunks is None else chunks:
+            if isinstance(chunk, six.text_type):
+                yield [chunk[:-1] if chunk.endswith("\n") else chunk]
+                continue
+            lines = line_buffer.feed(chunk)
+            if lines:
+                yield lines
+
+        lines = line_buffer.flush()
+        if lines:
+            yield lines
 
     def read_lines(self, file_path, empty_lines=False, signal_ready=True):
         """Fetch lines from file.
 
-        In case the file handler changes (logrotate), reopen the file.
+        In case the file handler changes (logrotate), reopen the file. The reader sleeps until the file watcher
+        reports new data instead of polling the file.
+
+        Lines are yielded with their trailing newline, :func:`get_line_batches` strips it before they are parsed.
 
         :param file_path: Path to file
         :param empty_lines: Return empty lines
         :param signal_ready: Report signal ready on start
         """
-        file_handler, file_id = self._get_file(file_path)
-        file_handler.seek(0, os.SEEK_END)
+        follower = FileFollower(file_path)
 
         if signal_ready:
             self.signal_ready()
 
-        while self.thread_server.is_alive():
-            line = six.text_type(file_handler.readline(), "utf-8")
-            if line:
-                yield line
-                continue
-            elif empty_lines:
-                yield line
+        try:
+            for line in follower.lines(running=self.thread_server.is_alive, empty_lines=empty_lines):
+                yield six.text_type(line, "utf-8")
+        finally:
+            follower.close()
 
-            time.sleep(0.1)
+    def get_replica_batches(self):
+        """Multiplex the log streams of all replicas.
 
-            if file_id != self._get_file_id(os.stat(file_path)) and os.path.isfile(file_path):
-                file_handler, file_id = self._get_file(file_path)
+        Every replica container is read by its own thread, line batches are handed over to the caller through a
+        single bounded queue so alerts are parsed and queued from one loop.
+
+        :return: A blocking generator of (replica index, list of lines) tuples
+        """
+        batches = Queue(maxsize=SERVICE_ALERT_QUEUE_SIZE)
+
+        def read_replica(index, container):
+            try:
+                for lines in self.get_line_batches(self.get_container_lines(container)):
+                    batches.put((index, lines))
+            except Exception:
+                self.logger.exception("failed reading logs of %s", self.replica_name(index))
 
-    @staticmethod
-    def _get_file_id(file_stat):
-        if os.name == "posix":
-            # st_dev: Device inode resides on.
-            # st_ino: Inode number.
-            return "%xg%x" % (file_stat.st_dev, file_stat.st_ino)
-        return "%f" % file_stat.st_ctime
+        readers = []
+        for index, container in enumerate(self._containers):
+            reader = Thread(target=read_replica, args=(index, container), name=self.replica_name(index))
+            reader.daemon = True
+            reader.start()
+            readers.append(reader)
 
-    def _get_file(self, file_path):
-        file_handler = open(file_path, "rb")
-        file_id = self._get_file_id(os.fstat(file_handler.fileno()))
-        return file_handler, file_id
+        while True:
+            try:
+                yield batches.get(timeout=1)
+            except Empty:
+                if not any(reader.is_alive() for reader in readers) and batches.empty():
+                    return
 
     def on_server_start(self):
         """Service run loop function.
 
-        Run the desired docker container with parameters and start parsing the monitored file for alerts.
+        Run the desired docker container(s) with parameters and start parsing the monitored file for alerts.
         """
-        self._container = self._docker_client.containers.run(self.docker_image_name, detach=True, **self.docker_params)
+        for index in range(self.replicas):
+            self._containers.append(self.start_container(index))
+        self._container = self._containers[0]
         self.signal_ready()
 
-        for log_line in self.get_lines():
+        if self.replicas > 1:
+            batches = self.get_replica_batches()
+        else:
+            batches = ((None, lines) for lines in self.get_line_batches())
+
+        for index, lines in batches:
             try:
-                alert_dict = self.parse_line(log_line)
-                if alert_dict:
+                for alert_dict in self.parse_lines(lines):
+                    if index is not None:
+                        alert_dict["decoy_name"] = self.replica_name(index)
                     self.add_alert_to_queue(alert_dict)
             except Exception:
                 self.logger.exception(None)
 
+    def _stop_container(self, container):
+        container.stop()
+        if not self.keep_container:
+            container.remove(v=True, force=True)
+
     def on_server_shutdown(self):
-        """Stop the container before shutting down."""
-        if not self._container:
+        """Stop the containers before shutting down, remove them unless :attr:`keep_container` is set."""
+        containers = self._containers or ([self._container] if self._container else [])
+        if len(containers) == 1:
+            self._stop_container(containers[0])
             return
-        self._container.stop()
-        self._container.remove(v=True, force=True)
+
+        # docker waits for every container to exit gracefully, stop replicas in parallel
+        stoppers = [Thread(target=self._stop_container, args=(container,)) for container in containers]
+        for stopper in stoppers:
+            stopper.start()
+        for stopper in stoppers:
+            stopper.join()
+
+
+_default_parse_line = six.get_unbound_function(DockerService.parse_line)
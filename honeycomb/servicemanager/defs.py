@@ -15,12 +15,30 @@ from honeycomb.servicemanager.models import OSFamilies
 EVENT_TYPE = "event_type"
 SERVICE_CONFIG_SECTION_KEY = "service"
 ALERT_CONFIG_SECTION_KEY = "event_types"
+LOG_RULES = "log_rules"
+PATTERN = "pattern"
 SERVICE_ALERT_QUEUE_SIZE = 1000
 
+"""Docker containers."""
+CONTAINER_SERVICE_LABEL = "honeycomb.service"
+CONTAINER_PARAMS_LABEL = "honeycomb.params"
+CONTAINER_REPLICA_LABEL = "honeycomb.replica"
+
 LOGS_DIR = "logs"
 STDOUTLOG = "stdout.log"
 STDERRLOG = "stderr.log"
 
+"""Supervisor (honeycombd)."""
+SUPERVISOR_SOCKET = "honeycombd.sock"  # in honeycomb home
+SUPERVISOR_LOG = "honeycombd.log"  # stdout and stderr of a daemonized honeycombd
+SUPERVISOR_TIMEOUT = 30  # seconds a client waits for a reply, and a service test may take
+SUPERVISOR_REQUEST_TIMEOUT = 2  # seconds honeycombd waits for a client to send its request
+SUPERVISOR_POLL_INTERVAL = 0.5  # seconds between checks of the supervised services
+SERVICE_STOP_TIMEOUT = 10  # seconds a service has to shut down before it is killed
+RESTART_BACKOFF_MAX = 60  # seconds, services running longer than this reset their restart backoff
+SERVICE_READY_TIMEOUT = 300  # seconds to wait for services to signal ready, docker services may pull their image
+READY_POLL_INTERVAL = 0.05
+
 """Service section."""
 PORT = "port"
 PORTS = "ports"
@@ -5,5 +5,9 @@ from __future__ import unicode_literals, absolute_import
 
 UNSUPPORTED_OS_ERROR = "Service requires running on {} and you are using {}"
 SERVICE_NOT_FOUND_ERROR = "Cannot find service named {}, try installing it?"
+SERVICE_ALREADY_RUNNING = "{} is already running"
+SERVICE_NOT_RUNNING = "{} is not running"
+SUPERVISOR_NOT_RUNNING = "honeycombd is not running for {}, start it with `honeycomb supervisor start`"
+SUPERVISOR_ALREADY_RUNNING = "honeycombd is already running for {}"
 
 INVALID_ALERT_TYPE = "%s is not a valid event_type, check event_types in config.json"
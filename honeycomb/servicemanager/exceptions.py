@@ -21,3 +21,27 @@ class UnsupportedOS(ServiceManagerException):
     """Specified service does not exist."""
 
     msg_format = error_messages.UNSUPPORTED_OS_ERROR
+
+
+class ServiceAlreadyRunning(ServiceManagerException):
+    """Service is already running."""
+
+    msg_format = error_messages.SERVICE_ALREADY_RUNNING
+
+
+class ServiceNotRunning(ServiceManagerException):
+    """Service is not running."""
+
+    msg_format = error_messages.SERVICE_NOT_RUNNING
+
+
+class SupervisorNotRunning(ServiceManagerException):
+    """No honeycombd answers on the home's socket."""
+
+    msg_format = error_messages.SUPERVISOR_NOT_RUNNING
+
+
+class SupervisorAlreadyRunning(ServiceManagerException):
+    """A honeycombd already answers on the home's socket."""
+
+    msg_format = error_messages.SUPERVISOR_ALREADY_RUNNING
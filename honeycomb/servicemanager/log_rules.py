@@ -0,0 +1,216 @@
+# -*- coding: utf-8 -*-
+r"""Honeycomb declarative log parsing rules.
+
+Services can declare ``log_rules`` in config.json instead of hand writing :func:`parse_line`:
+
+.. code-block:: json
+
+    "log_rules": [
+        {
+            "event_type": "ssh_login",
+            "pattern": "Failed password for (?P<username>\\S+) from (?P<originating_ip>[\\d.]+)",
+            "fields": {"transport_protocol": "TCP"}
+        }
+    ]
+
+Named groups are copied to the alert field of the same name and ``fields`` holds constant alert fields.
+All rules are compiled into one regular expression, so a line is scanned once no matter how many rules there are.
+Every rule matches the same inside it as on its own: numbered backreferences and global inline flags (e.g.,
+``(?i)``) only apply to their own rule.
+When several rules match a line, the rule matching earliest in the line wins (the first declared on a tie).
+"""
+
+from __future__ import unicode_literals, absolute_import
+
+import re
+import sys
+
+import six
+
+from honeycomb.exceptions import ConfigFieldValidationError
+from honeycomb.decoymanager.models import Alert
+from honeycomb.servicemanager.defs import LOG_RULES, PATTERN, EVENT_TYPE, FIELDS
+
+GLOBAL_FLAGS_RE = re.compile(r"\(\?([aiLmsux]+)\)")
+NAME_RE = re.compile(r"\w+")
+RULE_GROUP_FORMAT = "r{}"
+FIELD_GROUP_FORMAT = "r{}_{}"
+NUMBERED_GROUP_FORMAT = "r{}g{}"
+OCTAL_DIGITS = "01234567"
+
+
+def _scope_pattern(index, pattern):
+    """Rewrite a rule so it means the same inside the combined expression as it does on its own.
+
+    Named groups are prefixed so group names are unique, unnamed groups are named so numbered backreferences (which
+    would refer to groups of other rules once the rules are combined) refer to their own rule, and global inline
+    flags (only allowed at the start of an expression) are scoped to the rule.
+    """
+    flags = ""
+    match = GLOBAL_FLAGS_RE.match(pattern)
+    while match:
+        flags += match.group(1)
+        pattern = pattern[match.end():]
+        match = GLOBAL_FLAGS_RE.match(pattern)
+
+    def numbered(number):
+        return NUMBERED_GROUP_FORMAT.format(index, number)
+
+    def named(name):
+        return FIELD_GROUP_FORMAT.format(index, name)
+
+    out = []
+    groups = 0
+    in_class = False
+    pos = 0
+    while pos < len(pattern):
+        char = pattern[pos]
+        if char == "\\":
+            digits = re.match(r"\d{1,3}", pattern[pos + 1:pos + 4])
+            digits = digits.group() if digits else ""
+            if in_class or not digits or digits[0] == "0" or \
+                    (len(digits) == 3 and all(_ in OCTAL_DIGITS for _ in digits)):
+                out.append(pattern[pos:pos + 2])
+                pos += 2
+            else:
+                digits = digits[:2]
+                out.append("(?P={})".format(numbered(digits)))
+                pos += 1 + len(digits)
+            continue
+        if in_class:
+            in_class = char != "]"
+        elif char == "[":
+            in_class = True
+            # a "]" right after "[" or "[^" is a literal
+            end = pos + 1 + (pattern[pos + 1:pos + 2] == "^")
+            if pattern[end:end + 1] == "]":
+                out.append(pattern[pos:end + 1])
+                pos = end + 1
+                continue
+        elif char == "#" and "x" in flags:
+            end = pattern.find("\n", pos)
+            end = len(pattern) if end == -1 else end
+            out.append(pattern[pos:end])
+            pos = end
+            continue
+        elif char == "(":
+            if pattern.startswith("(?P<", pos):
+                groups += 1
+                name = NAME_RE.match(pattern, pos + 4).group()
+                out.append("(?P<{}>".format(named(name)))
+                pos += 5 + len(name)
+                continue
+            if pattern.startswith("(?P=", pos):
+                name = NAME_RE.match(pattern, pos + 4).group()
+                out.append("(?P={})".format(named(name)))
+                pos += 5 + len(name)
+                continue
+            if pattern.startswith("(?(", pos):
+                name = NAME_RE.match(pattern, pos + 3).group()
+                out.append("(?({}".format(numbered(name) if name.isdigit() else named(name)))
+                pos += 3 + len(name)
+                continue
+            if not pattern.startswith("(?", pos):
+                groups += 1
+                out.append("(?P<{}>".format(numbered(groups)))
+                pos += 1
+                continue
+        out.append(char)
+        pos += 1
+
+    pattern = "".join(out)
+    if not flags:
+        return pattern
+    if sys.version_info < (3, 6):
+        raise ConfigFieldValidationError(LOG_RULES, "(?{})".format(flags),
+                                         "inline flags are not supported, they would apply to all rules")
+    return "(?{}:{})".format(flags, pattern)
+
+
+def validate_log_rules(rules, event_types):
+    """Validate the log_rules section of config.json.
+
+    :param rules: List of rule dictionaries
+    :param event_types: List of valid event type names
+    """
+    def fail(value, message):
+        raise ConfigFieldValidationError(LOG_RULES, value, message)
+
+    if not isinstance(rules, list):
+        fail(rules, "must be a list")
+
+    for rule in rules:
+        if not isinstance(rule, dict) or not isinstance(rule.get(PATTERN), six.string_types):
+            fail(rule, "every rule must be a dictionary with a pattern")
+        if rule.get(EVENT_TYPE) not in event_types:
+            fail(rule.get(EVENT_TYPE), "event_type must be one of: {}".format(", ".join(event_types)))
+        try:
+            compiled = re.compile(rule[PATTERN])
+        except re.error as exc:
+            fail(rule[PATTERN], "invalid pattern ({})".format(exc))
+        fields = rule.get(FIELDS, {})
+        if not isinstance(fields, dict):
+            fail(fields, "fields must be a dictionary")
+        for field in list(compiled.groupindex) + list(fields):
+            if field not in Alert.__slots__:
+                fail(field, "not an alert field")
+
+    try:
+        LogRules(rules)  # make sure the combined expression compiles
+    except (re.error, AttributeError) as exc:
+        fail([rule[PATTERN] for rule in rules], "patterns cannot be combined ({})".format(exc))
+
+
+class LogRules(object):
+    """Log rules compiled into a single regular expression."""
+
+    def __init__(self, rules):
+        """Compile rules.
+
+        :param rules: Validated list of rule dictionaries (see :func:`validate_log_rules`)
+        """
+        self.rules = rules
+        self._dispatch = {}
+        alternatives = []
+        for index, rule in enumerate(rules):
+            rule_group = RULE_GROUP_FORMAT.format(index)
+            groups = [(FIELD_GROUP_FORMAT.format(index, name), name) for name in re.compile(rule[PATTERN]).groupindex]
+            static_fields = dict(rule.get(FIELDS, {}))
+            static_fields[EVENT_TYPE] = rule[EVENT_TYPE]
+            self._dispatch[rule_group] = (static_fields, groups)
+            # an empty marker group at the end identifies the rule, wrapping the rule in a capturing group instead
+            # would hide its leading literal from the regex compiler and disable the fast first character scan.
+            # the non-capturing group keeps a top level "|" inside the rule
+            alternatives.append("(?:{})(?P<{}>)".format(_scope_pattern(index, rule[PATTERN]), rule_group))
+        self.regex = re.compile("|".join(alternatives)) if alternatives else None
+
+    def __len__(self):
+        return len(self.rules)
+
+    def match(self, line):
+        """Match a line against all rules in one pass.
+
+        :returns: Alert dictionary, or None if no rule matched
+        """
+        if self.regex is None:
+            return None
+        match = self.regex.search(line)
+        if not match:
+            return None
+
+        # the rule's marker group closes after all of its other groups
+        static_fields, groups = self._dispatch[match.lastgroup]
+        alert = dict(static_fields)
+        for group, field in groups:
+            value = match.group(group)
+            if value is not None:
+                alert[field] = value
+        return alert
+
+    def match_lines(self, lines):
+        """Match a batch of lines.
+
+        :returns: List of alert dictionaries for the matching lines
+        """
+        search = self.match
+        return [alert for alert in (search(line) for line in lines) if alert]
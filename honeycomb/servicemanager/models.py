@@ -3,7 +3,7 @@
 
 from __future__ import unicode_literals, absolute_import
 
-from attr import attrib, attrs
+from attr import attrib, attrs, Factory
 
 from honeycomb.defs import BaseNameLabel, IBaseType
 
@@ -19,6 +19,7 @@ class ServiceType(object):
     supported_os_families = attrib(type=list)
 
     alert_types = attrib(type=list, default=[])
+    log_rules = attrib(type=list, default=Factory(list))
 
 
 class OSFamilies(IBaseType):
@@ -4,54 +4,39 @@
 from __future__ import unicode_literals, absolute_import
 
 import os
-import sys
-import json
 import logging
 import platform
-import importlib
 
 import six
 
-from honeycomb.defs import NAME, LABEL, CONFIG_FILE_NAME, DEPS_DIR
+from honeycomb.defs import NAME, LABEL, CONFIG_FILE_NAME, SERVICES
 from honeycomb.utils import config_utils
+from honeycomb.utils.plugin_index import load_config
+from honeycomb.utils.plugin_loader import load_plugin_module
 from honeycomb.exceptions import ConfigFileNotFound
 from honeycomb.decoymanager.models import AlertType
 from honeycomb.servicemanager import defs
 from honeycomb.servicemanager.models import ServiceType, OSFamilies
+from honeycomb.servicemanager.log_rules import validate_log_rules
 from honeycomb.servicemanager.exceptions import ServiceNotFound, UnsupportedOS
 
 logger = logging.getLogger(__name__)
 
 
 def get_service_module(service_path):
-    """Add custom paths to sys and import service module.
+    """Import the module of a service, see :func:`honeycomb.utils.plugin_loader.load_plugin_module`.
 
     :param service_path: Path to service folder
     """
-    # add custom paths so imports would work
-    paths = [
-        os.path.dirname(__file__),  # this folder, to catch base_service
-        os.path.realpath(os.path.join(service_path, "..")),  # service's parent folder for import
-        os.path.realpath(os.path.join(service_path)),  # service's folder for local imports
-        os.path.realpath(os.path.join(service_path, DEPS_DIR)),  # deps dir
-    ]
-
-    for path in paths:
-        path = os.path.realpath(path)
-        logger.debug("adding %s to path", path)
-        sys.path.insert(0, path)
-
-    # get our service class instance
-    service_name = os.path.basename(service_path)
-    module = ".".join([service_name, service_name + "_service"])
-    logger.debug("importing %s", module)
-    return importlib.import_module(module)
-
-
-def register_service(package_folder):
+    service_name = os.path.basename(os.path.realpath(service_path))
+    return load_plugin_module(service_path, SERVICES, service_name + "_service", "honeycomb.servicemanager")
+
+
+def register_service(package_folder, index=None):
     """Register a honeycomb service.
 
     :param package_folder: Path to folder with service to load
+    :param index: Optional :class:`honeycomb.utils.plugin_index.PluginIndex` of already validated configs
     :returns: Validated service object
     :rtype: :func:`honeycomb.utils.defs.ServiceType`
     """
@@ -64,25 +49,28 @@ def register_service(package_folder):
     if not os.path.exists(json_config_path):
         raise ConfigFileNotFound(json_config_path)
 
-    with open(json_config_path, "r") as f:
-        config_json = json.load(f)
+    config_json = load_config(json_config_path, _validate_config, index)
+    _validate_supported_platform(config_json)
+
+    service_type = _create_service_object(config_json)
+    service_type.alert_types = _create_alert_types(config_json, service_type)
+    service_type.log_rules = config_json.get(defs.LOG_RULES, [])
+
+    return service_type
+
 
+def _validate_config(config_json):
     # Validate service and alert config
     config_utils.validate_config(config_json, defs.SERVICE_ALERT_VALIDATE_FIELDS)
 
     config_utils.validate_config(config_json.get(defs.SERVICE_CONFIG_SECTION_KEY, {}),
                                  defs.SERVICE_CONFIG_VALIDATE_FIELDS)
-    _validate_supported_platform(config_json)
     _validate_alert_configs(config_json)
+    _validate_log_rules(config_json)
     config_utils.validate_config_parameters(config_json,
                                             defs.SERVICE_ALLOWED_PARAMTER_KEYS,
                                             defs.SERVICE_ALLOWED_PARAMTER_TYPES)
 
-    service_type = _create_service_object(config_json)
-    service_type.alert_types = _create_alert_types(config_json, service_type)
-
-    return service_type
-
 
 def _validate_supported_platform(config_json):
     current_platform = platform.system()
@@ -105,6 +93,12 @@ def _validate_alert_configs(config_json):
         config_utils.validate_config(alert_type, defs.ALERT_CONFIG_VALIDATE_FIELDS)
 
 
+def _validate_log_rules(config_json):
+    if defs.LOG_RULES in config_json:
+        event_types = [_[NAME] for _ in config_json[defs.ALERT_CONFIG_SECTION_KEY]]
+        validate_log_rules(config_json[defs.LOG_RULES], event_types)
+
+
 def _create_service_object(config_json):
     service_config = config_json[defs.SERVICE_CONFIG_SECTION_KEY]
 
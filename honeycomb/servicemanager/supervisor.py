@@ -0,0 +1,616 @@
+# -*- coding: utf-8 -*-
+"""Honeycomb service supervisor (honeycombd).
+
+honeycombd runs the services of a honeycomb home in child processes and answers the honeycomb commands on a Unix
+socket in the home folder (:obj:`honeycomb.servicemanager.defs.SUPERVISOR_SOCKET`). Every request is a single
+JSON line, ``{"command": <name>, "params": {...}}``, answered by a single JSON line, ``{"result": ...}`` or
+``{"error": <message>}``. See the ``rpc_*`` methods of :class:`Supervisor` for the commands.
+
+A service is registered and its module imported once, by honeycombd. Starting it forks honeycombd, so the
+service process inherits the imported module and restarting it imports nothing. Services that exit without being
+stopped are restarted, waiting twice as long after every consecutive failure (up to
+:obj:`honeycomb.servicemanager.defs.RESTART_BACKOFF_MAX` seconds).
+
+honeycombd is single threaded: requests are handled one at a time between checks of the supervised services, so
+no lock is held by another thread when it forks. Requests that may take long (``test``) are answered by a short lived
+process forked for them, so honeycombd keeps answering other requests and restarting services meanwhile.
+"""
+
+from __future__ import unicode_literals, absolute_import
+
+import os
+import json
+import time
+import errno
+import signal
+import socket
+import logging
+import multiprocessing
+
+import click
+from attr import attrs, attrib, Factory
+from six.moves import socketserver
+
+from honeycomb import __version__
+from honeycomb.defs import SERVICES, INTEGRATIONS, ARGS_JSON
+from honeycomb.utils import plugin_utils, config_utils
+from honeycomb.utils.plugin_index import PluginIndex
+from honeycomb.servicemanager.defs import (LOGS_DIR, STDOUTLOG, STDERRLOG, SUPERVISOR_SOCKET, SUPERVISOR_TIMEOUT,
+                                           SUPERVISOR_REQUEST_TIMEOUT, SUPERVISOR_POLL_INTERVAL, SERVICE_STOP_TIMEOUT,
+                                           RESTART_BACKOFF_MAX, SERVICE_READY_TIMEOUT, READY_POLL_INTERVAL)
+from honeycomb.servicemanager.exceptions import (ServiceAlreadyRunning, ServiceNotRunning, SupervisorNotRunning,
+                                                 SupervisorAlreadyRunning)
+from honeycomb.servicemanager.registration import register_service, get_service_module
+
+logger = logging.getLogger(__name__)
+
+# services must inherit the modules honeycombd imported, whatever the platform's default start method is
+_mp = multiprocessing.get_context("fork") if hasattr(multiprocessing, "get_context") else multiprocessing
+
+
+def socket_path(home):
+    """Return the path to the honeycombd socket of a honeycomb home."""
+    return os.path.join(os.path.realpath(home), SUPERVISOR_SOCKET)
+
+
+def _process_stats(pid):
+    """Return (cpu seconds, resident memory bytes) of a process, (None, None) if /proc is not available."""
+    try:
+        with open("/proc/{}/stat".format(pid)) as f:
+            # the command name (field 2) may contain spaces, count fields from its closing parenthesis
+            fields = f.read().rpartition(")")[2].split()
+    except (IOError, OSError):
+        return None, None
+    cpu = (int(fields[11]) + int(fields[12])) / float(os.sysconf(str("SC_CLK_TCK")))
+    return cpu, int(fields[21]) * os.sysconf(str("SC_PAGE_SIZE"))
+
+
+@attrs
+class SupervisedService(object):
+    """A service run by honeycombd."""
+
+    name = attrib(type=str)
+    path = attrib(type=str)
+    service = attrib()
+    """:class:`honeycomb.servicemanager.models.ServiceType` of the service"""
+
+    args = attrib(type=dict)
+    """Validated service arguments"""
+
+    integrations = attrib(type=list, default=Factory(list))
+    """:class:`honeycomb.integrationmanager.models.ConfiguredIntegration` enabled for the service, shared with
+    other services using the same integrations"""
+
+    options = attrib(type=dict, default=Factory(dict))
+    """Attributes set on the service object before it runs (e.g., ``replicas``)"""
+
+    process = attrib(default=None)
+    ready = attrib(default=None)
+    """Event the service process sets when the service calls
+    :func:`honeycomb.servicemanager.base_service.ServerCustomService.signal_ready`"""
+
+    started = attrib(default=None)
+    exitcode = attrib(default=None)
+    """Exit code of the last service process that exited"""
+
+    restarts = attrib(default=0)
+    """Number of times honeycombd restarted the service after it exited"""
+
+    failures = attrib(default=0)
+    restart_at = attrib(default=None)
+    stopping = attrib(default=False)
+
+    @property
+    def running(self):
+        """Return True if the service process is alive."""
+        return self.process is not None and self.process.is_alive()
+
+    @property
+    def active(self):
+        """Return True if the service is running or waiting to be restarted."""
+        return self.running or self.restart_at is not None
+
+    @property
+    def status(self):
+        """Return a short description of the service state."""
+        if self.running:
+            return "running" if self.ready.is_set() else "starting"
+        if self.restart_at is not None:
+            return "exited with code {}, restarting in {}s".format(self.exitcode,
+                                                                   max(0, int(self.restart_at - time.time())))
+        return "not running"
+
+    def info(self):
+        """Return the service state as a JSON serializable dictionary."""
+        running = self.running
+        return {
+            "name": self.name,
+            "path": self.path,
+            "status": self.status,
+            "running": running,
+            "active": self.active,
+            "ready": running and self.ready.is_set(),
+            "pid": self.process.pid if running else None,
+            "uptime": time.time() - self.started if running else None,
+            "restarts": self.restarts,
+            "exitcode": self.exitcode,
+        }
+
+
+def _service_object(supervised):
+    """Return the service object of a supervised service, configured the same way for running and testing it."""
+    service_module = get_service_module(supervised.path)  # already imported by honeycombd
+    service_obj = service_module.service_class(alert_types=supervised.service.alert_types,
+                                               service_args=supervised.args, log_rules=supervised.service.log_rules)
+    for key, value in supervised.options.items():
+        setattr(service_obj, key, value)
+    return service_obj
+
+
+def _run_service(supervised, listener):
+    """Service process entry point, run a service with its output going to its log files."""
+    listener.close()
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(signum, signal.SIG_DFL)
+
+    log_dir = os.path.join(supervised.path, LOGS_DIR)
+    for fd, filename in ((1, STDOUTLOG), (2, STDERRLOG)):
+        logfd = os.open(os.path.join(log_dir, filename), os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+        os.dup2(logfd, fd)
+        os.close(logfd)
+
+    from honeycomb.integrationmanager.tasks import configured_integrations
+    configured_integrations.extend(supervised.integrations)
+
+    service_obj = _service_object(supervised)
+    service_obj.ready_event = supervised.ready
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(signum, service_obj._on_server_shutdown)
+
+    click.secho("[+] Launching {} (honeycombd)".format(supervised.name))
+    service_obj.run()
+
+
+def _answered_by_process(method):
+    """Mark an rpc method that forks a process answering the request on its connection, see :func:`_run_test`."""
+    method.answered_by_process = True
+    return method
+
+
+def _run_test(supervised, listener, connection):
+    """Test process entry point, run the internal test of a service and answer the request on connection."""
+    listener.close()
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(signum, signal.SIG_DFL)
+
+    try:
+        service_obj = _service_object(supervised)
+        response = {"result": list(service_obj.test()) if hasattr(service_obj, "test") else None}
+    except click.ClickException as exc:
+        response = {"error": exc.format_message()}
+    except Exception as exc:
+        response = {"error": "{}: {}".format(type(exc).__name__, exc)}
+    connection.sendall(json.dumps(response).encode("utf-8") + b"\n")
+    connection.close()
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    """Read a JSON line request, write a JSON line response."""
+
+    timeout = SUPERVISOR_REQUEST_TIMEOUT  # a client that never sends its request must not hang honeycombd
+
+    def handle(self):
+        try:
+            request = self.rfile.readline()
+        except socket.timeout:
+            logger.debug("honeycombd client sent no request in %ds", self.timeout)
+            return
+        response = self.server.supervisor.handle(request, self.connection)
+        if response is None:
+            self.server.answered_by_process.add(self.connection)
+            return
+        self.wfile.write(json.dumps(response).encode("utf-8") + b"\n")
+
+
+class _Server(socketserver.UnixStreamServer):
+    """Unix socket server leaving connections answered by another process open for it."""
+
+    def __init__(self, *args, **kwargs):
+        socketserver.UnixStreamServer.__init__(self, *args, **kwargs)
+        self.answered_by_process = set()
+
+    def shutdown_request(self, request):
+        if request in self.answered_by_process:
+            # shutting the socket down would end the connection for the process answering it, only close our copy
+            self.answered_by_process.discard(request)
+            self.close_request(request)
+        else:
+            socketserver.UnixStreamServer.shutdown_request(self, request)
+
+
+class Supervisor(object):
+    """honeycombd, runs services and answers requests about them."""
+
+    def __init__(self, home, index=None):
+        """Supervise the services of a honeycomb home.
+
+        :param home: Path to honeycomb home
+        :param index: Optional :class:`honeycomb.utils.plugin_index.PluginIndex` of the home
+        """
+        self.home = os.path.realpath(home)
+        self.index = index or PluginIndex(self.home)
+        self.socket_path = socket_path(self.home)
+        self.services = {}
+        self.integrations = {}
+        self.tests = []
+        """(process, start time) of running service tests"""
+
+        self.server = None
+        self.started = None
+        self.running = False
+
+    def bind(self):
+        """Listen on the home's socket, replacing a stale socket left by a honeycombd that did not exit cleanly.
+
+        Called before :func:`serve` so clients can connect as soon as this returns, even if honeycombd then
+        daemonizes.
+        """
+        if os.path.exists(self.socket_path):
+            if SupervisorClient(self.home).ping():
+                raise SupervisorAlreadyRunning(self.home)
+            logger.debug("removing stale socket %s", self.socket_path)
+            os.unlink(self.socket_path)
+
+        umask = os.umask(0o077)  # only the user running honeycomb may connect
+        try:
+            self.server = _Server(self.socket_path, _RequestHandler)
+        finally:
+            os.umask(umask)
+        self.server.supervisor = self
+        self.server.timeout = SUPERVISOR_POLL_INTERVAL
+        self.started = time.time()
+
+    def serve(self):
+        """Answer requests and restart services that exit until shut down, then stop all services."""
+        def terminate(signum, frame):
+            raise SystemExit()
+
+        signal.signal(signal.SIGTERM, terminate)
+        self.running = True
+        logger.debug("honeycombd listening on %s", self.socket_path, extra={"pid": os.getpid()})
+        try:
+            while self.running:
+                self.server.handle_request()
+                self.check_services()
+        finally:
+            signal.signal(signal.SIGINT, signal.SIG_IGN)  # a second ^C would leave services running
+            self.close()
+
+    def close(self):
+        """Stop all services and remove the socket."""
+        self.stop_all()
+        self.server.server_close()
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+
+    def call(self, command, **params):
+        """Run a request in this process, see :func:`SupervisorClient.call`."""
+        return getattr(self, "rpc_{}".format(command))(**params)
+
+    def handle(self, request, connection=None):
+        """Run a request, return its response.
+
+        :param request: JSON encoded ``{"command": <name>, "params": {...}}``
+        :param connection: Socket the request came from, for requests answered by another process
+        :returns: ``{"result": ...}`` or ``{"error": <message>}``, None if a forked process answers the request
+        """
+        try:
+            request = json.loads(request.decode("utf-8"))
+            method = getattr(self, "rpc_{}".format(request["command"]), None)
+            if method is None:
+                raise click.UsageError("Unknown honeycombd command {}".format(request["command"]))
+            logger.debug("honeycombd request %s", request["command"], extra={"request": request})
+            params = request.get("params", {})
+            if getattr(method, "answered_by_process", False) and connection is not None:
+                method(**dict(params, connection=connection))
+                return None
+            return {"result": method(**params)}
+        except click.ClickException as exc:
+            return {"error": exc.format_message()}
+        except Exception as exc:
+            logger.exception(exc)
+            return {"error": "{}: {}".format(type(exc).__name__, exc)}
+
+    def _spawn(self, supervised):
+        log_dir = os.path.join(supervised.path, LOGS_DIR)
+        if not os.path.exists(log_dir):
+            os.mkdir(log_dir)
+
+        supervised.ready = _mp.Event()
+        process = _mp.Process(target=_run_service, args=(supervised, self.server.socket),
+                              name="honeycombd-{}".format(supervised.name))
+        process.start()
+        supervised.process = process
+        supervised.started = time.time()
+        supervised.restart_at = None
+        supervised.stopping = False
+        logger.debug("started %s (pid: %d)", supervised.name, process.pid, extra={"service": supervised.name})
+
+    def _stop(self, supervised):
+        supervised.stopping = True
+        supervised.restart_at = None
+        process = supervised.process
+        if process is None:
+            return
+        process.terminate()
+        process.join(SERVICE_STOP_TIMEOUT)
+        if process.is_alive():
+            logger.warning("%s did not stop in %ds, killing it", supervised.name, SERVICE_STOP_TIMEOUT)
+            os.kill(process.pid, signal.SIGKILL)
+            process.join()
+        supervised.exitcode = process.exitcode
+        supervised.process = None
+        logger.debug("stopped %s (exit code %s)", supervised.name, process.exitcode,
+                     extra={"service": supervised.name})
+
+    def _configure_integration(self, integration_path):
+        """Return an integration configured once and shared by the services using it, until its args change."""
+        from honeycomb.integrationmanager.tasks import create_configured_integration
+        try:
+            args_mtime = os.stat(os.path.join(integration_path, ARGS_JSON)).st_mtime
+        except OSError:
+            args_mtime = None  # create_configured_integration reports it is not configured
+        cached = self.integrations.get(integration_path)
+        if cached is None or cached[0] != args_mtime:
+            cached = self.integrations[integration_path] = (args_mtime, create_configured_integration(integration_path))
+        return cached[1]
+
+    def _get(self, service):
+        """Return a supervised service by name, raise if it is not running."""
+        supervised = self.services.get(service)
+        if supervised is None or not supervised.active:
+            raise ServiceNotRunning(service)
+        return supervised
+
+    def check_services(self):
+        """Restart services that exited without being stopped, once their backoff passed."""
+        now = time.time()
+        self._reap_tests(now)
+        for supervised in self.services.values():
+            process = supervised.process
+            if process is not None and not process.is_alive():
+                supervised.process = None
+                supervised.exitcode = process.exitcode
+                if supervised.stopping:
+                    continue
+                if now - supervised.started >= RESTART_BACKOFF_MAX:
+                    supervised.failures = 0
+                backoff = min(2 ** supervised.failures, RESTART_BACKOFF_MAX)
+                supervised.failures += 1
+                supervised.restart_at = now + backoff
+                logger.warning("%s exited with code %s, restarting it in %ds", supervised.name, process.exitcode,
+                               backoff, extra={"service": supervised.name})
+            elif process is None and supervised.restart_at is not None and now >= supervised.restart_at:
+                supervised.restarts += 1
+                self._spawn(supervised)
+
+    def _reap_tests(self, now):
+        """Collect finished test processes, kill those that take longer than clients wait for them."""
+        for test in list(self.tests):
+            process, started = test
+            if process.is_alive() and now - started > SUPERVISOR_TIMEOUT:
+                logger.warning("%s did not finish in %ds, killing it", process.name, SUPERVISOR_TIMEOUT)
+                os.kill(process.pid, signal.SIGKILL)
+                process.join()
+            if not process.is_alive():
+                self.tests.remove(test)
+
+    def stop_all(self):
+        """Stop all services, return their names."""
+        stopped = []
+        for supervised in self.services.values():
+            if supervised.active:
+                self._stop(supervised)
+                stopped.append(supervised.name)
+        return stopped
+
+    def rpc_ping(self):
+        """Return honeycombd's pid, version and uptime."""
+        return {"pid": os.getpid(), "version": __version__, "uptime": time.time() - self.started}
+
+    def rpc_start(self, service, args=(), integrations=(), editable=False, options=None):
+        """Start a service.
+
+        :param service: Service name, or path to service folder if editable
+        :param args: Service arguments in ``key=value`` format
+        :param integrations: Integrations to enable, names or paths if editable
+        :param editable: Load service and integrations directly from their paths
+        :param options: Attributes to set on the service object, e.g., ``{"keep_container": true}``
+        :returns: :func:`SupervisedService.info` of the service
+        """
+        service_path = plugin_utils.get_plugin_path(self.home, SERVICES, service, editable)
+        name = os.path.basename(os.path.realpath(service_path))
+        current = self.services.get(name)
+        if current is not None and current.running:
+            raise ServiceAlreadyRunning(name)
+
+        service_type = register_service(service_path, self.index)
+        service_args = plugin_utils.parse_plugin_args(args, config_utils.get_config_parameters(service_path))
+        get_service_module(service_path)  # imported once here, inherited by the service process
+
+        configured_integrations = [
+            self._configure_integration(plugin_utils.get_plugin_path(self.home, INTEGRATIONS, _, editable))
+            for _ in integrations]
+
+        if current is not None:
+            self._stop(current)
+        supervised = SupervisedService(name=name, path=service_path, service=service_type, args=service_args,
+                                       integrations=configured_integrations, options=options or {})
+        with open(os.path.join(service_path, ARGS_JSON), "w") as f:
+            f.write(json.dumps(service_args))
+        self.services[name] = supervised
+        self._spawn(supervised)
+        return supervised.info()
+
+    def rpc_stop(self, service):
+        """Stop a service, return its :func:`SupervisedService.info`."""
+        supervised = self._get(service)
+        self._stop(supervised)
+        return supervised.info()
+
+    def rpc_restart(self, service):
+        """Restart a service without importing it again, return its :func:`SupervisedService.info`."""
+        supervised = self.services.get(service)
+        if supervised is None:
+            raise ServiceNotRunning(service)
+        self._stop(supervised)
+        self._spawn(supervised)
+        return supervised.info()
+
+    def rpc_status(self, services=None):
+        """Return {name: :func:`SupervisedService.info`} of services (default: all) honeycombd knows of."""
+        return {name: supervised.info() for name, supervised in self.services.items()
+                if services is None or name in services}
+
+    def rpc_metrics(self, services=None):
+        """Return :func:`rpc_status` with the cpu time and memory usage of honeycombd and every service."""
+        cpu, rss = _process_stats(os.getpid())
+        metrics = dict(self.rpc_ping(), cpu=cpu, rss=rss, services=self.rpc_status(services))
+        for info in metrics["services"].values():
+            info["cpu"], info["rss"] = _process_stats(info["pid"]) if info["running"] else (None, None)
+        return metrics
+
+    @_answered_by_process
+    def rpc_test(self, service, connection=None):
+        """Run the internal test method of a service, return the alerts it triggers (None if it has no test).
+
+        The test runs in a process forked for it, which answers the request on connection. Called in process
+        (without a connection), this waits for the test process and returns its answer.
+        """
+        supervised = self._get(service)
+        reader = None
+        if connection is None:
+            reader, connection = socket.socketpair()
+        process = _mp.Process(target=_run_test, args=(supervised, self.server.socket, connection),
+                              name="honeycombd-test-{}".format(supervised.name))
+        process.daemon = True  # killed if honeycombd exits before the test finishes
+        process.start()
+        self.tests.append((process, time.time()))
+        if reader is None:
+            return None
+
+        connection.close()
+        try:
+            reader.settimeout(SUPERVISOR_TIMEOUT)
+            line = reader.makefile("rb").readline()
+        finally:
+            reader.close()
+        response = json.loads(line.decode("utf-8")) if line else {"error": "{} test exited".format(service)}
+        if "error" in response:
+            raise click.ClickException(response["error"])
+        return response["result"]
+
+    def rpc_shutdown(self):
+        """Stop all services and exit, return the names of the stopped services."""
+        self.running = False
+        return self.stop_all()
+
+
+class SupervisorClient(object):
+    """Send requests to the honeycombd of a honeycomb home."""
+
+    def __init__(self, home, timeout=SUPERVISOR_TIMEOUT):
+        """Connect to honeycombd on every request.
+
+        :param home: Path to honeycomb home
+        :param timeout: Seconds to wait for a reply
+        """
+        self.home = os.path.realpath(home)
+        self.socket_path = socket_path(self.home)
+        self.timeout = timeout
+
+    def call(self, command, **params):
+        """Send a request to honeycombd and return its result.
+
+        :raises: :class:`honeycomb.servicemanager.exceptions.SupervisorNotRunning` if honeycombd is not running,
+                 :class:`click.ClickException` with honeycombd's error message if the request failed
+        """
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        try:
+            try:
+                sock.connect(self.socket_path)
+            except socket.error as exc:
+                if exc.errno in (errno.ENOENT, errno.ECONNREFUSED):
+                    raise SupervisorNotRunning(self.home)
+                raise
+            sock.sendall(json.dumps({"command": command, "params": params}).encode("utf-8") + b"\n")
+            response = json.loads(sock.makefile("rb").readline().decode("utf-8"))
+        finally:
+            sock.close()
+
+        if "error" in response:
+            raise click.ClickException(response["error"])
+        return response["result"]
+
+    def ping(self):
+        """Return True if honeycombd is running."""
+        try:
+            self.call("ping")
+        except SupervisorNotRunning:
+            return False
+        return True
+
+
+def get_supervisor(home):
+    """Return a :class:`SupervisorClient` if honeycombd is running for home, None otherwise."""
+    client = SupervisorClient(home)
+    if os.path.exists(client.socket_path) and client.ping():
+        return client
+    return None
+
+
+def start_services(honeycombd, services, timeout=SERVICE_READY_TIMEOUT):
+    """Start services concurrently, then wait until every one of them is ready or exited.
+
+    All services are started before waiting for any of them, so the wait is as long as the slowest service takes
+    to call :func:`honeycomb.servicemanager.base_service.ServerCustomService.signal_ready`.
+
+    :param honeycombd: :class:`Supervisor` or :class:`SupervisorClient`
+    :param services: List of :func:`Supervisor.rpc_start` parameters, one per service
+    :param timeout: Seconds to wait for services to be ready
+    :returns: {name: :func:`SupervisedService.info`}, check ``ready`` for services that failed to start in time
+    :raises: The error of the first service that cannot be started, after stopping the services started before it
+    """
+    names = []
+    try:
+        for params in services:
+            names.append(honeycombd.call("start", **params)["name"])
+    except Exception:
+        for name in names:
+            honeycombd.call("stop", service=name)
+        raise
+
+    deadline = time.time() + timeout
+    while True:
+        status = honeycombd.call("status", services=names)
+        if time.time() >= deadline or all(_["ready"] or not _["running"] for _ in status.values()):
+            return status
+        time.sleep(READY_POLL_INTERVAL)
+
+
+def daemonize(supervisor, log):
+    """Detach honeycombd from the terminal, keeping its socket and log files open.
+
+    :param supervisor: :class:`Supervisor` already bound to its socket
+    :param log: File object for honeycombd's stdout and stderr
+    """
+    import daemon  # python-daemon is only needed to daemonize
+
+    files_preserve = [supervisor.server.fileno()]
+    for handler in logging.getLogger().handlers:
+        if hasattr(handler, "stream") and hasattr(handler.stream, "fileno"):
+            files_preserve.append(handler.stream.fileno())
+    context = daemon.DaemonContext(stdout=log, stderr=log, files_preserve=files_preserve,
+                                   working_directory=supervisor.home, detach_process=True)
+    context.open()
@@ -0,0 +1,332 @@
+# -*- coding: utf-8 -*-
+"""Honeycomb offline deployment bundles.
+
+A bundle is a gzipped tar of installed plugins, as they are installed: with their dependencies (``venv`` or
+``venv.zip``), their bytecode and their ``.args.json``, plus an optional honeycomb.yml::
+
+    services/<name>/...
+    integrations/<name>/...
+    honeycomb.yml
+    bundle.json
+
+``bundle.json`` comes last and holds the SHA-256 of every file, it is written while the archive is streamed out and
+checked after it is streamed in. The SHA-256 of the whole archive is written next to it (``<bundle>.sha256``).
+
+Loading a bundle is one streaming pass over the archive into a staging folder in the home, nothing is downloaded
+and pip never runs. Only once every file (and the archive itself) matches its checksum are the plugins renamed into
+place.
+"""
+
+from __future__ import unicode_literals, absolute_import
+
+import io
+import os
+import sys
+import json
+import time
+import shutil
+import hashlib
+import logging
+import platform
+import tarfile
+import tempfile
+
+import click
+
+from honeycomb import __version__, defs, exceptions
+from honeycomb.utils.plugin_utils import BUFFER_SIZE, exchange, make_staging_dir, remove_stale_staging_dirs
+
+logger = logging.getLogger(__name__)
+
+BUNDLE_MANIFEST = "bundle.json"
+BUNDLE_VERSION = 1
+CONFIG_FILE = "honeycomb.yml"
+EXCLUDE = ("logs", )  # service logs, see honeycomb.servicemanager.defs.LOGS_DIR
+
+VERSION = "version"
+HONEYCOMB = "honeycomb"
+PYTHON = "python"
+PLATFORM = "platform"
+FILES = "files"
+
+
+class _HashingFile(object):
+    """File wrapper hashing everything read from or written to it."""
+
+    def __init__(self, f):
+        """Wrap f."""
+        self.f = f
+        self.sha256 = hashlib.sha256()
+
+    def read(self, size=-1):
+        """Read and hash."""
+        data = self.f.read(size)
+        self.sha256.update(data)
+        return data
+
+    def write(self, data):
+        """Hash and write."""
+        self.sha256.update(data)
+        return self.f.write(data)
+
+    def flush(self):
+        """Flush the wrapped file."""
+        self.f.flush()
+
+
+def _python():
+    return "{}.{}".format(*sys.version_info[:2])
+
+
+def _platform():
+    return "{}-{}".format(sys.platform, platform.machine())
+
+
+def _add(tar, path, arcname, files):
+    info = tar.gettarinfo(path, arcname)
+    info.uid = info.gid = 0
+    info.uname = info.gname = ""
+    if info.isreg():
+        with open(path, "rb") as f:
+            hashing = _HashingFile(f)
+            tar.addfile(info, hashing)
+        files[arcname] = hashing.sha256.hexdigest()
+    elif info.islnk():
+        # hardlinks between dependencies (see PluginCache.dedup_tree) stay hardlinks
+        tar.addfile(info)
+        files[arcname] = files[info.linkname]
+    elif info.issym():
+        tar.addfile(info)
+        files[arcname] = hashlib.sha256(info.linkname.encode("utf-8")).hexdigest()
+    elif info.isdir():
+        tar.addfile(info)
+
+
+def _add_plugin(tar, plugin_path, arcname, files):
+    # editable plugins are symlinks, their folder is bundled
+    plugin_path = os.path.realpath(plugin_path)
+    for root, dirs, filenames in os.walk(plugin_path):
+        relroot = os.path.relpath(root, plugin_path)
+        arcroot = arcname if relroot == os.curdir else "{}/{}".format(arcname, relroot.replace(os.sep, "/"))
+        if root == plugin_path:
+            dirs[:] = [_ for _ in dirs if _ not in EXCLUDE]
+        dirs.sort()
+        _add(tar, root, arcroot, files)
+        for name in sorted(filenames) + [_ for _ in dirs if os.path.islink(os.path.join(root, _))]:
+            _add(tar, os.path.join(root, name), "{}/{}".format(arcroot, name), files)
+
+
+def create_bundle(home, path, services=None, integrations=None, config=None):
+    """Pack installed plugins into a bundle.
+
+    :param home: Path to honeycomb home
+    :param path: Path of the bundle to write
+    :param services: Names of services to bundle, None for all installed services
+    :param integrations: Names of integrations to bundle, None for all installed integrations
+    :param config: Optional path to a honeycomb.yml to include
+    :returns: Tuple of the SHA-256 of the bundle and the number of files in it
+    """
+    start = time.time()
+    files = {}
+    plugins = []
+    for plugin_types, names in ((defs.SERVICES, services), (defs.INTEGRATIONS, integrations)):
+        plugins_path = os.path.join(home, plugin_types)
+        if names is None:
+            names = sorted(_ for _ in os.listdir(plugins_path)
+                           if not _.startswith(".") and os.path.isdir(os.path.join(plugins_path, _)))
+        for name in names:
+            if not os.path.isdir(os.path.join(plugins_path, name)):
+                raise exceptions.PluginNotInstalled(name)
+            plugins.append((os.path.join(plugins_path, name), "{}/{}".format(plugin_types, name)))
+
+    fd, tmppath = tempfile.mkstemp(prefix=os.path.basename(path), dir=os.path.dirname(os.path.abspath(path)))
+    try:
+        with os.fdopen(fd, "wb") as f:
+            out = _HashingFile(f)
+            tar = tarfile.open(fileobj=out, mode="w|gz", format=tarfile.PAX_FORMAT)
+            for plugin_path, arcname in plugins:
+                logger.debug("bundling %s", arcname)
+                _add_plugin(tar, plugin_path, arcname, files)
+            if config:
+                _add(tar, config, CONFIG_FILE, files)
+
+            manifest = json.dumps({VERSION: BUNDLE_VERSION, HONEYCOMB: __version__, PYTHON: _python(),
+                                   PLATFORM: _platform(), FILES: files}, indent=2, sort_keys=True).encode("utf-8")
+            info = tarfile.TarInfo(BUNDLE_MANIFEST)
+            info.size = len(manifest)
+            info.mtime = time.time()
+            tar.addfile(info, io.BytesIO(manifest))
+            tar.close()
+        os.rename(tmppath, path)
+    except BaseException:
+        if os.path.exists(tmppath):
+            os.remove(tmppath)
+        raise
+
+    sha256sum = out.sha256.hexdigest()
+    with open(path + defs.CHECKSUM_SUFFIX, "w") as f:
+        f.write("{}  {}\n".format(sha256sum, os.path.basename(path)))
+    logger.debug("bundled %d plugins (%d files) into %s in %.2fs", len(plugins), len(files), path,
+                 time.time() - start)
+    return sha256sum, len(files)
+
+
+def _read_checksum(path):
+    try:
+        with open(path + defs.CHECKSUM_SUFFIX, "r") as f:
+            return f.read().split()[0]
+    except (IOError, OSError, IndexError):
+        return None
+
+
+def _member_path(stagingdir, name, bundle):
+    """Return where a member is extracted, members outside of a plugin folder are refused."""
+    parts = name.split("/")
+    in_plugin = parts[0] in (defs.SERVICES, defs.INTEGRATIONS) and len(parts) > 1 and not parts[1].startswith(".")
+    if name.startswith("/") or ".." in parts or not (in_plugin or name == CONFIG_FILE):
+        raise exceptions.InvalidBundle(bundle, "unexpected file {}".format(name))
+    target = os.path.join(stagingdir, *parts)
+
+    # symlinks extracted before this member must not lead it out of its plugin folder
+    root = stagingdir if name == CONFIG_FILE else os.path.join(stagingdir, parts[0], parts[1])
+    resolved = os.path.realpath(target)
+    if resolved != root and not resolved.startswith(root + os.sep):
+        raise exceptions.InvalidBundle(bundle, "{} resolves outside of its plugin".format(name))
+    return target
+
+
+def _extract(tar, member, path):
+    fileobj = tar.extractfile(member)
+    sha256 = hashlib.sha256()
+    # never write through a symlink or over a file that is already there
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, "O_NOFOLLOW", 0) | getattr(os, "O_BINARY", 0),
+                 0o600)
+    with os.fdopen(fd, "wb") as f:
+        for chunk in iter(lambda: fileobj.read(BUFFER_SIZE), b""):
+            sha256.update(chunk)
+            f.write(chunk)
+        if hasattr(os, "fchmod"):
+            os.fchmod(f.fileno(), member.mode & 0o777)
+        else:
+            os.chmod(path, member.mode & 0o777)
+    return sha256.hexdigest()
+
+
+def _unpack(path, stagingdir, sha256sum):
+    """Stream a bundle into stagingdir, return its manifest once everything was verified."""
+    hashes = {}
+    regular = set()
+    manifest = None
+    stagingdir = os.path.realpath(stagingdir)
+    with open(path, "rb") as f:
+        src = _HashingFile(f)
+        try:
+            tar = tarfile.open(fileobj=src, mode="r|gz")
+            for member in tar:
+                if member.name == BUNDLE_MANIFEST:
+                    manifest = json.loads(tar.extractfile(member).read().decode("utf-8"))
+                    continue
+                target = _member_path(stagingdir, member.name, path)
+                if member.isdir():
+                    if not os.path.isdir(target):
+                        os.makedirs(target)
+                    continue
+                if not os.path.isdir(os.path.dirname(target)):
+                    os.makedirs(os.path.dirname(target))
+                if len(member.name.split("/")) == 2 and member.name != CONFIG_FILE:
+                    raise exceptions.InvalidBundle(path, "{} is not a folder".format(member.name))
+                if member.isreg():
+                    hashes[member.name] = _extract(tar, member, target)
+                    regular.add(member.name)
+                elif member.islnk() and member.linkname in regular:
+                    os.link(_member_path(stagingdir, member.linkname, path), target)
+                    hashes[member.name] = hashes[member.linkname]
+                    regular.add(member.name)
+                elif member.issym():
+                    # relative links below their own folder only, so no chain of links can leave the plugin
+                    if member.linkname.startswith("/") or os.path.isabs(member.linkname) or \
+                            ".." in member.linkname.replace(os.sep, "/").split("/"):
+                        raise exceptions.InvalidBundle(path, "{} links outside of its plugin".format(member.name))
+                    os.symlink(member.linkname, target)
+                    hashes[member.name] = hashlib.sha256(member.linkname.encode("utf-8")).hexdigest()
+                    continue
+                else:
+                    raise exceptions.InvalidBundle(path, "unsupported file {}".format(member.name))
+                # timestamp based bytecode is only valid if its source keeps its mtime
+                os.utime(target, (member.mtime, member.mtime))
+            tar.close()
+            # the gzip stream may end before the file does, the checksum covers all of it
+            for _ in iter(lambda: src.read(BUFFER_SIZE), b""):
+                pass
+        except (tarfile.TarError, EOFError, IOError, OSError, ValueError) as exc:
+            logger.debug(str(exc), exc_info=True)
+            raise exceptions.InvalidBundle(path, str(exc))
+
+    if sha256sum and src.sha256.hexdigest() != sha256sum.lower():
+        raise exceptions.BundleChecksumMismatch(path)
+    if not manifest or manifest.get(VERSION) != BUNDLE_VERSION:
+        raise exceptions.InvalidBundle(path, "missing or unsupported {}".format(BUNDLE_MANIFEST))
+    if manifest[FILES] != hashes:
+        logger.debug("mismatching files: %s", sorted(set(manifest[FILES].items()) ^ set(hashes.items())))
+        raise exceptions.BundleChecksumMismatch(path)
+    return manifest
+
+
+def load_bundle(path, home, sha256sum=None, force=False):
+    """Install the plugins of a bundle into a home, without network access or pip.
+
+    :param path: Path to the bundle
+    :param home: Path to honeycomb home
+    :param sha256sum: Expected SHA-256 of the bundle, read from ``<bundle>.sha256`` if not given (if it exists)
+    :param force: Replace plugins (and honeycomb.yml) that are already in home
+    :returns: Tuple of the lists of loaded services and integrations, and the path of the loaded honeycomb.yml (or
+              None if the bundle has none)
+    """
+    start = time.time()
+    sha256sum = sha256sum or _read_checksum(path)
+    if not sha256sum:
+        logger.debug("%s has no checksum, only verifying its files", path)
+    if not os.path.isdir(home):
+        os.makedirs(home)
+    remove_stale_staging_dirs(home)
+    stagingdir = make_staging_dir(home)
+    try:
+        manifest = _unpack(path, stagingdir, sha256sum)
+        if (manifest.get(PYTHON), manifest.get(PLATFORM)) != (_python(), _platform()):
+            click.secho("[-] {} was created with python {} on {}, dependencies with extension modules may fail to "
+                        "load".format(path, manifest.get(PYTHON), manifest.get(PLATFORM)), fg="yellow")
+
+        # check everything first, a conflict leaves the home as it was
+        moves = []
+        loaded = {}
+        for plugin_types in (defs.SERVICES, defs.INTEGRATIONS):
+            loaded[plugin_types] = []
+            if not os.path.isdir(os.path.join(stagingdir, plugin_types)):
+                continue
+            for name in sorted(os.listdir(os.path.join(stagingdir, plugin_types))):
+                plugin_path = os.path.join(home, plugin_types, name)
+                if os.path.lexists(plugin_path) and not force:
+                    raise exceptions.PluginAlreadyInstalled(name)
+                moves.append((os.path.join(stagingdir, plugin_types, name), plugin_path))
+                loaded[plugin_types].append(name)
+        config_path = None
+        if os.path.exists(os.path.join(stagingdir, CONFIG_FILE)):
+            config_path = os.path.join(home, CONFIG_FILE)
+            if os.path.exists(config_path) and not force:
+                raise click.ClickException("{} already exists, use --force to replace it".format(config_path))
+            moves.append((os.path.join(stagingdir, CONFIG_FILE), config_path))
+
+        for src, dst in moves:
+            if not os.path.isdir(os.path.dirname(dst)):
+                os.makedirs(os.path.dirname(dst))
+            if os.path.isdir(src) and os.path.lexists(dst):
+                exchange(src, dst)  # the replaced plugin is removed with the staging folder
+            else:
+                if os.name != "posix" and os.path.exists(dst):
+                    os.remove(dst)
+                os.rename(src, dst)
+    finally:
+        shutil.rmtree(stagingdir, ignore_errors=True)
+
+    logger.debug("loaded %d files from %s in %.2fs", len(manifest[FILES]), path, time.time() - start)
+    return loaded[defs.SERVICES], loaded[defs.INTEGRATIONS], config_path
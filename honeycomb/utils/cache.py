@@ -0,0 +1,313 @@
+# -*- coding: utf-8 -*-
+"""Honeycomb plugin cache.
+
+Downloaded plugin zips are stored once per content hash (``blobs/<sha256>.zip``) in a cache directory that can be
+shared between homes. ``index.json`` maps every plugin (``<plugin type>/<name>``) to the blob of its last download
+and the ETag it was served with, and records when every blob was last used so the least recently used blobs are
+evicted once the cache grows over its size limit. Downloads in progress are kept in ``downloads/``, which only the
+user running honeycomb can access, so an interrupted download is resumed from a file nobody else could have written.
+
+The cache also keeps a wheelhouse shared by the dependency installs of all plugins, and a content addressed store
+(``store/``) of the files installed into plugin dependency dirs so identical files are hardlinked instead of copied.
+"""
+
+from __future__ import unicode_literals, absolute_import
+
+import os
+import json
+import stat
+import time
+import errno
+import shutil
+import hashlib
+import logging
+import tempfile
+import threading
+
+import click
+
+logger = logging.getLogger(__name__)
+
+INDEX_FILE = "index.json"
+BLOBS_DIR = "blobs"
+WHEELS_DIR = "wheels"
+STORE_DIR = "store"
+DOWNLOADS_DIR = "downloads"
+STORE_FORMAT = "{}-{:o}"
+LINK_SUFFIX = ".hclink"
+BLOB_FORMAT = "{}.zip"
+HASH_BLOCK_SIZE = 64 * 1024
+DEFAULT_CACHE_SIZE = 512  # MiB
+
+ENTRIES = "entries"
+BLOBS = "blobs"
+SHA256 = "sha256"
+ETAG = "etag"
+SIZE = "size"
+USED = "used"
+
+
+def default_cache_dir():
+    """Return the per user cache directory (``$XDG_CACHE_HOME/honeycomb`` on posix)."""
+    if os.name == "posix":
+        return os.path.join(os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache"), "honeycomb")
+    return os.path.join(click.get_app_dir("honeycomb"), "cache")
+
+
+def hash_file(path):
+    """Return the SHA-256 hex digest of a file."""
+    sha256 = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b""):
+            sha256.update(block)
+    return sha256.hexdigest()
+
+
+def owned_by_user(st):
+    """Return True if the stat result st is of a file owned by the current user (always True without uids)."""
+    return not hasattr(os, "geteuid") or st.st_uid == os.geteuid()
+
+
+def make_private_dir(path):
+    """Create path (and missing parents) accessible only by the current user, refuse it if someone else owns it."""
+    if not os.path.isdir(path):
+        try:
+            os.makedirs(path, 0o700)
+        except OSError as exc:
+            if exc.errno != errno.EEXIST:
+                raise
+    st = os.lstat(path)
+    if not stat.S_ISDIR(st.st_mode) or not owned_by_user(st):
+        raise OSError(errno.EPERM, "{} is not a folder owned by the current user".format(path))
+    if stat.S_IMODE(st.st_mode) & 0o077:
+        os.chmod(path, 0o700)
+    return path
+
+
+class PluginCache(object):
+    """Content addressed plugin zip cache with LRU eviction."""
+
+    def __init__(self, path, max_size=DEFAULT_CACHE_SIZE * 1024 * 1024, offline=False):
+        """Open a cache, it is created when something is first added to it.
+
+        :param path: Cache directory
+        :param max_size: Maximum total size of cached blobs in bytes
+        :param offline: Never go online, install plugins only from the cache
+        """
+        self.path = path
+        self.max_size = max_size
+        self.offline = offline
+        self._lock = threading.Lock()
+        self.wheel_lock = threading.Lock()
+        """Serializes builds into :attr:`wheelhouse`, pip does not write wheels atomically."""
+
+    def makedirs(self, *parts):
+        """Return the path of a folder in the cache, created (with the cache) on first use.
+
+        Nothing is created until something is written to the cache, commands that do not use it work even if the
+        cache path is not writable.
+        """
+        if not os.path.isdir(self.path):
+            try:
+                os.makedirs(self.path, 0o700)
+            except OSError as exc:
+                if exc.errno != errno.EEXIST:
+                    raise
+        path = os.path.join(self.path, *parts)
+        if not os.path.isdir(path):
+            try:
+                os.makedirs(path)
+            except OSError as exc:
+                if exc.errno != errno.EEXIST:
+                    raise
+        return path
+
+    @property
+    def index_path(self):
+        """Path of the cache index."""
+        return os.path.join(self.path, INDEX_FILE)
+
+    @property
+    def wheelhouse(self):
+        """Directory of wheels shared by the dependency installs of all plugins."""
+        return self.makedirs(WHEELS_DIR)
+
+    def download_path(self, plugin_type, name):
+        """Return the path to download a plugin zip to, in a folder private to the current user."""
+        return os.path.join(make_private_dir(os.path.join(self.makedirs(), DOWNLOADS_DIR)),
+                            BLOB_FORMAT.format("{}_{}".format(plugin_type, name)))
+
+    def blob_path(self, sha256):
+        """Return the path of a cached blob."""
+        return os.path.join(self.path, BLOBS_DIR, BLOB_FORMAT.format(sha256))
+
+    @staticmethod
+    def key(plugin_type, name):
+        """Return the index key of a plugin."""
+        return "{}/{}".format(plugin_type, name)
+
+    def _load(self):
+        try:
+            with open(self.index_path, "r") as f:
+                index = json.load(f)
+        except (IOError, OSError, ValueError):
+            index = {}
+        index.setdefault(ENTRIES, {})
+        index.setdefault(BLOBS, {})
+        return index
+
+    def _save(self, index):
+        # write to a temporary file and rename it so readers never see a partial index
+        fd, tmppath = tempfile.mkstemp(prefix=".index", dir=self.makedirs())
+        with os.fdopen(fd, "w") as f:
+            json.dump(index, f)
+        if os.name != "posix" and os.path.exists(self.index_path):
+            os.remove(self.index_path)
+        os.rename(tmppath, self.index_path)
+
+    def lookup(self, plugin_type, name):
+        """Return the cache entry of a plugin, a dictionary with its ``sha256`` and ``etag``, or None.
+
+        Looking up an entry marks its blob as recently used.
+        """
+        with self._lock:
+            index = self._load()
+            entry = index[ENTRIES].get(self.key(plugin_type, name))
+            if not entry or not os.path.exists(self.blob_path(entry[SHA256])):
+                return None
+            index[BLOBS].setdefault(entry[SHA256], {SIZE: 0})[USED] = time.time()
+            self._save(index)
+            return entry
+
+    def add(self, plugin_type, name, filepath, move=False, etag=None):
+        """Add a plugin zip to the cache.
+
+        :param filepath: Path to the plugin zip
+        :param move: Move the file into the cache instead of linking (or copying) it
+        :param etag: ETag the zip was served with
+        :returns: Path of the cached blob
+        """
+        sha256 = hash_file(filepath)
+        blob = self.blob_path(sha256)
+        if not os.path.exists(blob):
+            self._store(filepath, blob, move)
+        elif move:
+            os.remove(filepath)
+
+        with self._lock:
+            index = self._load()
+            index[ENTRIES][self.key(plugin_type, name)] = {SHA256: sha256, ETAG: etag}
+            index[BLOBS][sha256] = {SIZE: os.path.getsize(blob), USED: time.time()}
+            self._evict(index, keep=sha256)
+            self._save(index)
+        logger.debug("cached %s %s (%s)", plugin_type, name, sha256)
+        return blob
+
+    def _store(self, src, blob, move):
+        """Move or copy src to blob, the blob only appears once it is complete."""
+        if move:
+            self.makedirs(BLOBS_DIR)
+            try:
+                os.rename(src, blob)
+                return
+            except OSError:
+                pass  # not on the same filesystem
+
+        fd, tmppath = tempfile.mkstemp(dir=self.makedirs(BLOBS_DIR))
+        os.close(fd)
+        shutil.copyfile(src, tmppath)
+        os.rename(tmppath, blob)
+        if move:
+            os.remove(src)
+
+    def _evict(self, index, keep=None):
+        """Remove least recently used blobs (and the entries pointing to them) until the cache fits max_size."""
+        total = sum(blob[SIZE] for blob in index[BLOBS].values())
+        for sha256, blob in sorted(index[BLOBS].items(), key=lambda item: item[1].get(USED, 0)):
+            if total <= self.max_size:
+                break
+            if sha256 == keep:
+                continue
+            logger.debug("evicting %s from cache", sha256)
+            try:
+                os.remove(self.blob_path(sha256))
+            except OSError:
+                pass
+            total -= blob[SIZE]
+            del index[BLOBS][sha256]
+            for key in [key for key, entry in index[ENTRIES].items() if entry[SHA256] == sha256]:
+                del index[ENTRIES][key]
+
+    def store_path(self, sha256, mode):
+        """Return the path of a file in the store, files are keyed by content and permissions."""
+        return os.path.join(self.path, STORE_DIR, sha256[:2], STORE_FORMAT.format(sha256, stat.S_IMODE(mode)))
+
+    def dedup_tree(self, path):
+        """Replace every file under path with a hardlink to an identical file in the store.
+
+        Files not in the store yet are added to it. Nothing is changed if the store is on a different filesystem.
+
+        :returns: Tuple of the number of files and bytes that are now shared instead of copied
+        """
+        files = saved = 0
+        self.makedirs(STORE_DIR)
+        for root, _, filenames in os.walk(path):
+            for filename in filenames:
+                filepath = os.path.join(root, filename)
+                st = os.lstat(filepath)
+                if not stat.S_ISREG(st.st_mode):
+                    continue
+                stored = self.store_path(hash_file(filepath), st.st_mode)
+                try:
+                    if self._link_from_store(stored, filepath, st):
+                        files += 1
+                        saved += st.st_size
+                except OSError as exc:
+                    if exc.errno in (errno.EXDEV, errno.EPERM, errno.EMLINK):
+                        logger.debug("cannot hardlink %s to the store: %s", filepath, exc)
+                        return files, saved
+                    raise
+        return files, saved
+
+    @staticmethod
+    def _link_from_store(stored, filepath, st):
+        """Link filepath to stored if it exists, otherwise add filepath to the store.
+
+        :returns: True if filepath is now a link to a file that was already stored
+        """
+        if not os.path.exists(stored):
+            if not os.path.exists(os.path.dirname(stored)):
+                try:
+                    os.makedirs(os.path.dirname(stored))
+                except OSError as exc:
+                    if exc.errno != errno.EEXIST:
+                        raise
+            try:
+                os.link(filepath, stored)
+                return False
+            except OSError as exc:
+                if exc.errno != errno.EEXIST:  # someone else stored it first, link to theirs
+                    raise
+
+        stored_stat = os.stat(stored)
+        if (stored_stat.st_dev, stored_stat.st_ino) == (st.st_dev, st.st_ino):
+            return False
+        tmppath = filepath + LINK_SUFFIX
+        os.link(stored, tmppath)
+        os.rename(tmppath, filepath)
+        return True
+
+    def prune_store(self):
+        """Remove files from the store that are no longer used by any plugin.
+
+        :returns: Number of bytes freed
+        """
+        freed = 0
+        for root, _, filenames in os.walk(os.path.join(self.path, STORE_DIR)):
+            for filename in filenames:
+                filepath = os.path.join(root, filename)
+                st = os.lstat(filepath)
+                if st.st_nlink == 1:
+                    os.remove(filepath)
+                    freed += st.st_size
+        return freed
@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+"""Honeycomb remote plugin catalog.
+
+The online repository may publish a single ``catalog.json`` describing all of its plugins:
+
+.. code-block:: json
+
+    {
+        "services": {
+            "simple_http": {
+                "label": "Simple HTTP",
+                "version": "1.0.2",
+                "updated": "2018-05-01",
+                "size": 4096,
+                "sha256": "...",
+                "requirements": ["requests"]
+            }
+        },
+        "integrations": {}
+    }
+
+The catalog is kept in the plugin cache directory and revalidated (ETag / Last-Modified) once it is older than
+:obj:`honeycomb.defs.CATALOG_TTL`, so ``list -r`` and ``show -r`` usually do not go online at all and keep working
+offline. The catalog of one repository is cached at a time. Repositories without a catalog are served from their
+``<type>s.txt`` lists as before.
+"""
+
+from __future__ import unicode_literals, absolute_import
+
+import os
+import json
+import time
+import logging
+import tempfile
+
+from honeycomb import defs, exceptions
+from honeycomb.utils.repo import get_repo_url, get_session
+
+logger = logging.getLogger(__name__)
+
+CATALOG_CACHE_FILE = "catalog.json"
+
+REPO = "repo"
+FETCHED = "fetched"
+ETAG = "etag"
+LAST_MODIFIED = "last_modified"
+CATALOG = "catalog"
+
+
+def _cache_path(cache):
+    return os.path.join(cache.path, CATALOG_CACHE_FILE) if cache else None
+
+
+def _load_cached(cache):
+    try:
+        with open(_cache_path(cache), "r") as f:
+            return json.load(f)
+    except (TypeError, IOError, OSError, ValueError):
+        return None
+
+
+def _save_cached(cache, cached):
+    if not cache:
+        return
+    # write to a temporary file and rename it so readers never see a partial catalog
+    fd, tmppath = tempfile.mkstemp(prefix=CATALOG_CACHE_FILE, dir=cache.makedirs())
+    with os.fdopen(fd, "w") as f:
+        json.dump(cached, f)
+    if os.name != "posix" and os.path.exists(_cache_path(cache)):
+        os.remove(_cache_path(cache))
+    os.rename(tmppath, _cache_path(cache))
+
+
+def get_catalog(cache=None, ttl=defs.CATALOG_TTL, repo=None):
+    """Return the remote plugin catalog, or None if the repository does not publish one.
+
+    :param cache: Optional :class:`honeycomb.utils.cache.PluginCache` to keep the catalog in
+    :param ttl: Seconds a cached catalog is used without revalidating it
+    :param repo: Repository URL or path, see :func:`honeycomb.utils.repo.get_repo_url`
+    """
+    repo_url = get_repo_url(repo)
+    cached = _load_cached(cache)
+    if cached and cached.get(REPO) != repo_url:
+        cached = None  # the cache holds the catalog of another repository
+    if cached and cached[CATALOG] is None:
+        ttl = max(ttl, defs.CATALOG_TTL)  # a repository without a catalog is not asked again on every install
+    if cached and (time.time() - cached[FETCHED] < ttl or cache.offline):
+        return cached[CATALOG]
+    if cache and cache.offline:
+        raise exceptions.PluginNotCached(CATALOG_CACHE_FILE)
+
+    headers = {}
+    if cached and cached.get(ETAG):
+        headers["If-None-Match"] = cached[ETAG]
+    if cached and cached.get(LAST_MODIFIED):
+        headers["If-Modified-Since"] = cached[LAST_MODIFIED]
+
+    import requests  # only when the cached catalog is not enough
+    rsession = get_session()
+    url = "{}/{}".format(repo_url, defs.CATALOG_FILE)
+    logger.debug("fetching %s", url)
+    try:
+        r = rsession.get(url, headers=headers)
+        if r.status_code == requests.codes.not_modified:
+            logger.debug("catalog not modified")
+            cached[FETCHED] = time.time()
+            _save_cached(cache, cached)
+            return cached[CATALOG]
+        if r.status_code == requests.codes.not_found:
+            catalog = None  # remembered for ttl as well so the plain text lists are used without asking again
+        else:
+            r.raise_for_status()
+            catalog = r.json()
+    except (requests.exceptions.ConnectionError, requests.exceptions.HTTPError, ValueError) as exc:
+        logger.debug(str(exc), exc_info=True)
+        if cached:
+            logger.debug("using stale catalog")
+            return cached[CATALOG]
+        raise exceptions.PluginRepoConnectionError()
+
+    _save_cached(cache, {REPO: repo_url, FETCHED: time.time(), ETAG: r.headers.get("ETag"),
+                         LAST_MODIFIED: r.headers.get("Last-Modified"), CATALOG: catalog})
+    return catalog
+
+
+def get_plugin_info(plugin_type, name, cache=None, ttl=defs.CATALOG_TTL, repo=None):
+    """Return the catalog entry of a plugin, or None if it is not in the catalog (or there is no catalog).
+
+    :param plugin_type: :obj:`honeycomb.defs.SERVICES` or :obj:`honeycomb.defs.INTEGRATIONS`
+    :param ttl: See :func:`get_catalog`
+    :param repo: See :func:`get_catalog`
+    """
+    catalog = get_catalog(cache, ttl, repo)
+    if not catalog or name not in catalog.get(plugin_type, {}):
+        return None
+    return catalog[plugin_type][name]
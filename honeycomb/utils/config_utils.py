@@ -9,7 +9,6 @@ import json
 import logging
 
 import six
-import yaml
 
 from honeycomb import defs, exceptions
 from honeycomb.error_messages import CONFIG_FIELD_TYPE_ERROR
@@ -116,13 +115,16 @@ def process_config(ctx, configfile):
 
     This is a heavy method that loads lots of content, so we only run the imports if its called.
     """
-    from honeycomb.commands.service.run import run as service_run
+    import yaml
+    import click
     # from honeycomb.commands.service.logs import logs as service_logs
     from honeycomb.commands.service.install import install as service_install
     from honeycomb.commands.integration.install import install as integration_install
     from honeycomb.commands.integration.configure import configure as integration_configure
+    from honeycomb.servicemanager.supervisor import Supervisor, get_supervisor, start_services
 
     VERSION = "version"
+    REPOSITORY = "repository"
     SERVICES = defs.SERVICES
     INTEGRATIONS = defs.INTEGRATIONS
 
@@ -144,8 +146,8 @@ def process_config(ctx, configfile):
                             (integration_install, {INTEGRATIONS: integrations})]:
             try:
                 ctx.invoke(cmd, **kwargs)
-            except SystemExit:
-                # If a plugin is already installed honeycomb will exit abnormally
+            except (SystemExit, click.exceptions.Exit):
+                # If a plugin is already installed honeycomb will exit abnormally (click 8 raises Exit instead)
                 pass
 
     def parameters_to_string(parameters_dict):
@@ -157,19 +159,43 @@ def process_config(ctx, configfile):
             ctx.invoke(integration_configure, integration=integration, args=args_list)
 
     def run_services(services, integrations):
-        # TODO: Enable support with multiple services as daemon, and run service.logs afterwards
-        #       tricky part is that services launched as daemon are exited with os._exit(0) so you
-        #       can't catch it.
-        for service in services:
-            args_list = parameters_to_string(config[SERVICES][service].get(defs.PARAMETERS, dict()))
-            ctx.invoke(service_run, service=service, integration=integrations, args=args_list)
+        # start all services at once under honeycombd, in the foreground unless one is already running
+        honeycombd = get_supervisor(ctx.obj["HOME"])
+        foreground = honeycombd is None
+        if foreground:
+            honeycombd = Supervisor(ctx.obj["HOME"], ctx.obj["INDEX"])
+            honeycombd.bind()
+
+        try:
+            status = start_services(honeycombd, [
+                {"service": service, "integrations": list(integrations),
+                 "args": parameters_to_string(config[SERVICES][service].get(defs.PARAMETERS, dict()))}
+                for service in services])
+        except BaseException:
+            if foreground:
+                honeycombd.close()
+            raise
+
+        for service in sorted(status):
+            if status[service]["ready"]:
+                click.secho("[+] {} is ready (pid: {})".format(service, status[service]["pid"]))
+            else:
+                click.secho("[-] {} is not ready ({})".format(service, status[service]["status"]), fg="red")
+
+        if foreground:
+            try:
+                honeycombd.serve()
+            except KeyboardInterrupt:
+                pass
 
     # TODO: Silence normal stdout and follow honeycomb.debug.json instead
     #       This would make monitoring containers and collecting logs easier
     with open(configfile, "rb") as fh:
-        config = yaml.load(fh.read())
+        config = yaml.safe_load(fh.read())
 
     validate_yml(config)
+    if config.get(REPOSITORY) and not ctx.obj.get("REPO"):  # --repo and HC_REPO take precedence
+        ctx.obj["REPO"] = config[REPOSITORY]
     services = config.get(SERVICES).keys()
     integrations = config.get(INTEGRATIONS).keys() if config.get(INTEGRATIONS) else []
 
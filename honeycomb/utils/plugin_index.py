@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+"""Honeycomb plugin metadata index.
+
+Validating a plugin's config.json means opening, parsing and checking every field, for every installed plugin,
+every time a command lists or shows them. ``.index.json`` in the honeycomb home keeps the validated configs keyed
+by the path of their config.json, along with the file's mtime, size and SHA-256. A config is only read again when
+its mtime or size changed, and only revalidated when its content did.
+"""
+
+from __future__ import unicode_literals, absolute_import
+
+import os
+import json
+import hashlib
+import logging
+import tempfile
+import threading
+from contextlib import contextmanager
+
+from honeycomb import __version__
+
+logger = logging.getLogger(__name__)
+
+INDEX_FILE = ".index.json"
+
+VERSION = "version"
+ENTRIES = "entries"
+MTIME = "mtime"
+SIZE = "size"
+SHA256 = "sha256"
+CONFIG = "config"
+
+
+def _read_config(config_path):
+    with open(config_path, "rb") as f:
+        data = f.read()
+    return data, hashlib.sha256(data).hexdigest()
+
+
+def load_config(config_path, validate, index=None):
+    """Load and validate a plugin config.json, through the index if there is one.
+
+    :param config_path: Path to config.json
+    :param validate: Function validating the parsed config, raises if it is invalid
+    :param index: Optional :class:`PluginIndex`
+    :returns: Parsed config
+    """
+    if index is not None:
+        return index.load_config(config_path, validate)
+    data, _ = _read_config(config_path)
+    config_json = json.loads(data.decode("utf-8"))
+    validate(config_json)
+    return config_json
+
+
+class PluginIndex(object):
+    """Validated plugin configs of a honeycomb home."""
+
+    def __init__(self, home):
+        """Open the index of a home, it is read on first use.
+
+        :param home: Path to honeycomb home
+        """
+        self.path = os.path.join(home, INDEX_FILE)
+        self._lock = threading.RLock()
+        self._entries = None
+        self._dirty = False
+        self._batch = 0
+
+    def _load(self):
+        if self._entries is not None:
+            return self._entries
+        try:
+            with open(self.path, "r") as f:
+                index = json.load(f)
+        except (IOError, OSError, ValueError):
+            index = {}
+        # validation rules may differ between honeycomb versions
+        self._entries = index.get(ENTRIES, {}) if index.get(VERSION) == __version__ else {}
+        return self._entries
+
+    def save(self):
+        """Write the index if it changed, dropping plugins that were removed."""
+        with self._lock:
+            if not self._dirty:
+                return
+            entries = {path: entry for path, entry in self._load().items() if os.path.exists(path)}
+            try:
+                # write to a temporary file and rename it so readers never see a partial index
+                fd, tmppath = tempfile.mkstemp(prefix=INDEX_FILE, dir=os.path.dirname(self.path))
+                with os.fdopen(fd, "w") as f:
+                    json.dump({VERSION: __version__, ENTRIES: entries}, f)
+                if os.name != "posix" and os.path.exists(self.path):
+                    os.remove(self.path)
+                os.rename(tmppath, self.path)
+            except (IOError, OSError) as exc:
+                logger.debug("cannot write plugin index: %s", exc)  # the index is only an optimization
+            self._entries = entries
+            self._dirty = False
+
+    @contextmanager
+    def batch(self):
+        """Save the index once at the end of the block instead of on every change."""
+        with self._lock:
+            self._batch += 1
+        try:
+            yield self
+        finally:
+            with self._lock:
+                self._batch -= 1
+                if not self._batch:
+                    self.save()
+
+    def load_config(self, config_path, validate):
+        """Return the validated config of a plugin, see :func:`load_config`."""
+        config_path = os.path.realpath(config_path)
+        st = os.stat(config_path)
+        with self._lock:
+            entry = self._load().get(config_path)
+            if entry and (entry[MTIME], entry[SIZE]) == (st.st_mtime, st.st_size):
+                return entry[CONFIG]
+
+        data, sha256 = _read_config(config_path)
+        if entry and entry[SHA256] == sha256:
+            logger.debug("%s was touched but did not change", config_path)
+            config_json = entry[CONFIG]
+        else:
+            logger.debug("validating %s", config_path)
+            config_json = json.loads(data.decode("utf-8"))
+            validate(config_json)
+
+        with self._lock:
+            self._load()[config_path] = {MTIME: st.st_mtime, SIZE: st.st_size, SHA256: sha256, CONFIG: config_json}
+            self._dirty = True
+            if not self._batch:
+                self.save()
+        return config_json
@@ -0,0 +1,233 @@
+# -*- coding: utf-8 -*-
+"""Honeycomb plugin module loader.
+
+Every plugin is imported as its own package, ``honeycomb_plugins.<services|integrations>.<name>``, whose
+``__path__`` is the plugin folder and its dependencies (``venv`` and ``venv.zip``). :class:`PluginFinder` (one
+instance in :data:`sys.meta_path`) creates these packages, so loading a plugin never adds anything to
+:data:`sys.path` and the imports of honeycomb and of other plugins do not search plugin folders.
+
+Modules of a plugin get their own ``__import__`` (through their ``__builtins__``), which resolves top level names
+the plugin provides (its own name, its local modules and its dependencies) inside the plugin package first. Two
+plugins can therefore use different versions of the same dependency in one process, each as a separate module.
+Names a plugin does not provide, and standard library modules, are imported as usual. Imports done through
+:mod:`importlib` directly are not redirected.
+
+The top level names plugins used to get from their folders being on :data:`sys.path` (``base_service`` for
+services, ``integrationmanager`` and friends for integrations) are the honeycomb modules themselves.
+
+Plugin packages only resolve in a process that loaded the plugin, a process started with the ``spawn`` or
+``forkserver`` methods cannot unpickle plugin classes. Processes running plugins must be forked whatever the
+platform's default start method is, as honeycombd does (see :mod:`honeycomb.servicemanager.supervisor`).
+"""
+
+from __future__ import unicode_literals, absolute_import
+
+import os
+import sys
+import logging
+import importlib
+import threading
+
+import six
+from six.moves import builtins
+
+from honeycomb import defs
+
+logger = logging.getLogger(__name__)
+
+PLUGINS_PACKAGE = "honeycomb_plugins"
+
+_lock = threading.RLock()
+
+
+def _stdlib_module_names():
+    if hasattr(sys, "stdlib_module_names"):  # python 3.10+
+        return frozenset(sys.stdlib_module_names)
+    import sysconfig
+    stdlib = os.path.normcase(os.path.realpath(sysconfig.get_paths()["stdlib"]))
+    names = set(sys.builtin_module_names)
+    for filename in os.listdir(stdlib):
+        name = filename.split(".")[0]
+        if filename == "site-packages" or not name.isidentifier():
+            continue
+        names.add(name)
+    return frozenset(names)
+
+
+class _PluginLoader(object):
+    """Wrap the loader of a plugin module, setting the plugin's builtins before the module runs."""
+
+    def __init__(self, loader, plugin):
+        """Wrap loader for plugin."""
+        self.loader = loader
+        self.plugin = plugin
+
+    def create_module(self, spec):
+        """Create the module with the wrapped loader."""
+        if self.loader is None or not hasattr(self.loader, "create_module"):
+            return None
+        return self.loader.create_module(spec)
+
+    def exec_module(self, module):
+        """Run the module with the plugin's builtins."""
+        if self.plugin is not None:
+            module.__builtins__ = self.plugin.builtins
+        if self.loader is not None:
+            self.loader.exec_module(module)
+
+    def __getattr__(self, name):
+        # get_data, get_resource_reader, is_package and friends
+        return getattr(self.loader, name)
+
+
+class Plugin(object):
+    """A loaded plugin, owner of ``honeycomb_plugins.<plugin type>.<name>``."""
+
+    def __init__(self, package, path, legacy_package):
+        """Describe a plugin.
+
+        :param package: Name of the plugin package
+        :param path: Path to the plugin folder
+        :param legacy_package: Honeycomb package whose modules the plugin may import without the ``honeycomb.``
+                               prefix (they used to be on :data:`sys.path`)
+        """
+        self.package = package
+        self.name = os.path.basename(path)
+        self.path = path
+        self.paths = [path, os.path.join(path, defs.DEPS_DIR)]
+        if os.path.exists(os.path.join(path, defs.DEPS_ZIP)):
+            self.paths.append(os.path.join(path, defs.DEPS_ZIP))
+        self.legacy_package = legacy_package
+        self.legacy_path = os.path.dirname(importlib.import_module(legacy_package).__file__)
+        self._packages = {self.name: self.package, "honeycomb": None}
+        self.builtins = dict(vars(builtins), __import__=self._import)
+
+    def provides(self, name):
+        """Return True if the plugin (or one of its dependencies) has a top level module or package name."""
+        from importlib.machinery import PathFinder
+        return name not in _stdlib and PathFinder.find_spec(name, self.paths) is not None
+
+    def _top_package(self, top):
+        """Return the package a top level name is imported from, None if it is imported as is."""
+        if top not in self._packages:
+            if self.provides(top):
+                self._packages[top] = "{}.{}".format(self.package, top)
+            elif os.path.exists(os.path.join(self.legacy_path, top + ".py")) or \
+                    os.path.exists(os.path.join(self.legacy_path, top, "__init__.py")):
+                self._packages[top] = "{}.{}".format(self.legacy_package, top)
+            else:
+                self._packages[top] = None
+        return self._packages[top]
+
+    def resolve(self, name):
+        """Return the name a top level import of the plugin resolves to, or None if it is not redirected."""
+        top, dot, rest = name.partition(".")
+        package = self._top_package(top)
+        return package + dot + rest if package else None
+
+    def _import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        if level == 0:
+            resolved = self.resolve(name)
+            if resolved:
+                module = _import(resolved, globals, locals, fromlist, 0)
+                if fromlist:
+                    return module
+                # `import a.b` binds a
+                return sys.modules[self._top_package(name.partition(".")[0])]
+        return _import(name, globals, locals, fromlist, level)
+
+
+class PluginFinder(object):
+    """Meta path finder creating plugin packages and loading their modules with the plugin's builtins."""
+
+    def __init__(self):
+        """Start without plugins."""
+        self.plugins = {}
+
+    def find_spec(self, fullname, path=None, target=None):
+        """Return the spec of a plugin package or module, None for any other name."""
+        from importlib.machinery import ModuleSpec, PathFinder
+        parts = fullname.split(".")
+        if parts[0] != PLUGINS_PACKAGE:
+            return None
+        if len(parts) < 3:
+            return ModuleSpec(fullname, _PluginLoader(None, None), is_package=True)
+
+        plugin = self.plugins.get(".".join(parts[:3]))
+        if plugin is None:
+            return None
+        if len(parts) == 3:
+            init = os.path.join(plugin.path, "__init__.py")
+            if os.path.exists(init):
+                from importlib.util import spec_from_file_location
+                spec = spec_from_file_location(fullname, init, submodule_search_locations=plugin.paths)
+            else:
+                spec = ModuleSpec(fullname, None, is_package=True)
+                spec.submodule_search_locations = list(plugin.paths)
+        else:
+            spec = PathFinder.find_spec(fullname, path)
+            if spec is None:
+                return None
+        spec.loader = _PluginLoader(spec.loader, plugin)
+        return spec
+
+    def add(self, plugin):
+        """Register a plugin, a plugin of the same type and name loaded from elsewhere is unloaded."""
+        with _lock:
+            current = self.plugins.get(plugin.package)
+            if current is not None and current.paths == plugin.paths:
+                return current
+            if current is not None:
+                logger.debug("%s moved from %s to %s, reloading it", plugin.package, current.path, plugin.path)
+                for name in [_ for _ in sys.modules if _ == plugin.package or _.startswith(plugin.package + ".")]:
+                    del sys.modules[name]
+            self.plugins[plugin.package] = plugin
+            return plugin
+
+
+_import = builtins.__import__
+_stdlib = frozenset()
+_finder = None
+
+
+def _install_finder():
+    global _finder, _stdlib
+    with _lock:
+        if _finder is None:
+            _stdlib = _stdlib_module_names()
+            _finder = PluginFinder()
+            sys.meta_path.insert(0, _finder)
+    return _finder
+
+
+def _add_paths(paths):
+    """Python 2 fallback, add paths to :data:`sys.path` (once)."""
+    for path in paths:
+        path = os.path.realpath(path)
+        if path not in sys.path:
+            logger.debug("adding %s to path", path)
+            sys.path.insert(0, path)
+
+
+def load_plugin_module(plugin_path, plugin_type, module, legacy_package):
+    """Import a module of a plugin.
+
+    :param plugin_path: Path to the plugin folder
+    :param plugin_type: :obj:`honeycomb.defs.SERVICES` or :obj:`honeycomb.defs.INTEGRATIONS`
+    :param module: Name of the module in the plugin folder, e.g. ``<name>_service``
+    :param legacy_package: See :class:`Plugin`
+    :returns: The imported module
+    """
+    plugin_path = os.path.realpath(plugin_path)
+    name = os.path.basename(plugin_path)
+    if six.PY2:
+        legacy_path = os.path.dirname(importlib.import_module(legacy_package).__file__)
+        _add_paths([legacy_path, os.path.dirname(plugin_path), plugin_path, os.path.join(plugin_path, defs.DEPS_DIR)] +
+                   ([os.path.join(plugin_path, defs.DEPS_ZIP)]
+                    if os.path.exists(os.path.join(plugin_path, defs.DEPS_ZIP)) else []))
+        return importlib.import_module("{}.{}".format(name, module))
+
+    package = "{}.{}.{}".format(PLUGINS_PACKAGE, plugin_type, name)
+    plugin = _install_finder().add(Plugin(package, plugin_path, legacy_package))
+    logger.debug("importing %s from %s", module, plugin.path)
+    return importlib.import_module("{}.{}".format(plugin.package, module))
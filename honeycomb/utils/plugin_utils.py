@@ -5,18 +5,36 @@ from __future__ import unicode_literals, absolute_import
 
 import os
 import sys
+import time
+import errno
 import shutil
+import json
+import hashlib
+import ctypes
+import ctypes.util
 import logging
 import zipfile
+import threading
 import tempfile
+import compileall
+import py_compile
 import subprocess
+from stat import S_ISREG
+from collections import OrderedDict
+from multiprocessing.pool import ThreadPool
+
+try:
+    import fcntl
+except ImportError:  # windows
+    fcntl = None
 
 import click
-import requests
-from requests.adapters import HTTPAdapter
 
 from honeycomb import defs, exceptions
 from honeycomb.utils import config_utils
+from honeycomb.utils.cache import SHA256, ETAG, hash_file, owned_by_user
+from honeycomb.utils.catalog import get_catalog, get_plugin_info
+from honeycomb.utils.repo import get_session, get_repo_url, get_local_path, plugin_url
 
 logger = logging.getLogger(__name__)
 
@@ -24,10 +42,23 @@ try:
     O_BINARY = os.O_BINARY
 except Exception:
     O_BINARY = 0
+O_NOFOLLOW = getattr(os, "O_NOFOLLOW", 0)
 
 READ_FLAGS = os.O_RDONLY | O_BINARY
 WRITE_FLAGS = os.O_WRONLY | os.O_CREAT | os.O_TRUNC | O_BINARY
 BUFFER_SIZE = 128 * 1024
+FICLONE = 0x40049409  # _IOW(0x94, 9, int), see ioctl_ficlone(2)
+COPY_JOBS = 4
+PARALLEL_COPY_MIN_FILES = 64
+DEFAULT_INSTALL_JOBS = 4
+BYTECODE_TIMESTAMP = "timestamp"
+BYTECODE_UNCHECKED_HASH = "unchecked-hash"
+BYTECODE_NONE = "none"
+BYTECODE_MODES = (BYTECODE_TIMESTAMP, BYTECODE_UNCHECKED_HASH, BYTECODE_NONE)
+EXTENSION_SUFFIXES = (".so", ".pyd", ".dylib")
+REQUIREMENTS_FILE = "requirements.txt"
+AT_FDCWD = -100
+RENAME_EXCHANGE = 1 << 1  # see rename(2)
 
 
 class CTError(Exception):
@@ -50,128 +81,455 @@ def get_plugin_path(home, plugin_type, plugin_name, editable=False):
     :param editable: Use plugin_name as direct path instead of loading from honeycomb home folder
     """
     if editable:
-        plugin_path = plugin_name
-    else:
-        plugin_path = os.path.join(home, plugin_type, plugin_name)
+        return os.path.realpath(plugin_name)
+
+    # plugins installed in editable mode are symlinks, keep them as is so uninstall removes the link only
+    return os.path.join(os.path.realpath(os.path.join(home, plugin_type)), plugin_name)
+
+
+def install_plugins(pkgpaths, plugin_type, install_path, register_func, cache=None, jobs=1, post_install=None,
+                    editable=False, bytecode=BYTECODE_NONE, pack_deps=False, repo=None):
+    """Install several plugins concurrently.
+
+    Every plugin is installed by one worker of a pool of jobs threads, so the download, extraction and
+    dependency install (a pip subprocess) of different plugins overlap. A failure only affects its own plugin.
+
+    :param pkgpaths: List of plugins, see :func:`install_plugin`
+    :param jobs: Maximum number of plugins to install at the same time
+    :param post_install: Optional function called with the path of every installed plugin
+    :param editable: See :func:`install_plugin`
+    :param bytecode: See :func:`install_plugin`
+    :param pack_deps: See :func:`install_plugin`
+    :param repo: See :func:`install_plugin`
+    :returns: List of (pkgpath, exception) tuples for the plugins that failed to install
+    """
+    pkgpaths = list(OrderedDict.fromkeys(pkgpaths))
+    quiet = jobs > 1 and len(pkgpaths) > 1  # progress bars and pip output of parallel installs would interleave
+
+    def install_one(pkgpath):
+        try:
+            if quiet:
+                click.secho("[*] Installing {}..".format(pkgpath))
+            plugin_path = install_plugin(pkgpath, plugin_type, install_path, register_func, cache, quiet, editable,
+                                         BYTECODE_NONE, pack_deps, repo)
+            if post_install:
+                post_install(plugin_path)
+        except Exception as exc:
+            logger.debug("failed installing %s", pkgpath, exc_info=True)
+            return pkgpath, exc, None
+        return pkgpath, None, plugin_path
+
+    pool = ThreadPool(max(1, min(jobs, len(pkgpaths))))
+    try:
+        results = list(pool.imap_unordered(install_one, pkgpaths))
+    finally:
+        pool.close()
+        pool.join()
+
+    if bytecode != BYTECODE_NONE:
+        # compileall forks a process pool, compile once the threads of the install pool are gone
+        for _, _, plugin_path in results:
+            if plugin_path:
+                compile_plugin(plugin_path, unchecked_hash=bytecode == BYTECODE_UNCHECKED_HASH and not editable)
+    return [(pkgpath, exc) for pkgpath, exc, _ in results if exc]
 
-    return os.path.realpath(plugin_path)
 
+def raise_install_errors(ctx, errors):
+    """Exit with the errors returned by :func:`install_plugins`.
 
-def install_plugin(pkgpath, plugin_type, install_path, register_func):
+    A plugin that is already installed exits with EEXIST, any other failure is raised (or reported and summed up in
+    one exception if several plugins failed).
+    """
+    failed = [(pkgpath, exc) for pkgpath, exc in errors if not isinstance(exc, exceptions.PluginAlreadyInstalled)]
+    for pkgpath, exc in errors:
+        if len(failed) != 1 or isinstance(exc, exceptions.PluginAlreadyInstalled):
+            click.echo(exc)
+
+    if len(failed) == 1:
+        raise failed[0][1]
+    if failed:
+        raise click.ClickException("Failed installing {}".format(", ".join(pkgpath for pkgpath, _ in failed)))
+    if errors:
+        raise ctx.exit(errno.EEXIST)
+
+
+def install_plugin(pkgpath, plugin_type, install_path, register_func, cache=None, quiet=False, editable=False,
+                   bytecode=BYTECODE_NONE, pack_deps=False, repo=None):
     """Install specified plugin.
 
     :param pkgpath: Name of plugin to be downloaded from online repo or path to plugin folder or zip file.
     :param install_path: Path where plugin will be installed.
     :param register_func: Method used to register and validate plugin.
+    :param cache: Optional :class:`honeycomb.utils.cache.PluginCache` for plugin zips
+    :param quiet: Do not show progress (used by :func:`install_plugins`)
+    :param editable: Symlink a plugin folder instead of copying it, so changes to it apply without reinstalling
+    :param bytecode: One of :obj:`BYTECODE_MODES`, how to precompile the plugin (see :func:`compile_plugin`)
+    :param pack_deps: Pack the plugin dependencies into a zip for zipimport (see :func:`zip_deps`)
+    :param repo: Repository URL or path, see :func:`honeycomb.utils.repo.get_repo_url`
+    :returns: Path of the installed plugin
     """
     service_name = os.path.basename(pkgpath)
-    if os.path.exists(os.path.join(install_path, service_name)):
+    if os.path.lexists(os.path.join(install_path, service_name)):
         raise exceptions.PluginAlreadyInstalled(pkgpath)
+    if editable and not os.path.isdir(pkgpath):
+        raise click.BadParameter("only plugin folders can be installed in editable mode", param_hint=pkgpath)
 
     if os.path.exists(pkgpath):
         logger.debug("%s exists in filesystem", pkgpath)
         if os.path.isdir(pkgpath):
-            pip_status = install_dir(pkgpath, install_path, register_func)
+            pip_status, plugin_path = install_dir(pkgpath, install_path, register_func, cache=cache, quiet=quiet,
+                                                  editable=editable)
         else:  # pkgpath is file
-            pip_status = install_from_zip(pkgpath, install_path, register_func)
+            pip_status, plugin_path = install_from_zip(pkgpath, install_path, register_func, cache=cache, quiet=quiet)
+            if cache:
+                # so reinstalling the plugin by name works offline
+                cache.add(plugin_type, os.path.basename(plugin_path), pkgpath)
     else:
         logger.debug("cannot find %s locally, checking github repo", pkgpath)
-        click.secho("Collecting {}..".format(pkgpath))
-        pip_status = install_from_repo(pkgpath, plugin_type, install_path, register_func)
+        if not quiet:
+            click.secho("Collecting {}..".format(pkgpath))
+        pip_status, plugin_path = install_from_repo(pkgpath, plugin_type, install_path, register_func, cache, quiet,
+                                                    repo)
+
+    if not editable:
+        write_manifest(plugin_path)
+    if pack_deps:
+        zip_deps(plugin_path)
+    if bytecode != BYTECODE_NONE:
+        # the sources of editable plugins change, their bytecode has to be checked against them
+        compile_plugin(plugin_path, unchecked_hash=bytecode == BYTECODE_UNCHECKED_HASH and not editable)
 
     if pip_status == 0:
-        click.secho("[+] Great success!")
+        click.secho("[+] {} installed".format(pkgpath) if quiet else "[+] Great success!")
     else:
         # TODO: rephrase
-        click.secho("[-] Service installed but something was odd with dependency install, please review debug logs")
+        click.secho("[-] {}installed but something was odd with dependency install, please review debug logs"
+                    .format("{} ".format(pkgpath) if quiet else "Service "))
+
+    return plugin_path
+
+
+def _pip(pipargs, quiet=False):
+    """Run pip in a subprocess, quiet logs its output instead of showing it."""
+    logger.debug("running pip %s", pipargs)
+    cmd = [sys.executable, "-m", "pip"] + pipargs
+    if quiet:
+        try:
+            output = subprocess.check_output(cmd, stderr=subprocess.STDOUT)
+        except subprocess.CalledProcessError as exc:
+            # the output is not shown in quiet mode, without it the error only has the exit status
+            logger.error("pip %s failed:\n%s", " ".join(pipargs), exc.output.decode("utf-8", "replace"))
+            raise
+        logger.debug(output.decode("utf-8", "replace"))
+        return 0
+    return subprocess.check_call(cmd)
 
 
-def install_deps(pkgpath):
+def install_deps(pkgpath, quiet=False, cache=None):
     """Install plugin dependencies using pip.
 
     We import pip here to reduce load time for when its not needed.
-    """
-    if os.path.exists(os.path.join(pkgpath, "requirements.txt")):
-        logger.debug("installing dependencies")
-        click.secho("[*] Installing dependencies")
-        pipargs = ["install", "--target", os.path.join(pkgpath, defs.DEPS_DIR), "--ignore-installed",
-                   "-r", os.path.join(pkgpath, "requirements.txt")]
-        logger.debug("running pip %s", pipargs)
-        return subprocess.check_call([sys.executable, "-m", "pip"] + pipargs)
-    return 0  # pip.main returns retcode
 
+    With a cache, requirements are first collected as wheels into the cache's wheelhouse (only missing wheels are
+    downloaded or built) and installed from there, then the installed files are hardlinked to identical files
+    installed by other plugins (see :func:`honeycomb.utils.cache.PluginCache.dedup_tree`).
+
+    :param quiet: Log pip output instead of showing it
+    :param cache: Optional :class:`honeycomb.utils.cache.PluginCache`
+    """
+    requirements = os.path.join(pkgpath, REQUIREMENTS_FILE)
+    if not os.path.exists(requirements):
+        return 0  # pip.main returns retcode
 
-def copy_file(src, dst):
+    logger.debug("installing dependencies")
+    if not quiet:
+        click.secho("[*] Installing dependencies")
+    target = os.path.join(pkgpath, defs.DEPS_DIR)
+    if not cache:
+        return _pip(["install", "--target", target, "--ignore-installed", "-r", requirements], quiet)
+
+    start = time.time()
+    index_args = ["--no-index"] if cache.offline else []
+    with cache.wheel_lock:
+        cached_wheels = set(os.listdir(cache.wheelhouse))
+        _pip(["wheel", "--wheel-dir", cache.wheelhouse, "--find-links", cache.wheelhouse, "-r", requirements] +
+             index_args, quiet)
+        new_wheels = set(os.listdir(cache.wheelhouse)) - cached_wheels
+    pip_status = _pip(["install", "--target", target, "--ignore-installed", "--no-index",
+                       "--find-links", cache.wheelhouse, "-r", requirements], quiet)
+    files, saved = cache.dedup_tree(target)
+
+    logger.debug("dependencies of %s installed in %.2fs, %d new wheels, %d files (%d bytes) deduplicated",
+                 pkgpath, time.time() - start, len(new_wheels), files, saved,
+                 extra={"new_wheels": sorted(new_wheels), "dedup_files": files, "dedup_bytes": saved})
+    click.secho("[*] {} dependencies installed in {:.1f}s ({} new wheels built or downloaded, {} shared with other "
+                "plugins)".format(os.path.basename(pkgpath), time.time() - start, len(new_wheels),
+                                  _sizeof_fmt(saved) if saved else "nothing"))
+    return pip_status
+
+
+def _pyc_invalidation_mode(unchecked_hash):
+    if unchecked_hash and hasattr(py_compile, "PycInvalidationMode"):  # python 3.7+
+        return {"invalidation_mode": py_compile.PycInvalidationMode.UNCHECKED_HASH}
+    return {}
+
+
+def compile_plugin(plugin_path, unchecked_hash=False, ddir=None):
+    """Compile all modules of a plugin and its dependencies to bytecode, one process per CPU.
+
+    Starting the plugin then never compiles anything, even when ``__pycache__`` cannot be written (read-only images).
+
+    :param unchecked_hash: Write unchecked hash based pycs (python 3.7+), the sources are not even stat'ed on
+                           import. Only for plugins that are not edited in place, changed sources are ignored.
+    :param ddir: Path the plugin will be moved to, if it is compiled somewhere else (shown in tracebacks)
+    :returns: True if every module compiled
+    """
+    start = time.time()
+    kwargs = _pyc_invalidation_mode(unchecked_hash)
+    if sys.version_info >= (3, 5):
+        # forking the process pool from a multithreaded process could copy a lock another thread holds
+        kwargs["workers"] = 0 if threading.active_count() == 1 else 1
+    # quiet=2, plugins may ship modules for other python versions, they are compiled when imported (if ever)
+    success = compileall.compile_dir(plugin_path, ddir=ddir, quiet=2, **kwargs)
+    logger.debug("compiled %s in %.2fs (%s)", plugin_path, time.time() - start, "ok" if success else "with errors")
+    return success
+
+
+def zip_deps(plugin_path, unchecked_hash=True, ddir=None):
+    """Pack the dependencies of a plugin into :obj:`honeycomb.defs.DEPS_ZIP` for zipimport.
+
+    A zip is one file to open instead of a tree of directories to stat on every import. Every module is stored with
+    its bytecode so nothing is compiled when imported from the zip. Dependencies with extension modules cannot be
+    imported from a zip and are left as they are.
+
+    :param ddir: See :func:`compile_plugin`
+    :returns: True if the dependencies were packed
+    """
+    deps_dir = os.path.join(plugin_path, defs.DEPS_DIR)
+    if not os.path.isdir(deps_dir):
+        return False
+
+    names = []
+    for root, _, filenames in os.walk(deps_dir):
+        for filename in filenames:
+            if filename.endswith(EXTENSION_SUFFIXES):
+                logger.debug("%s has extension modules, not packing %s", plugin_path, filename)
+                return False
+            if "__pycache__" not in root and not filename.endswith(".pyc"):
+                names.append(os.path.relpath(os.path.join(root, filename), deps_dir))
+
+    zip_path = os.path.join(plugin_path, defs.DEPS_ZIP)
+    dzip_path = os.path.join(ddir or plugin_path, defs.DEPS_ZIP)
+    fd, tmppath = tempfile.mkstemp(dir=plugin_path)
+    os.close(fd)
+    with zipfile.ZipFile(tmppath, "w", zipfile.ZIP_STORED) as depszip:
+        for name in names:
+            filepath = os.path.join(deps_dir, name)
+            arcname = name.replace(os.sep, "/")
+            depszip.write(filepath, arcname)
+            if name.endswith(".py"):
+                # zipimport only looks for pycs next to their module, not in __pycache__
+                cfile = filepath + "c"
+                try:
+                    py_compile.compile(filepath, cfile, os.path.join(dzip_path, name), doraise=True,
+                                       **_pyc_invalidation_mode(unchecked_hash))
+                except py_compile.PyCompileError as exc:
+                    logger.debug(str(exc))
+                    continue
+                depszip.write(cfile, arcname + "c")
+                os.remove(cfile)
+    os.rename(tmppath, zip_path)
+    shutil.rmtree(deps_dir)
+    logger.debug("packed %d files of %s into %s", len(names), deps_dir, zip_path)
+    return True
+
+
+def _copy_file_range(fin, fout, size):
+    """Copy in the kernel with copy_file_range(2), filesystems that support it share the data (reflink)."""
+    copied = 0
+    while copied < size:
+        n = os.copy_file_range(fin, fout, size - copied)
+        if not n:
+            break
+        copied += n
+    return copied
+
+
+def _sendfile(fin, fout, size):
+    """Copy in the kernel with sendfile(2)."""
+    copied = 0
+    while copied < size:
+        n = os.sendfile(fout, fin, copied, size - copied)
+        if not n:
+            break
+        copied += n
+    return copied
+
+
+def _reflink(fin, fout, size):
+    """Share the data of fin with fout (copy on write) with the FICLONE ioctl."""
+    fcntl.ioctl(fout, FICLONE, fin)
+    return size
+
+
+def _read_write(fin, fout, size):
+    """Copy through userspace."""
+    copied = 0
+    for x in iter(lambda: os.read(fin, BUFFER_SIZE), b""):
+        os.write(fout, x)
+        copied += len(x)
+    return copied
+
+
+# in order of preference, a method is skipped for a filesystem once the OS says it does not support it there
+_copy_methods = [method for method, available in [
+    (_reflink, fcntl is not None and sys.platform.startswith("linux")),
+    (_copy_file_range, hasattr(os, "copy_file_range")),
+    (_sendfile, hasattr(os, "sendfile") and sys.platform.startswith("linux")),
+] if available]
+_unsupported_methods = set()  # (method, st_dev) pairs
+_UNSUPPORTED_ERRNOS = (errno.ENOSYS, errno.ENOTTY, errno.EOPNOTSUPP)
+_FALLBACK_ERRNOS = _UNSUPPORTED_ERRNOS + (errno.EXDEV, errno.EINVAL, errno.EBADF, errno.EPERM)
+
+
+def copy_file(src, dst, link=False):
     """Copy a single file.
 
+    The data is shared with the source (reflink) or copied in the kernel when the OS and filesystem allow it,
+    falling back to a userspace copy.
+
     :param src: Source name
     :param dst: Destination name
+    :param link: Hardlink instead of copying when possible, only safe if src is about to be deleted
     """
+    if link:
+        try:
+            os.link(src, dst)
+            return
+        except OSError as exc:
+            logger.debug("cannot hardlink %s: %s", src, exc)
+
+    fin = fout = None
     try:
         fin = os.open(src, READ_FLAGS)
         stat = os.fstat(fin)
         fout = os.open(dst, WRITE_FLAGS, stat.st_mode)
-        for x in iter(lambda: os.read(fin, BUFFER_SIZE), b""):
-            os.write(fout, x)
+        for method in _copy_methods:
+            if (method, stat.st_dev) in _unsupported_methods:
+                continue
+            try:
+                method(fin, fout, stat.st_size)
+                return
+            except (OSError, IOError) as exc:
+                if exc.errno not in _FALLBACK_ERRNOS or os.lseek(fout, 0, os.SEEK_END):
+                    raise
+                if exc.errno in _UNSUPPORTED_ERRNOS:
+                    _unsupported_methods.add((method, stat.st_dev))
+                os.lseek(fin, 0, os.SEEK_SET)
+        _read_write(fin, fout, stat.st_size)
     finally:
-        try:
-            os.close(fin)
-        except Exception as exc:
-            logger.debug("Failed to close file handle when copying: {}".format(exc))
-        try:
-            os.close(fout)
-        except Exception as exc:
-            logger.debug("Failed to close file handle when copying: {}".format(exc))
+        for fd in (fin, fout):
+            if fd is None:
+                continue
+            try:
+                os.close(fd)
+            except Exception as exc:
+                logger.debug("Failed to close file handle when copying: {}".format(exc))
+
+
+def _scandir(path):
+    """Yield (name, is_dir, is_symlink) for the entries of path without an extra stat per entry where possible."""
+    if hasattr(os, "scandir"):
+        for entry in os.scandir(path):
+            yield entry.name, entry.is_dir(), entry.is_symlink()
+    else:
+        for name in os.listdir(path):
+            fullname = os.path.join(path, name)
+            yield name, os.path.isdir(fullname), os.path.islink(fullname)
 
 
 # Due to speed issues, shutil.copytree had to be swapped out for something faster.
-# The solution was to copy (and slightly refactor) the code from:
+# The solution was based on the code from:
 # https://stackoverflow.com/questions/22078621/python-how-to-copy-files-fast
-def copy_tree(src, dst, symlinks=False, ignore=[]):
+def copy_tree(src, dst, symlinks=False, ignore=[], link=False):
     """Copy a full directory structure.
 
+    Directories are created while walking the tree, files are copied with :func:`copy_file` afterwards, by a small
+    thread pool if there are many of them (the copies mostly wait on IO).
+
     :param src: Source path
     :param dst: Destination path
     :param symlinks: Copy symlinks
     :param ignore: Subdirs/filenames to ignore
+    :param link: Hardlink files instead of copying when possible (see :func:`copy_file`)
     """
-    names = os.listdir(src)
-
-    if not os.path.exists(dst):
-        os.makedirs(dst)
     errors = []
-    for name in names:
-        if name in ignore:
-            continue
-        srcname = os.path.join(src, name)
-        dstname = os.path.join(dst, name)
+    files = []
+
+    def walk(src, dst):
+        if not os.path.exists(dst):
+            os.makedirs(dst)
+        for name, is_dir, is_symlink in _scandir(src):
+            if name in ignore:
+                continue
+            srcname = os.path.join(src, name)
+            dstname = os.path.join(dst, name)
+            try:
+                if symlinks and is_symlink:
+                    os.symlink(os.readlink(srcname), dstname)
+                elif is_dir:
+                    walk(srcname, dstname)
+                else:
+                    files.append((srcname, dstname))
+            except (IOError, os.error) as exc:
+                errors.append((srcname, dstname, str(exc)))
+
+    def copy(names):
         try:
-            if symlinks and os.path.islink(srcname):
-                linkto = os.readlink(srcname)
-                os.symlink(linkto, dstname)
-            elif os.path.isdir(srcname):
-                copy_tree(srcname, dstname, symlinks, ignore)
-            else:
-                copy_file(srcname, dstname)
+            copy_file(names[0], names[1], link)
         except (IOError, os.error) as exc:
-            errors.append((srcname, dstname, str(exc)))
-        except CTError as exc:
-            errors.extend(exc.errors)
+            return names[0], names[1], str(exc)
+
+    walk(src, dst)
+    if len(files) < PARALLEL_COPY_MIN_FILES:
+        results = [copy(names) for names in files]
+    else:
+        pool = ThreadPool(COPY_JOBS)
+        try:
+            results = pool.map(copy, files, chunksize=16)
+        finally:
+            pool.close()
+            pool.join()
+    errors.extend(result for result in results if result)
     if errors:
         raise CTError(errors)
 
 
-def install_dir(pkgpath, install_path, register_func, delete_after_install=False):
+def install_dir(pkgpath, install_path, register_func, delete_after_install=False, cache=None, quiet=False,
+                editable=False):
     """Install plugin from specified directory.
 
-    install_path and register_func are same as :func:`install_plugin`.
-    :param delete_after_install: Delete pkgpath after install (used in :func:`install_from_zip`).
+    install_path, register_func, cache, quiet and editable are same as :func:`install_plugin`.
+    :param delete_after_install: Delete pkgpath after install, its files are hardlinked instead of copied
+    :returns: Tuple of pip return code and installed plugin path
     """
     logger.debug("%s is a directory, attempting to validate", pkgpath)
     plugin = register_func(pkgpath)
+    if editable:
+        logger.debug("%s looks good, linking to %s", pkgpath, install_path)
+        if not os.path.exists(install_path):
+            os.makedirs(install_path)
+        try:
+            os.symlink(os.path.realpath(pkgpath), os.path.join(install_path, plugin.name))
+        except OSError as exc:
+            logger.debug(str(exc), exc_info=True)
+            raise exceptions.PluginAlreadyInstalled(plugin.name)
+        return install_deps(pkgpath, quiet), os.path.join(install_path, plugin.name)
+
     logger.debug("%s looks good, copying to %s", pkgpath, install_path)
     try:
-        copy_tree(pkgpath, os.path.join(install_path, plugin.name))
+        # files of a temporary folder that is deleted right after can be hardlinked instead of copied
+        copy_tree(pkgpath, os.path.join(install_path, plugin.name), link=delete_after_install)
         if delete_after_install:
             logger.debug("deleting %s", pkgpath)
             shutil.rmtree(pkgpath)
@@ -181,57 +539,318 @@ def install_dir(pkgpath, install_path, register_func, delete_after_install=False
         logger.debug(str(exc), exc_info=True)
         raise exceptions.PluginAlreadyInstalled(plugin.name)
 
-    return install_deps(pkgpath)
+    return install_deps(pkgpath, quiet, cache), pkgpath
+
+
+def _get_umask():
+    """Return the umask of the process without changing it, where /proc allows it."""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("Umask:"):
+                    return int(line.split()[1], 8)
+    except (IOError, OSError, ValueError):
+        pass
+    umask = os.umask(0o022)
+    os.umask(umask)
+    return umask
+
+
+def make_staging_dir(path):
+    """Create a staging folder in path, to be renamed into place as a plugin.
+
+    Unlike :func:`tempfile.mkdtemp`, which creates folders only the current user can access, the staging folder gets
+    the permissions of any folder created by honeycomb, so installed plugins stay readable by services that drop
+    privileges. Its name holds the pid of the process installing into it, see :func:`remove_stale_staging_dirs`.
+    """
+    stagingdir = tempfile.mkdtemp(prefix="{}{}-".format(defs.STAGING_PREFIX, os.getpid()), dir=path)
+    os.chmod(stagingdir, 0o777 & ~_get_umask())
+    return stagingdir
 
 
-def install_from_zip(pkgpath, install_path, register_func, delete_after_install=False):
-    """Install plugin from zipfile."""
+def _is_stale_staging_dir(path):
+    pid = os.path.basename(path)[len(defs.STAGING_PREFIX):].split("-")[0]
+    if os.name == "posix" and pid.isdigit():
+        if int(pid) == os.getpid():
+            return False
+        try:
+            os.kill(int(pid), 0)
+        except OSError as exc:
+            return exc.errno == errno.ESRCH
+        return False
+    return time.time() - os.lstat(path).st_mtime > defs.STALE_STAGING_AGE
+
+
+def remove_stale_staging_dirs(path):
+    """Remove staging folders left in path by installs that were interrupted."""
+    try:
+        names = os.listdir(path)
+    except OSError:
+        return
+    for name in names:
+        stagingdir = os.path.join(path, name)
+        if name.startswith(defs.STAGING_PREFIX) and os.path.isdir(stagingdir) and _is_stale_staging_dir(stagingdir):
+            logger.debug("removing %s left by an interrupted install", stagingdir)
+            shutil.rmtree(stagingdir, ignore_errors=True)
+
+
+def install_from_zip(pkgpath, install_path, register_func, delete_after_install=False, cache=None, quiet=False):
+    """Install plugin from zipfile.
+
+    config.json is validated straight from the archive, then the archive is extracted once into a staging folder
+    next to the install path and renamed into place, so an interrupted install never leaves a partial plugin.
+    """
     logger.debug("%s is a file, attempting to load zip", pkgpath)
-    pkgtempdir = tempfile.mkdtemp(prefix="honeycomb_")
+    if not os.path.exists(install_path):
+        try:
+            os.makedirs(install_path)
+        except OSError as exc:
+            if exc.errno != errno.EEXIST:
+                raise
+    remove_stale_staging_dirs(install_path)
+    stagingdir = make_staging_dir(install_path)
     try:
         with zipfile.ZipFile(pkgpath) as pkgzip:
-            pkgzip.extractall(pkgtempdir)
+            if defs.CONFIG_FILE_NAME in pkgzip.namelist():
+                pkgzip.extract(defs.CONFIG_FILE_NAME, stagingdir)
+            plugin = register_func(stagingdir)
+            plugin_path = os.path.join(install_path, plugin.name)
+            if os.path.lexists(plugin_path):
+                raise exceptions.PluginAlreadyInstalled(plugin.name)
+
+            logger.debug("%s looks good, extracting to %s", pkgpath, stagingdir)
+            pkgzip.extractall(stagingdir, [_ for _ in pkgzip.namelist() if _ != defs.CONFIG_FILE_NAME])
+        try:
+            os.rename(stagingdir, plugin_path)
+        except OSError as exc:
+            logger.debug(str(exc), exc_info=True)
+            raise exceptions.PluginAlreadyInstalled(plugin.name)
     except zipfile.BadZipfile as exc:
         logger.debug(str(exc))
+        shutil.rmtree(stagingdir)
         raise click.ClickException(str(exc))
+    except BaseException:
+        shutil.rmtree(stagingdir, ignore_errors=True)
+        raise
+
     if delete_after_install:
         logger.debug("deleting %s", pkgpath)
         os.remove(pkgpath)
-    logger.debug("installing from unzipped folder %s", pkgtempdir)
-    return install_dir(pkgtempdir, install_path, register_func, delete_after_install=True)
+    return install_deps(plugin_path, quiet, cache), plugin_path
 
 
-def install_from_repo(pkgname, plugin_type, install_path, register_func):
-    """Install plugin from online repo."""
-    rsession = requests.Session()
-    rsession.mount("https://", HTTPAdapter(max_retries=3))
+def install_from_repo(pkgname, plugin_type, install_path, register_func, cache=None, quiet=False, repo=None):
+    """Install plugin from online repo, see :func:`fetch_from_repo`."""
+    pkgfile, temporary = fetch_from_repo(pkgname, plugin_type, cache, quiet, repo)
+    return install_from_zip(pkgfile, install_path, register_func, delete_after_install=temporary, cache=cache,
+                            quiet=quiet)
+
+
+def fetch_from_repo(pkgname, plugin_type, cache=None, quiet=False, repo=None):
+    """Return the zip of a plugin in the online repo, downloading it unless the cached copy is current.
+
+    Plugins in a local repository (a mirror, see :func:`honeycomb.utils.repo.mirror`) are used from their zip in
+    place, without downloading them.
+
+    :param cache: :class:`honeycomb.utils.cache.PluginCache` to check before downloading and to store downloads in
+    :param repo: Repository URL or path, see :func:`honeycomb.utils.repo.get_repo_url`
+    :returns: Tuple of the path of the zip and whether it is a temporary file to delete once installed
+    """
+    entry = cache.lookup(plugin_type, pkgname) if cache else None
+    if cache and cache.offline:
+        if not entry:
+            raise exceptions.PluginNotCached(pkgname)
+        logger.debug("offline, installing %s from cache", pkgname)
+        return cache.blob_path(entry[SHA256]), False
+
+    import requests  # imported when needed, it takes longer to import than most commands take to run
+    rsession = get_session()
 
     logger.debug("trying to install %s from online repo", pkgname)
-    pkgurl = "{}/{}s/{}.zip".format(defs.GITHUB_RAW, plugin_type, pkgname)
+    pkgurl = plugin_url(plugin_type, pkgname, repo)
     try:
-        logger.debug("Requesting HTTP HEAD: %s", pkgurl)
-        r = rsession.head(pkgurl)
-        r.raise_for_status()
-        total_size = int(r.headers.get("content-length", 0))
-        pkgsize = _sizeof_fmt(total_size)
-        with click.progressbar(length=total_size, label="Downloading {} {} ({}).."
-                               .format(plugin_type, pkgname, pkgsize)) as bar:
-            r = rsession.get(pkgurl, stream=True)
-            with tempfile.NamedTemporaryFile(delete=False) as f:
-                downloaded_bytes = 0
-                for chunk in r.iter_content(chunk_size=1):  # TODO: Consider increasing to reduce cycles
-                    if chunk:
-                        f.write(chunk)
-                        downloaded_bytes += len(chunk)
-                        bar.update(downloaded_bytes)
-        return install_from_zip(f.name, install_path, register_func, delete_after_install=True)
+        # always revalidated (usually a 304), the checksum has to match the zip that is about to be downloaded
+        catalog_entry = get_plugin_info("{}s".format(plugin_type), pkgname, cache, ttl=0, repo=repo)
+        sha256sum = catalog_entry.get(SHA256) if catalog_entry else get_published_checksum(rsession, pkgurl)
+        localfile = get_local_path(pkgurl)
+        if localfile:
+            if not os.path.exists(localfile):
+                raise exceptions.PluginNotFoundInOnlineRepo(pkgname)
+            if sha256sum and hash_file(localfile) != sha256sum:
+                raise exceptions.PluginChecksumMismatch("{} {}".format(plugin_type, pkgname))
+            logger.debug("installing %s from local repository %s", pkgname, localfile)
+            return localfile, False
+        if entry and sha256sum == entry[SHA256]:
+            headers = None
+        elif cache:
+            # partial downloads are resumed, only from the cache where nobody else can plant them
+            pkgfile = cache.download_path(plugin_type, pkgname)
+            # without a published checksum a cached copy is revalidated with its ETag
+            headers = download_file(rsession, pkgurl, pkgfile, "{} {}".format(plugin_type, pkgname), sha256sum,
+                                    etag=entry[ETAG] if entry and not sha256sum else None, show_progress=not quiet)
+        else:
+            fd, pkgfile = tempfile.mkstemp(prefix="honeycomb_{}_{}".format(plugin_type, pkgname), suffix=".zip")
+            os.close(fd)
+            try:
+                headers = download_file(rsession, pkgurl, pkgfile, "{} {}".format(plugin_type, pkgname), sha256sum,
+                                        show_progress=not quiet)
+            except BaseException:
+                for path in (pkgfile, pkgfile + defs.PARTIAL_DOWNLOAD_SUFFIX):
+                    if os.path.lexists(path):
+                        os.remove(path)
+                raise
     except requests.exceptions.HTTPError as exc:
         logger.debug(str(exc))
         raise exceptions.PluginNotFoundInOnlineRepo(pkgname)
-    except requests.exceptions.ConnectionError as exc:
+    except (requests.exceptions.ConnectionError, requests.exceptions.ChunkedEncodingError) as exc:
         logger.debug(str(exc))
         raise exceptions.PluginRepoConnectionError()
 
+    if headers is None:
+        logger.debug("%s is up to date in cache", pkgname)
+        return cache.blob_path(entry[SHA256]), False
+    if cache:
+        return cache.add(plugin_type, pkgname, pkgfile, move=True, etag=headers.get("ETag")), False
+    return pkgfile, True
+
+
+def get_published_checksum(rsession, url):
+    """Return the SHA-256 checksum published next to url (as ``<url>.sha256``), or None if there is none."""
+    import requests
+    r = rsession.get(url + defs.CHECKSUM_SUFFIX)
+    if r.status_code == requests.codes.not_found:
+        logger.debug("no checksum published for %s", url)
+        return None
+    r.raise_for_status()
+    return r.text.split()[0].lower()
+
+
+def _resumable(partpath):
+    """Return True if partpath is a partial download this user left, never resume a file someone else planted."""
+    try:
+        st = os.lstat(partpath)
+    except OSError:
+        return False
+    if S_ISREG(st.st_mode) and owned_by_user(st):
+        return True
+    logger.debug("not resuming %s, it is not a file owned by the current user", partpath)
+    return False
+
+
+def _open_partial(partpath, offset):
+    """Open a partial download to append to it at offset, or to start it over, without following symlinks."""
+    flags = os.O_WRONLY | O_NOFOLLOW | O_BINARY
+    if offset:
+        flags |= os.O_APPEND
+    else:
+        if os.path.lexists(partpath):
+            os.remove(partpath)
+        flags |= os.O_CREAT | os.O_EXCL
+    return os.fdopen(os.open(partpath, flags, 0o600), "ab" if offset else "wb")
+
+
+def _hash_file(path, sha256):
+    """Feed the contents of path into sha256 and return its size."""
+    size = 0
+    with os.fdopen(os.open(path, READ_FLAGS | O_NOFOLLOW), "rb") as f:
+        for block in iter(lambda: f.read(defs.DOWNLOAD_CHUNK_SIZE), b""):
+            sha256.update(block)
+            size += len(block)
+    return size
+
+
+def download_file(rsession, url, path, label, sha256sum=None, etag=None, show_progress=True):
+    """Download url to path.
+
+    The file is downloaded to ``path.part`` first, if it already exists (an interrupted download) only the rest
+    of the file is requested with a Range header, and the download is resumed the same way if the connection
+    drops. A partial file is only resumed if it is a regular file owned by the current user and is never written
+    through a symlink, so path should be in a folder only the current user can write to (see
+    :meth:`honeycomb.utils.cache.PluginCache.download_path`). The downloaded file is verified against sha256sum
+    before it is moved to path.
+
+    :param rsession: :class:`requests.Session` to use
+    :param label: Name to show in the progress bar
+    :param sha256sum: Expected SHA-256 hex digest, None to skip verification
+    :param etag: ETag of a cached copy of the file, nothing is downloaded if it is still current
+    :param show_progress: Show a progress bar
+    :returns: Response headers, or None if the cached copy is not modified
+    :raises: :class:`honeycomb.exceptions.PluginChecksumMismatch` if the checksum does not match
+    """
+    import requests
+    partpath = path + defs.PARTIAL_DOWNLOAD_SUFFIX
+    sha256 = hashlib.sha256()
+    resumed = offset = _hash_file(partpath, sha256) if _resumable(partpath) else 0
+
+    for attempt in range(defs.DOWNLOAD_RETRIES):
+        if offset:
+            headers = {"Range": "bytes={}-".format(offset)}
+        else:
+            headers = {"If-None-Match": etag} if etag else {}
+        r = rsession.get(url, headers=headers, stream=True)
+        if r.status_code == requests.codes.not_modified:
+            return None
+        if offset and r.status_code != requests.codes.partial_content:
+            # the server ignored the range or the partial file is not a prefix of the remote file, start over
+            logger.debug("cannot resume %s (HTTP %d), downloading from start", url, r.status_code)
+            if r.status_code == requests.codes.requested_range_not_satisfiable:
+                r = rsession.get(url, stream=True)
+            sha256 = hashlib.sha256()
+            offset = 0
+        r.raise_for_status()
+
+        total_size = offset + int(r.headers.get("content-length", 0))
+        try:
+            progressbar = click.progressbar if show_progress else _NoProgressBar
+            with _open_partial(partpath, offset) as f, \
+                    progressbar(length=total_size, label="Downloading {} ({})..".format(
+                        label, _sizeof_fmt(total_size))) as bar:
+                bar.update(offset)
+                pending, last_update = 0, time.time()
+                for chunk in r.iter_content(chunk_size=defs.DOWNLOAD_CHUNK_SIZE):
+                    f.write(chunk)
+                    sha256.update(chunk)
+                    offset += len(chunk)
+                    pending += len(chunk)
+                    if time.time() - last_update >= defs.DOWNLOAD_PROGRESS_INTERVAL:
+                        bar.update(pending)
+                        pending, last_update = 0, time.time()
+                bar.update(pending)
+            break
+        except (requests.exceptions.ConnectionError, requests.exceptions.ChunkedEncodingError) as exc:
+            if attempt + 1 == defs.DOWNLOAD_RETRIES:
+                raise
+            logger.debug("download of %s interrupted at %d bytes (%s), resuming", url, offset, exc)
+
+    if sha256sum and sha256.hexdigest() != sha256sum:
+        os.remove(partpath)
+        if resumed:
+            # the partial file may have been left by an older version of the plugin, try once more from scratch
+            logger.debug("checksum mismatch after resuming %s, downloading from start", url)
+            return download_file(rsession, url, path, label, sha256sum, show_progress=show_progress)
+        raise exceptions.PluginChecksumMismatch(label)
+
+    if os.path.exists(path):
+        os.remove(path)
+    os.rename(partpath, path)
+    return r.headers
+
+
+class _NoProgressBar(object):
+    """Stand-in for :func:`click.progressbar` that shows nothing."""
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+    def update(self, n_steps):
+        pass
+
 
 def _sizeof_fmt(num, suffix="B"):
     if not num:
@@ -243,6 +862,181 @@ def _sizeof_fmt(num, suffix="B"):
     return "%.1f%s%s".format(num, "Yi", suffix)
 
 
+def build_manifest(plugin_path):
+    """Return the SHA-256 of every file of a plugin, keyed by their path relative to plugin_path ('/' separated).
+
+    Dependencies, bytecode, files written by running plugins and the manifest itself are not part of the manifest,
+    they are not shipped with the plugin.
+    """
+    manifest = {}
+    for root, dirs, filenames in os.walk(plugin_path):
+        if root == plugin_path:
+            dirs[:] = [_ for _ in dirs if _ not in (defs.DEPS_DIR, ) + defs.RUNTIME_FILES]
+        dirs[:] = [_ for _ in dirs if _ != "__pycache__"]
+        for filename in filenames:
+            if root == plugin_path and filename in (defs.DEPS_ZIP, defs.MANIFEST_FILE) + defs.RUNTIME_FILES:
+                continue
+            if filename.endswith(".pyc"):
+                continue
+            filepath = os.path.join(root, filename)
+            manifest[os.path.relpath(filepath, plugin_path).replace(os.sep, "/")] = hash_file(filepath)
+    return manifest
+
+
+def write_manifest(plugin_path, manifest=None):
+    """Write the manifest of an installed plugin, see :func:`build_manifest`."""
+    if manifest is None:
+        manifest = build_manifest(plugin_path)
+    with open(os.path.join(plugin_path, defs.MANIFEST_FILE), "w") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    return manifest
+
+
+def read_manifest(plugin_path):
+    """Return the manifest of an installed plugin, built from its files if it was installed without one."""
+    try:
+        with open(os.path.join(plugin_path, defs.MANIFEST_FILE), "r") as f:
+            return json.load(f)
+    except (IOError, OSError, ValueError):
+        logger.debug("%s has no manifest, hashing its files", plugin_path)
+        return build_manifest(plugin_path)
+
+
+_renameat2 = []
+
+
+def exchange(path1, path2):
+    """Swap two folders, atomically with renameat2(RENAME_EXCHANGE) on Linux.
+
+    Elsewhere (or on filesystems without RENAME_EXCHANGE) path2 is moved aside and path1 renamed in its place, which
+    leaves path2 missing for the time between the two renames.
+    """
+    if not _renameat2:
+        try:
+            libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+            _renameat2.append(libc.renameat2)
+        except (OSError, AttributeError, TypeError):
+            _renameat2.append(None)
+    if _renameat2[0]:
+        if _renameat2[0](AT_FDCWD, _fsencode(path1), AT_FDCWD, _fsencode(path2), RENAME_EXCHANGE) == 0:
+            return
+        logger.debug("renameat2 failed: %s", os.strerror(ctypes.get_errno()))
+
+    tmppath = make_staging_dir(os.path.dirname(path2))
+    os.rmdir(tmppath)
+    os.rename(path2, tmppath)
+    os.rename(path1, path2)
+    os.rename(tmppath, path1)
+
+
+def _fsencode(path):
+    return path if isinstance(path, bytes) else path.encode(sys.getfilesystemencoding())
+
+
+def upgrade_plugin(pkgpath, plugin_type, install_path, register_func, cache=None, quiet=False,
+                   bytecode=BYTECODE_NONE, pack_deps=False, repo=None):
+    """Upgrade an installed plugin, copying only the files that changed.
+
+    The new version is assembled in a staging folder next to the installed plugin: files whose SHA-256 matches the
+    manifest of the installed version are hardlinked from it, only changed files are copied. The dependencies are
+    hardlinked as well unless requirements.txt changed, and so are the arguments and logs of the running plugin. The
+    staging folder is then swapped with the installed plugin in one rename, running daemons only ever see the old or
+    the new version, and the old version is removed.
+
+    pkgpath, register_func, cache, quiet, bytecode, pack_deps and repo are the same as :func:`install_plugin`.
+    :returns: Path of the upgraded plugin
+    """
+    if not os.path.exists(install_path):
+        raise exceptions.PluginNotInstalled(pkgpath)
+    start = time.time()
+    remove_stale_staging_dirs(install_path)
+    stagingdir = make_staging_dir(install_path)
+    srcdir = None
+    try:
+        if os.path.isdir(pkgpath):
+            sourcedir = pkgpath
+        else:
+            if os.path.exists(pkgpath):
+                pkgfile, temporary = pkgpath, False
+            else:
+                if not quiet:
+                    click.secho("Collecting {}..".format(pkgpath))
+                pkgfile, temporary = fetch_from_repo(pkgpath, plugin_type, cache, quiet, repo)
+            srcdir = sourcedir = make_staging_dir(install_path)
+            try:
+                with zipfile.ZipFile(pkgfile) as pkgzip:
+                    pkgzip.extractall(srcdir)
+            except zipfile.BadZipfile as exc:
+                logger.debug(str(exc))
+                raise click.ClickException(str(exc))
+            finally:
+                if temporary:
+                    os.remove(pkgfile)
+
+        plugin = register_func(sourcedir)
+        plugin_path = os.path.join(install_path, plugin.name)
+        if os.path.islink(plugin_path):
+            raise click.BadParameter("plugins installed in editable mode are upgraded in place", param_hint=pkgpath)
+        if not os.path.isdir(plugin_path):
+            raise exceptions.PluginNotInstalled(plugin.name)
+
+        old_manifest = read_manifest(plugin_path)
+        manifest = build_manifest(sourcedir)
+        changed = [_ for _ in manifest if old_manifest.get(_) != manifest[_]]
+        for relpath in sorted(manifest):
+            dst = os.path.join(stagingdir, *relpath.split("/"))
+            if not os.path.isdir(os.path.dirname(dst)):
+                os.makedirs(os.path.dirname(dst))
+            if relpath in changed:
+                copy_file(os.path.join(sourcedir, *relpath.split("/")), dst, link=srcdir is not None)
+            else:
+                copy_file(os.path.join(plugin_path, *relpath.split("/")), dst, link=True)
+        logger.debug("%s: %d of %d files changed", plugin.name, len(changed), len(manifest),
+                     extra={"changed": sorted(changed)})
+
+        reuse_deps = old_manifest.get(REQUIREMENTS_FILE) == manifest.get(REQUIREMENTS_FILE)
+        if reuse_deps:
+            logger.debug("requirements of %s did not change, linking its dependencies", plugin.name)
+            if os.path.isdir(os.path.join(plugin_path, defs.DEPS_DIR)):
+                copy_tree(os.path.join(plugin_path, defs.DEPS_DIR), os.path.join(stagingdir, defs.DEPS_DIR),
+                          symlinks=True, link=True)
+            if os.path.exists(os.path.join(plugin_path, defs.DEPS_ZIP)):
+                copy_file(os.path.join(plugin_path, defs.DEPS_ZIP), os.path.join(stagingdir, defs.DEPS_ZIP),
+                          link=True)
+            pip_status = 0
+        else:
+            pip_status = install_deps(stagingdir, quiet, cache)
+
+        for name in defs.RUNTIME_FILES:
+            if os.path.isdir(os.path.join(plugin_path, name)):
+                copy_tree(os.path.join(plugin_path, name), os.path.join(stagingdir, name), link=True)
+            elif os.path.exists(os.path.join(plugin_path, name)):
+                copy_file(os.path.join(plugin_path, name), os.path.join(stagingdir, name), link=True)
+
+        write_manifest(stagingdir, manifest)
+        if pack_deps:
+            zip_deps(stagingdir, ddir=plugin_path)
+        if bytecode != BYTECODE_NONE:
+            compile_plugin(stagingdir, unchecked_hash=bytecode == BYTECODE_UNCHECKED_HASH, ddir=plugin_path)
+
+        exchange(stagingdir, plugin_path)
+    finally:
+        # after the exchange the staging folder holds the old version
+        shutil.rmtree(stagingdir, ignore_errors=True)
+        if srcdir:
+            shutil.rmtree(srcdir, ignore_errors=True)
+
+    message = "{} of {} files changed, dependencies {}".format(
+        len(changed), len(manifest), "unchanged" if reuse_deps else "reinstalled")
+    logger.debug("upgraded %s in %.2fs, %s", plugin.name, time.time() - start, message)
+    if pip_status == 0:
+        click.secho("[+] {} upgraded ({})".format(plugin.name, message))
+    else:
+        click.secho("[-] {} upgraded but something was odd with dependency install, please review debug logs"
+                    .format(plugin.name))
+    return plugin_path
+
+
 def uninstall_plugin(pkgpath, force):
     """Uninstall a plugin.
 
@@ -250,7 +1044,11 @@ def uninstall_plugin(pkgpath, force):
     :param force: Force uninstall without asking
     """
     pkgname = os.path.basename(pkgpath)
-    if os.path.exists(pkgpath):
+    if os.path.islink(pkgpath):
+        # editable install, keep the linked source folder
+        os.remove(pkgpath)
+        click.secho("[*] Uninstalled {}".format(pkgname))
+    elif os.path.exists(pkgpath):
         if not force:
             click.confirm("[?] Are you sure you want to delete `{}` from honeycomb?".format(pkgname),
                           abort=True)
@@ -264,27 +1062,38 @@ def uninstall_plugin(pkgpath, force):
         click.secho("[-] doh! I cannot seem to find `{}`, are you sure it's installed?".format(pkgname))
 
 
-def list_remote_plugins(installed_plugins, plugin_type):
-    """List remote plugins from online repo."""
+def list_remote_plugins(installed_plugins, plugin_type, cache=None, repo=None):
+    """List remote plugins from online repo.
+
+    :param cache: Optional :class:`honeycomb.utils.cache.PluginCache` keeping the remote catalog
+    :param repo: Repository URL or path, see :func:`honeycomb.utils.repo.get_repo_url`
+    """
     click.secho("\n[*] Additional plugins from online repository:")
-    try:
-        rsession = requests.Session()
-        rsession.mount("https://", HTTPAdapter(max_retries=3))
+    catalog = get_catalog(cache, repo=repo)
+    if catalog is not None:
+        plugins = sorted(catalog.get("{}s".format(plugin_type), {}))
+    elif cache and cache.offline:
+        raise exceptions.PluginNotCached("the {}s list".format(plugin_type))
+    else:
+        import requests
+        try:
+            r = get_session().get("{0}/{1}s/{1}s.txt".format(get_repo_url(repo), plugin_type))
+            logger.debug("fetching %ss from remote repo", plugin_type)
+            plugins = r.text.splitlines()
 
-        r = rsession.get("{0}/{1}s/{1}s.txt".format(defs.GITHUB_RAW, plugin_type))
-        logger.debug("fetching %ss from remote repo", plugin_type)
-        plugins = [_ for _ in r.text.splitlines() if _ not in installed_plugins]
-        click.secho(" ".join(plugins))
+        except requests.exceptions.ConnectionError as exc:
+            logger.debug(str(exc), exc_info=True)
+            raise click.ClickException("Unable to fetch {} information from online repository".format(plugin_type))
 
-    except requests.exceptions.ConnectionError as exc:
-        logger.debug(str(exc), exc_info=True)
-        raise click.ClickException("Unable to fetch {} information from online repository".format(plugin_type))
+    click.secho(" ".join(_ for _ in plugins if _ not in installed_plugins))
 
 
 def list_local_plugins(plugin_type, plugins_path, plugin_details):
     """List local plugins with details."""
     installed_plugins = list()
     for plugin in next(os.walk(plugins_path))[1]:
+        if plugin.startswith("."):
+            continue  # staging folder of an install in progress
         s = plugin_details(plugin)
         installed_plugins.append(plugin)
         click.secho(s)
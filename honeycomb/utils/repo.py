@@ -0,0 +1,267 @@
+# -*- coding: utf-8 -*-
+"""Honeycomb plugin repository access.
+
+The repository plugins are installed from defaults to :obj:`honeycomb.defs.GITHUB_RAW` and can be changed with
+``--repo`` (``HC_REPO``) or the ``repository`` key of honeycomb.yml. Any base URL with the same layout works::
+
+    catalog.json
+    services/services.txt
+    services/<name>.zip
+    services/<name>.zip.sha256
+    integrations/...
+
+That includes plain HTTP mirrors and local folders (``file://`` URLs or plain paths), see :func:`mirror`.
+"""
+
+from __future__ import unicode_literals, absolute_import
+
+import io
+import os
+import json
+import time
+import email.utils
+import logging
+import tempfile
+import zipfile
+from multiprocessing.pool import ThreadPool
+
+import six
+from six.moves.urllib.parse import urlparse, unquote
+from six.moves.urllib.request import pathname2url, url2pathname
+
+from honeycomb import defs
+
+logger = logging.getLogger(__name__)
+
+FILE_SCHEME = "file://"
+RANGE_PREFIX = "bytes="
+MIRROR_JOBS = 4
+REQUIREMENTS_FILE = "requirements.txt"
+MIRROR_ETAG = "mirror_etag"
+
+
+def get_repo_url(repo=None):
+    """Return the base URL of a repository, local paths are turned into ``file://`` URLs.
+
+    :param repo: Repository URL or path, None for the default repository
+    """
+    repo = repo or defs.GITHUB_RAW
+    if "://" not in repo:
+        repo = FILE_SCHEME + pathname2url(os.path.abspath(repo))
+    return repo.rstrip("/")
+
+
+def get_local_path(url):
+    """Return the local path of a ``file://`` URL, or None for other URLs."""
+    if not url.startswith(FILE_SCHEME):
+        return None
+    return url2pathname(unquote(urlparse(url).path))
+
+
+def plugin_url(plugin_type, name, repo=None):
+    """Return the URL of a plugin zip.
+
+    :param plugin_type: :obj:`honeycomb.defs.SERVICE` or :obj:`honeycomb.defs.INTEGRATION`
+    """
+    return "{}/{}s/{}.zip".format(get_repo_url(repo), plugin_type, name)
+
+
+def plugin_location(plugin_type, name, repo=None):
+    """Return where a user can browse a plugin, its GitHub folder for the default repository."""
+    if get_repo_url(repo) == get_repo_url(defs.GITHUB_RAW):
+        return defs.GITHUB_URL.format(plugin_type="{}s".format(plugin_type), plugin=name)
+    return plugin_url(plugin_type, name, repo)
+
+
+class FileAdapter(object):
+    """Serve ``file://`` URLs to :mod:`requests`, with ETags and open ended Range requests like a web server.
+
+    Implements the :class:`requests.adapters.BaseAdapter` interface without subclassing it, so requests is not
+    imported with this module.
+    """
+
+    def send(self, request, stream=False, **kwargs):
+        """Answer a GET request from the filesystem."""
+        import requests
+        from requests.structures import CaseInsensitiveDict
+        response = requests.Response()
+        response.request = request
+        response.url = request.url
+        response.headers = CaseInsensitiveDict()
+        response.raw = io.BytesIO(b"")
+        response.headers["Content-Length"] = "0"
+
+        try:
+            f = open(get_local_path(request.url), "rb")
+        except (IOError, OSError):
+            response.status_code, response.reason = requests.codes.not_found, "Not Found"
+            return response
+
+        st = os.fstat(f.fileno())
+        etag = '"{:x}-{:x}"'.format(int(st.st_mtime * 1e6), st.st_size)
+        response.headers["ETag"] = etag
+        response.headers["Last-Modified"] = email.utils.formatdate(st.st_mtime, usegmt=True)
+        range_header = request.headers.get("Range", "")
+        offset = 0
+        if request.headers.get("If-None-Match") == etag:
+            response.status_code, response.reason = requests.codes.not_modified, "Not Modified"
+            f.close()
+            return response
+        if range_header.startswith(RANGE_PREFIX) and range_header.endswith("-"):
+            offset = int(range_header[len(RANGE_PREFIX):-1])
+            if offset >= st.st_size:
+                response.status_code, response.reason = requests.codes.requested_range_not_satisfiable, "Range"
+                f.close()
+                return response
+            response.status_code, response.reason = requests.codes.partial_content, "Partial Content"
+            response.headers["Content-Range"] = "bytes {}-{}/{}".format(offset, st.st_size - 1, st.st_size)
+            f.seek(offset)
+        else:
+            response.status_code, response.reason = requests.codes.ok, "OK"
+
+        response.headers["Content-Length"] = str(st.st_size - offset)
+        if stream:
+            response.raw = f
+        else:
+            response.raw = io.BytesIO(f.read())
+            f.close()
+        return response
+
+    def close(self):
+        """Nothing to clean up."""
+
+
+def get_session():
+    """Return a :class:`requests.Session` for repository access, retrying HTTP(S) and serving ``file://``."""
+    import requests
+    from requests.adapters import HTTPAdapter
+    rsession = requests.Session()
+    rsession.mount("https://", HTTPAdapter(max_retries=3))
+    rsession.mount("http://", HTTPAdapter(max_retries=3))
+    rsession.mount(FILE_SCHEME, FileAdapter())
+    return rsession
+
+
+def _write_atomic(path, data):
+    fd, tmppath = tempfile.mkstemp(prefix=os.path.basename(path), dir=os.path.dirname(path))
+    with os.fdopen(fd, "wb") as f:
+        f.write(data)
+    if os.name != "posix" and os.path.exists(path):
+        os.remove(path)
+    os.rename(tmppath, path)
+
+
+def _read_requirements(zippath):
+    with zipfile.ZipFile(zippath) as pkgzip:
+        if REQUIREMENTS_FILE not in pkgzip.namelist():
+            return []
+        lines = pkgzip.read(REQUIREMENTS_FILE).decode("utf-8").splitlines()
+    return [line.strip() for line in lines if line.strip() and not line.startswith("#")]
+
+
+def is_valid_plugin_name(name):
+    """Return True if name can be used as a file name in the repository (no path separators or dots)."""
+    from honeycomb.utils.config_utils import is_valid_field_name
+    return isinstance(name, six.string_types) and bool(name) and is_valid_field_name(name)
+
+
+def mirror(dest, repo=None, jobs=MIRROR_JOBS):
+    """Sync a local copy of a repository into dest.
+
+    Only plugins whose checksum changed are downloaded, plugins removed from the repository are removed from the
+    mirror. The mirror always gets a ``catalog.json`` (built from the zips if the repository has none), so
+    ``list -r`` and ``show -r`` work against it.
+
+    :param dest: Mirror folder, use it with ``--repo <dest>``
+    :param repo: Repository to mirror, None for the default repository
+    :param jobs: Number of plugins to download in parallel
+    :returns: Tuple of lists of plugins downloaded, up to date and failed (``<plugin type>/<name>`` strings)
+    """
+    import requests
+    from honeycomb.utils.catalog import get_catalog
+    from honeycomb.utils.plugin_utils import download_file, get_published_checksum
+    from honeycomb.utils.cache import hash_file
+
+    repo_url = get_repo_url(repo)
+    rsession = get_session()
+    catalog = get_catalog(ttl=0, repo=repo_url)
+    try:
+        with open(os.path.join(dest, defs.CATALOG_FILE), "r") as f:
+            previous = json.load(f)
+    except (IOError, OSError, ValueError):
+        previous = {}
+    mirrored = {}
+
+    plugins = []
+    invalid = []
+    for plugin_type in (defs.SERVICE, defs.INTEGRATION):
+        plugin_types = "{}s".format(plugin_type)
+        if not os.path.exists(os.path.join(dest, plugin_types)):
+            os.makedirs(os.path.join(dest, plugin_types))
+        if catalog is not None:
+            names = sorted(catalog.get(plugin_types, {}))
+        else:
+            r = rsession.get("{0}/{1}/{1}.txt".format(repo_url, plugin_types))
+            if r.status_code != requests.codes.not_found:
+                r.raise_for_status()
+            names = [_.strip() for _ in r.text.splitlines() if _.strip()] if r.ok else []
+        # names come from the repository, never let them lead a path out of the mirror
+        invalid.extend((plugin_type, name) for name in names if not is_valid_plugin_name(name))
+        names = [name for name in names if is_valid_plugin_name(name)]
+        _write_atomic(os.path.join(dest, plugin_types, "{}.txt".format(plugin_types)),
+                      "".join("{}\n".format(_) for _ in names).encode("utf-8"))
+        mirrored[plugin_types] = {}
+        plugins.extend((plugin_type, name) for name in names)
+
+        # plugins that are no longer published
+        for filename in os.listdir(os.path.join(dest, plugin_types)):
+            name = filename.split(".zip")[0]
+            if filename.endswith((".zip", ".zip" + defs.CHECKSUM_SUFFIX)) and name not in names:
+                logger.debug("removing %s from mirror", filename)
+                os.remove(os.path.join(dest, plugin_types, filename))
+
+    def sync(plugin):
+        plugin_type, name = plugin
+        plugin_types = "{}s".format(plugin_type)
+        url = plugin_url(plugin_type, name, repo_url)
+        path = os.path.join(dest, plugin_types, "{}.zip".format(name))
+        entry = dict(catalog[plugin_types][name]) if catalog is not None else {}
+        etag = previous.get(plugin_types, {}).get(name, {}).get(MIRROR_ETAG) if os.path.exists(path) else None
+        try:
+            sha256sum = entry.get("sha256") or get_published_checksum(rsession, url)
+            if os.path.exists(path) and sha256sum and hash_file(path) == sha256sum:
+                state = "current"
+            else:
+                # without a checksum the copy in the mirror is revalidated with the ETag it was served with
+                headers = download_file(rsession, url, path, "{} {}".format(plugin_type, name), sha256sum,
+                                        etag=None if sha256sum else etag, show_progress=False)
+                state = "current" if headers is None else "downloaded"
+                etag = etag if headers is None else headers.get("ETag")
+            entry[MIRROR_ETAG] = etag
+            entry["sha256"] = sha256sum or hash_file(path)
+            entry["size"] = os.path.getsize(path)
+            entry.setdefault("requirements", _read_requirements(path))
+            _write_atomic(path + defs.CHECKSUM_SUFFIX, "{}  {}.zip\n".format(entry["sha256"], name).encode("utf-8"))
+        except Exception as exc:
+            logger.debug("failed mirroring %s %s", plugin_type, name, exc_info=True)
+            return plugin, "failed", str(exc)
+        mirrored[plugin_types][name] = entry
+        return plugin, state, None
+
+    start = time.time()
+    pool = ThreadPool(max(1, min(jobs, len(plugins))))
+    try:
+        results = pool.map(sync, plugins)
+    finally:
+        pool.close()
+        pool.join()
+    for plugin_type, name in invalid:
+        logger.debug("not mirroring %s %r, invalid name", plugin_type, name)
+        results.append(((plugin_type, name), "failed", "invalid name"))
+
+    _write_atomic(os.path.join(dest, defs.CATALOG_FILE), json.dumps(mirrored, indent=2, sort_keys=True).encode())
+    logger.debug("mirrored %s to %s in %.2fs", repo_url, dest, time.time() - start)
+
+    def names(state):
+        return ["{}s/{}".format(*plugin) for plugin, result, _ in results if result == state]
+    return names("downloaded"), names("current"), names("failed")
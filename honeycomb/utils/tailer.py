@@ -2,16 +2,252 @@
 """Honeycomb service log tailer."""
 
 import os
+import re
 import sys
 import time
+import heapq
 import random
 import logging
+import threading
+from datetime import datetime
 
 import click
 from attr import attrs, attrib
 
+from honeycomb.utils.watcher import FileFollower
+
 logger = logging.getLogger(__name__)
 
+BLOCK_SIZE = 64 * 1024
+REORDER_WINDOW = 0.5
+MAX_READS_PER_FILE = 16
+WRITE_BATCH_LINES = 1000
+COMPRESSED_SUFFIXES = (".gz", ".bz2", ".xz", ".zip")
+
+# 2019-02-16 12:00:00,123 / 2019-02-16T12:00:00.123 (logging asctime, ISO 8601)
+ISO_TIMESTAMP_RE = re.compile(r"(\d{4})-(\d{2})-(\d{2})[ T](\d{2}):(\d{2}):(\d{2})(?:[.,](\d{1,6}))?")
+# [16/Feb/2019:12:00:00 +0000] (common log format, as written by BaseHTTPServer based services)
+CLF_TIMESTAMP_RE = re.compile(r"(\d{2})/([A-Z][a-z]{2})/(\d{4}):(\d{2}):(\d{2}):(\d{2})")
+MONTHS = {name: i + 1 for i, name in enumerate(
+    ["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"])}
+
+
+def parse_timestamp(line):
+    """Parse the timestamp of a log line.
+
+    :param line: Log line
+    :returns: A naive :class:`datetime.datetime` or None if the line has no recognizable timestamp
+    """
+    match = ISO_TIMESTAMP_RE.search(line)
+    try:
+        if match:
+            year, month, day, hour, minute, second, fraction = match.groups()
+            microsecond = int(fraction.ljust(6, "0")) if fraction else 0
+            return datetime(int(year), int(month), int(day), int(hour), int(minute), int(second), microsecond)
+
+        match = CLF_TIMESTAMP_RE.search(line)
+        if match:
+            day, month, year, hour, minute, second = match.groups()
+            return datetime(int(year), MONTHS[month], int(day), int(hour), int(minute), int(second))
+    except (ValueError, KeyError):
+        pass
+    return None
+
+
+def timestamp_lines(lines, last_timestamp=None):
+    """Pair lines with their timestamps.
+
+    Lines without a timestamp (e.g. tracebacks) inherit the timestamp of the line before them.
+
+    :param lines: Iterable of log lines
+    :param last_timestamp: Timestamp to use for leading lines without one
+    :returns: Generator of (timestamp, line) tuples
+    """
+    for line in lines:
+        last_timestamp = parse_timestamp(line) or last_timestamp
+        yield last_timestamp or datetime.min, line
+
+
+def read_tail(filepath, nlines):
+    """Return the last nlines lines of a file, decoded in bulk and without newlines."""
+    with open(filepath, "rb") as fh:
+        fh.seek(find_tail_offset(fh, nlines))
+        data = fh.read()
+    lines = data.decode("utf-8", "replace").split("\n")
+    if lines[-1] == "":
+        lines.pop()
+    return lines
+
+
+class LineBuffer(object):
+    """Reassemble lines from arbitrary chunks of bytes.
+
+    Only the bytes up to the last newline of a chunk are decoded (in one call) and split, the rest is kept for the
+    next chunk, so a line is never handed out in pieces and multi-byte characters are never cut.
+    """
+
+    def __init__(self, encoding="utf-8"):
+        """Create an empty buffer.
+
+        :param encoding: Encoding used to decode complete lines
+        """
+        self.encoding = encoding
+        self._buffer = bytearray()
+
+    def feed(self, data):
+        """Add a chunk of bytes.
+
+        :returns: List of the complete lines (decoded, without newlines) found so far
+        """
+        end = data.rfind(b"\n")
+        if end < 0:
+            self._buffer += data
+            return []
+
+        view = memoryview(data)
+        if self._buffer:
+            self._buffer += view[:end]
+            complete = bytes(self._buffer)
+            self._buffer = bytearray(view[end + 1:])
+        else:
+            complete = bytes(view[:end])
+            self._buffer += view[end + 1:]
+        return complete.decode(self.encoding, "replace").split("\n")
+
+    def flush(self):
+        """Return the incomplete line held in the buffer (if any) and empty it."""
+        lines = [bytes(self._buffer).decode(self.encoding, "replace")] if self._buffer else []
+        self._buffer = bytearray()
+        return lines
+
+
+def find_tail_offset(fh, nlines, block_size=BLOCK_SIZE):
+    """Find the offset of the last nlines lines in a binary file handle.
+
+    The file is read backwards in blocks and newlines are counted in bulk, so the cost depends on the size of the
+    tail and not on the size of the file. A trailing newline at the end of the file does not start a new line.
+
+    :param fh: File handle opened in binary mode
+    :param nlines: Number of lines to find
+    :param block_size: Size of blocks read from the end of file
+    :returns: Offset of the first byte of the first line to print
+    """
+    fh.seek(0, os.SEEK_END)
+    end_position = fh.tell()
+    if nlines <= 0:
+        return end_position
+
+    # skip the newline terminating the last line
+    position = end_position - 1
+    line_count = 0
+    while position > 0:
+        read_size = min(block_size, position)
+        position -= read_size
+        fh.seek(position)
+        block = fh.read(read_size)
+
+        newlines = block.count(b"\n")
+        if line_count + newlines < nlines:
+            line_count += newlines
+            continue
+
+        # the wanted newline is in this block, find it from the right
+        index = len(block)
+        for _ in range(nlines - line_count):
+            index = block.rfind(b"\n", 0, index)
+        return position + index + 1
+
+    return 0
+
+
+def _timestamped_line_at(fh, offset):
+    """Return (start, timestamp) of the first timestamped line starting at or after offset, or None."""
+    if offset > 0:
+        # skip the rest of the line offset falls in (offset - 1 may be the newline ending the previous line)
+        fh.seek(offset - 1)
+        fh.readline()
+    else:
+        fh.seek(0)
+
+    while True:
+        start = fh.tell()
+        line = fh.readline()
+        if not line:
+            return None
+        timestamp = parse_timestamp(line.decode("utf-8", "replace"))
+        if timestamp:
+            return start, timestamp
+
+
+def bisect_log(fh, timestamp, after=False):
+    """Binary search a time ordered log file for a timestamp, at line boundaries.
+
+    :param fh: File handle opened in binary mode
+    :param timestamp: :class:`datetime.datetime` to look for
+    :param after: Find the first line later than timestamp instead of the first line at or later than it
+    :returns: Offset of the first matching line (file size if there is none)
+    """
+    fh.seek(0, os.SEEK_END)
+    size = fh.tell()
+
+    def before(found):
+        return found and (found[1] <= timestamp if after else found[1] < timestamp)
+
+    low, high = 0, size
+    while low < high:
+        middle = (low + high) // 2
+        if before(_timestamped_line_at(fh, middle)):
+            low = middle + 1
+        else:
+            high = middle
+
+    found = _timestamped_line_at(fh, low)
+    return found[0] if found else size
+
+
+def log_segments(logpath):
+    """Return a log file and its rotated segments, oldest first.
+
+    Compressed segments are skipped. Segments are ordered by modification time, which works for both numbered
+    (``stdout.log.1``) and dated (``stdout.log-20190216``) rotation.
+    """
+    logdir, logname = os.path.split(logpath)
+    rotated = [os.path.join(logdir, _) for _ in os.listdir(logdir or ".")
+               if _.startswith((logname + ".", logname + "-")) and not _.endswith(COMPRESSED_SUFFIXES)]
+    rotated.sort(key=os.path.getmtime)
+    return rotated + [logpath] if os.path.exists(logpath) else rotated
+
+
+def read_window(logpath, since=None, until=None):
+    """Yield the lines of a log file (and its rotated segments) logged between since and until.
+
+    Every segment is binary searched for the window boundaries, so only the lines in the window are read.
+
+    :param logpath: Path to current log file
+    :param since: Start of window (:class:`datetime.datetime`), None for beginning of log
+    :param until: End of window (inclusive), None for end of log
+    :returns: Generator of decoded lines, without newlines
+    """
+    for segment in log_segments(logpath):
+        with open(segment, "rb") as fh:
+            fh.seek(0, os.SEEK_END)
+            end = bisect_log(fh, until, after=True) if until else fh.tell()
+            start = bisect_log(fh, since) if since else 0
+            logger.debug("reading %s [%d:%d]", segment, start, end)
+
+            fh.seek(start)
+            buf = LineBuffer()
+            remaining = end - start
+            while remaining > 0:
+                data = fh.read(min(BLOCK_SIZE, remaining))
+                if not data:
+                    break
+                remaining -= len(data)
+                for line in buf.feed(data):
+                    yield line
+            for line in buf.flush():
+                yield line
+
 
 @attrs
 class Tailer(object):
@@ -32,6 +268,7 @@ class Tailer(object):
     used_colors = attrib([], type=list)
 
     colors = attrib(["red", "green", "yellow", "magenta", "blue", "cyan"], init=False)
+    running = attrib(False, type=bool, init=False)
 
     def print_log(self, line):
         """Print a line from a logfile."""
@@ -39,7 +276,7 @@ class Tailer(object):
 
     def print_named_log(self, line):
         """Print a line from a logfile prefixed with service name."""
-        click.echo("{}: {}".format(click.style(self.name, fg=self.color), line.replace("\n", "")), file=self.outfile)
+        click.echo("{}: {}".format(self._styled_name, line.replace("\n", "")), file=self.outfile)
 
     def _print(self, line):
         if self.show_name:
@@ -48,20 +285,15 @@ class Tailer(object):
             self.print_log(line)
 
     def follow_file(self):
-        """Follow a file and send every new line to a callback."""
+        """Follow a file and print every new line, waking up only when the file changes."""
         logger.debug("following %s", self.filepath)
-        with open(self.filepath) as fh:
-            # Go to the end of file
-            fh.seek(0, os.SEEK_END)
-
-            while True:
-                curr_position = fh.tell()
-                line = fh.readline()
-                if not line:
-                    fh.seek(curr_position)
-                    time.sleep(self.sleeptime)
-                else:
-                    self._print(line)
+        self.running = True
+        follower = FileFollower(self.filepath)
+        try:
+            for line in follower.lines(running=lambda: self.running, timeout=self.sleeptime):
+                self._print(line.decode("utf-8", "replace"))
+        finally:
+            follower.close()
 
     def __attrs_post_init__(self):
         """Seek file from end for nlines and call printlog on them, then follow if needed."""
@@ -69,25 +301,10 @@ class Tailer(object):
 
         if not self.color:
             self.color = self.colors[random.randint(0, len(self.colors) - 1)]
+        self._styled_name = click.style(self.name, fg=self.color)
 
-        with open(self.filepath) as fh:
-            fh.seek(0, os.SEEK_END)
-            end_position = curr_position = fh.tell()
-            line_count = 0
-            while curr_position >= 0:
-                fh.seek(curr_position)
-                next_char = fh.read(1)
-                if next_char == "\n" and curr_position != end_position - 1:
-                    line_count += 1
-                    if line_count == self.nlines:
-                        break
-                curr_position -= 1
-
-            if curr_position < 0:
-                fh.seek(0)
-
-            for line in fh.readlines():
-                self._print(line)
+        for line in read_tail(self.filepath, self.nlines):
+            self._print(line)
 
         if self.follow:
             self.follow_file()
@@ -95,3 +312,144 @@ class Tailer(object):
     def stop(self):
         """Stop follow."""
         self.running = False
+
+
+class ReorderBuffer(object):
+    """Hold lines for a short window and release them ordered by timestamp.
+
+    Lines from different files arrive with some delay between them, holding every line for ``window`` seconds
+    lets a late line from one file be printed before newer lines from another.
+    """
+
+    def __init__(self, window=REORDER_WINDOW):
+        """Create an empty buffer.
+
+        :param window: Seconds to hold each line before it can be released
+        """
+        self.window = window
+        self._heap = []
+        self._seq = 0
+
+    def __len__(self):
+        return len(self._heap)
+
+    def push(self, timestamp, item, now=None):
+        """Add an item ordered by timestamp."""
+        arrival = time.time() if now is None else now
+        heapq.heappush(self._heap, (timestamp, self._seq, arrival, item))
+        self._seq += 1
+
+    def pop_ready(self, now=None):
+        """Return the items that were held for the full window, ordered by timestamp."""
+        now = time.time() if now is None else now
+        ready = []
+        while self._heap and self._heap[0][2] + self.window <= now:
+            ready.append(heapq.heappop(self._heap)[3])
+        return ready
+
+    def pop_all(self):
+        """Return all held items, ordered by timestamp."""
+        return [heapq.heappop(self._heap)[3] for _ in range(len(self._heap))]
+
+
+@attrs
+class MultiTailer(object):
+    """Print lines from several log files merged by timestamp, optionally continue to follow them.
+
+    Following is done from a single thread: all files share one watcher event, every file is read in large chunks
+    and split into lines in bulk, and the lines released by the reorder buffer are written out in one call.
+    """
+
+    filepaths = attrib(type=dict)
+    """Dictionary of name to log file path."""
+
+    nlines = attrib(10, type=int)
+    follow = attrib(False, type=bool)
+    outfile = attrib(None)
+    """File to print to, defaults to the current stdout."""
+    sleeptime = attrib(0.5, type=int)
+    show_name = attrib(True, type=bool)
+    reorder_window = attrib(REORDER_WINDOW, type=float)
+    since = attrib(None, type=datetime)
+    """Print lines logged from this time on instead of the last nlines (searches rotated segments too)."""
+    until = attrib(None, type=datetime)
+    """Print lines logged up to this time instead of the last nlines."""
+
+    colors = attrib(["red", "green", "yellow", "magenta", "blue", "cyan"], init=False)
+    running = attrib(False, type=bool, init=False)
+
+    def __attrs_post_init__(self):
+        """Style every name once, with a distinct color."""
+        self.prefixes = {}
+        for i, name in enumerate(sorted(self.filepaths)):
+            color = self.colors[i % len(self.colors)]
+            self.prefixes[name] = "{}: ".format(click.style(name, fg=color)) if self.show_name else ""
+
+    def _write(self, items):
+        if items:
+            click.echo("".join("{}{}\n".format(self.prefixes[name], line) for name, line in items),
+                       file=self.outfile, nl=False)
+
+    def _backlog(self):
+        """Merge the last nlines (or the since/until window) of every file.
+
+        This is a k-way heap merge, every file is already in time order.
+        """
+        streams = []
+        for index, (name, filepath) in enumerate(sorted(self.filepaths.items())):
+            if self.since or self.until:
+                lines = read_window(filepath, self.since, self.until)
+            else:
+                lines = read_tail(filepath, self.nlines)
+            streams.append((timestamp, index, seq, name, line)
+                           for seq, (timestamp, line) in enumerate(timestamp_lines(lines)))
+
+        last_timestamps = {}
+        batch = []
+        for timestamp, _, _, name, line in heapq.merge(*streams):
+            last_timestamps[name] = timestamp
+            batch.append((name, line))
+            if len(batch) >= WRITE_BATCH_LINES:
+                self._write(batch)
+                batch = []
+        self._write(batch)
+        return last_timestamps
+
+    def _follow(self, last_timestamps):
+        event = threading.Event()
+        followers = {name: FileFollower(path, event=event) for name, path in self.filepaths.items()}
+        buffers = {name: LineBuffer() for name in self.filepaths}
+        reorder = ReorderBuffer(self.reorder_window)
+
+        try:
+            while self.running:
+                event.clear()
+                for name, follower in followers.items():
+                    for _ in range(MAX_READS_PER_FILE):
+                        data = follower.read()
+                        if not data:
+                            break
+                        lines = buffers[name].feed(data)
+                        for timestamp, line in timestamp_lines(lines, last_timestamps.get(name)):
+                            reorder.push(timestamp, (name, line))
+                        if lines:
+                            last_timestamps[name] = timestamp
+
+                self._write(reorder.pop_ready())
+                event.wait(min(self.sleeptime, self.reorder_window) if len(reorder) else self.sleeptime)
+        finally:
+            for follower in followers.values():
+                follower.close()
+
+        self._write(reorder.pop_all())
+
+    def run(self):
+        """Print the merged backlog, then follow if needed."""
+        last_timestamps = self._backlog()
+        if self.follow:
+            self.running = True
+            self._follow(last_timestamps)
+
+    def stop(self):
+        """Stop follow."""
+        self.running = False
@@ -0,0 +1,372 @@
+# -*- coding: utf-8 -*-
+"""Honeycomb file watcher.
+
+A single background thread watches many files and wakes up readers only when one of their files changes.
+On Linux the thread blocks on inotify (through ctypes), elsewhere it falls back to polling ``os.stat``.
+"""
+
+from __future__ import unicode_literals, absolute_import
+
+import os
+import sys
+import time
+import errno
+import select
+import struct
+import logging
+import threading
+import ctypes
+import ctypes.util
+
+from attr import attrs, attrib, Factory
+
+logger = logging.getLogger(__name__)
+
+POLL_INTERVAL = 0.25
+WAIT_TIMEOUT = 1
+READ_SIZE = 64 * 1024
+
+# inotify flags, see inotify(7)
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_IGNORED = 0x00008000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+DIR_WATCH_MASK = (IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE |
+                  IN_DELETE_SELF | IN_MOVE_SELF)
+EVENT_HEADER = struct.Struct("iIII")
+
+
+def get_file_id(file_stat):
+    """Return a string identifying a file across renames, used to detect rotation."""
+    if os.name == "posix":
+        # st_dev: Device inode resides on.
+        # st_ino: Inode number.
+        return "%xg%x" % (file_stat.st_dev, file_stat.st_ino)
+    return "%f" % file_stat.st_ctime
+
+
+@attrs
+class Watch(object):
+    """A registered file, set when the file (or its directory entry) changes.
+
+    Several watches may share the same :class:`threading.Event` so a reader can wait on many files at once.
+    """
+
+    path = attrib(type=str)
+    event = attrib(default=Factory(threading.Event))
+    changed = attrib(True, type=bool)
+    """Set on every notification, cleared by the reader once it handled the change."""
+
+    def notify(self):
+        """Wake up whoever is waiting on this watch."""
+        self.changed = True
+        self.event.set()
+
+    def wait(self, timeout=WAIT_TIMEOUT):
+        """Wait until the file changes or timeout expires.
+
+        :returns: True if the file changed
+        """
+        changed = self.event.wait(timeout)
+        self.event.clear()
+        return changed
+
+
+class FileWatcher(object):
+    """Watch files from one background thread, using inotify where available with a polling fallback."""
+
+    def __init__(self, interval=POLL_INTERVAL, use_inotify=True):
+        """Create a watcher, the thread is started on the first call to :func:`watch`.
+
+        :param interval: Polling interval for the fallback implementation (and inotify select timeout)
+        :param use_inotify: Try to use inotify (Linux only)
+        """
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._watches = {}  # path -> list of Watch
+        self._thread = None
+        self._running = False
+        self._inotify = _Inotify.create() if use_inotify else None
+        self._stats = {}  # path -> stat signature, used by the polling fallback
+
+    @property
+    def backend(self):
+        """Name of the active watch backend."""
+        return "inotify" if self._inotify else "poll"
+
+    def watch(self, path, event=None):
+        """Start watching path.
+
+        :param path: Path to file, it does not have to exist yet
+        :param event: Optional :class:`threading.Event` to set on change (shared between watches)
+        :returns: :class:`Watch`
+        """
+        path = os.path.realpath(path)
+        watch = Watch(path) if event is None else Watch(path, event)
+        with self._lock:
+            self._watches.setdefault(path, []).append(watch)
+            if self._inotify:
+                self._inotify.add(os.path.dirname(path))
+            else:
+                self._stats[path] = self._stat_signature(path)
+        self._start()
+        return watch
+
+    def unwatch(self, watch):
+        """Stop watching.
+
+        :param watch: :class:`Watch` returned by :func:`watch`
+        """
+        with self._lock:
+            watches = self._watches.get(watch.path, [])
+            if watch in watches:
+                watches.remove(watch)
+            if not watches:
+                self._watches.pop(watch.path, None)
+                self._stats.pop(watch.path, None)
+                if self._inotify:
+                    dirname = os.path.dirname(watch.path)
+                    if not any(os.path.dirname(_) == dirname for _ in self._watches):
+                        self._inotify.remove(dirname)
+
+    def stop(self):
+        """Stop the watcher thread."""
+        self._running = False
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+
+    def _start(self):
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._running = True
+            self._thread = threading.Thread(target=self._run, name="honeycomb-file-watcher")
+            self._thread.daemon = True
+            self._thread.start()
+
+    def _run(self):
+        logger.debug("file watcher started (%s)", self.backend)
+        while self._running:
+            try:
+                if self._inotify:
+                    self._run_inotify()
+                else:
+                    self._run_poll()
+            except Exception as exc:
+                logger.exception(exc)
+        logger.debug("file watcher stopped")
+
+    def _notify(self, path):
+        with self._lock:
+            watches = list(self._watches.get(path, []))
+        for watch in watches:
+            watch.notify()
+
+    def _notify_dir(self, dirname):
+        with self._lock:
+            watches = [w for path, ws in self._watches.items() if os.path.dirname(path) == dirname for w in ws]
+        for watch in watches:
+            watch.notify()
+
+    def _run_inotify(self):
+        for dirname, name, mask in self._inotify.read_events(self.interval):
+            if name:
+                self._notify(os.path.join(dirname, name))
+            elif mask & (IN_DELETE_SELF | IN_MOVE_SELF | IN_IGNORED):
+                self._notify_dir(dirname)
+
+    @staticmethod
+    def _stat_signature(path):
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        return get_file_id(st), st.st_size, st.st_mtime
+
+    def _run_poll(self):
+        with self._lock:
+            paths = list(self._watches)
+        for path in paths:
+            signature = self._stat_signature(path)
+            if self._stats.get(path) != signature:
+                self._stats[path] = signature
+                self._notify(path)
+        time.sleep(self.interval)
+
+
+class _Inotify(object):
+    """Minimal ctypes inotify binding watching directories."""
+
+    def __init__(self, libc, fd):
+        self.libc = libc
+        self.fd = fd
+        self.wds = {}  # wd -> dirname
+        self.dirs = {}  # dirname -> wd
+
+    @classmethod
+    def create(cls):
+        if not sys.platform.startswith("linux"):
+            return None
+        try:
+            libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+            fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        except (OSError, AttributeError) as exc:
+            logger.debug("inotify unavailable: %s", exc)
+            return None
+        if fd < 0:
+            logger.debug("inotify_init1 failed: %s", os.strerror(ctypes.get_errno()))
+            return None
+        return cls(libc, fd)
+
+    def add(self, dirname):
+        if dirname in self.dirs:
+            return
+        wd = self.libc.inotify_add_watch(self.fd, dirname.encode(sys.getfilesystemencoding()), DIR_WATCH_MASK)
+        if wd < 0:
+            logger.debug("inotify_add_watch(%s) failed: %s", dirname, os.strerror(ctypes.get_errno()))
+            return
+        self.wds[wd] = dirname
+        self.dirs[dirname] = wd
+
+    def remove(self, dirname):
+        wd = self.dirs.pop(dirname, None)
+        if wd is not None:
+            self.wds.pop(wd, None)
+            self.libc.inotify_rm_watch(self.fd, wd)
+
+    def read_events(self, timeout):
+        """Block up to timeout seconds and return a list of (dirname, name, mask) tuples."""
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return []
+        try:
+            data = os.read(self.fd, READ_SIZE)
+        except OSError as exc:
+            if exc.errno == errno.EAGAIN:
+                return []
+            raise
+
+        events = []
+        offset = 0
+        while offset + EVENT_HEADER.size <= len(data):
+            wd, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size
+            name = data[offset:offset + length].rstrip(b"\0").decode(sys.getfilesystemencoding())
+            offset += length
+            dirname = self.wds.get(wd)
+            if dirname is not None:
+                events.append((dirname, name, mask))
+            if mask & IN_IGNORED:
+                self.dirs.pop(self.wds.pop(wd, None), None)
+        return events
+
+
+_watcher = None
+_watcher_lock = threading.Lock()
+
+
+def get_watcher():
+    """Return the process wide :class:`FileWatcher`."""
+    global _watcher
+    with _watcher_lock:
+        if _watcher is None:
+            _watcher = FileWatcher()
+        return _watcher
+
+
+class FileFollower(object):
+    """Follow a growing file, reopening it when rotated and rewinding it when truncated.
+
+    The file is opened at its end, the rotation/truncation check (an ``os.stat``) only runs after the watcher
+    reported a change to this file and there was nothing left to read, so many followers can share one event.
+    """
+
+    def __init__(self, path, watcher=None, event=None, from_end=True):
+        """Open path and register it with the watcher.
+
+        :param path: Path to file
+        :param watcher: :class:`FileWatcher` to use, defaults to :func:`get_watcher`
+        :param event: Optional shared :class:`threading.Event` (see :func:`FileWatcher.watch`)
+        :param from_end: Start reading from the end of the file
+        """
+        self.path = path
+        self.watcher = watcher or get_watcher()
+        self.watch = self.watcher.watch(path, event)
+        self._fh, self._file_id = self._open()
+        if from_end:
+            self._fh.seek(0, os.SEEK_END)
+        self._partial = b""
+
+    def _open(self):
+        fh = open(self.path, "rb")
+        return fh, get_file_id(os.fstat(fh.fileno()))
+
+    def read(self, size=READ_SIZE):
+        """Read whatever is available without blocking, following rotation and truncation.
+
+        :returns: Bytes read, empty if there is no new data
+        """
+        data = self._fh.read(size)
+        if data or not self.watch.changed:
+            return data
+
+        self.watch.changed = False
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return data  # rotated away, wait for the new file to be created
+
+        if get_file_id(st) != self._file_id:
+            logger.debug("%s was rotated, reopening", self.path)
+            self._fh.close()
+            self._fh, self._file_id = self._open()
+            return self._fh.read(size)
+
+        if st.st_size < self._fh.tell():
+            logger.debug("%s was truncated, rewinding", self.path)
+            self._fh.seek(0)
+            return self._fh.read(size)
+
+        return data
+
+    def wait(self, timeout=WAIT_TIMEOUT):
+        """Wait until the file changes.
+
+        :returns: True if the file changed
+        """
+        return self.watch.wait(timeout)
+
+    def lines(self, running=lambda: True, empty_lines=False, timeout=WAIT_TIMEOUT):
+        """Yield every complete line appended to the file, as bytes including the newline.
+
+        :param running: Callable, stop following when it returns False
+        :param empty_lines: Yield an empty line whenever there is no new data
+        :param timeout: Maximum time to block between ``running`` checks
+        """
+        while running():
+            data = self.read()
+            if data:
+                data = self._partial + data
+                end = data.rfind(b"\n") + 1
+                self._partial = data[end:]
+                for line in data[:end].splitlines(True):
+                    yield line
+                continue
+            if empty_lines:
+                yield b""
+            self.wait(timeout)
+
+    def close(self):
+        """Close the file and stop watching it."""
+        self.watcher.unwatch(self.watch)
+        self._fh.close()
@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+"""Benchmark the cold start import of a service whose __pycache__ cannot be written, with and without precompiling.
+
+Every run imports the service in a fresh ``python -B`` process (no bytecode is written, like on a read-only image)
+the way ``honeycomb service run`` does, through :func:`honeycomb.servicemanager.registration.get_service_module`.
+
+Usage: python -m tests.bench_cold_start [nmodules] [functions_per_module]
+"""
+
+from __future__ import absolute_import, print_function
+
+import os
+import sys
+import time
+import shutil
+import tempfile
+import subprocess
+
+from honeycomb.utils import plugin_utils
+
+IMPORT_SERVICE = "from honeycomb.servicemanager.registration import get_service_module; get_service_module({!r})"
+SERVICE_NAME = "benchsvc"
+
+
+def make_service(root, nmodules, nfunctions):
+    """Create a service importing a dependency package of nmodules modules."""
+    service = os.path.join(root, SERVICE_NAME)
+    package = os.path.join(service, "venv", "benchdep")
+    os.makedirs(package)
+    body = "".join("def func{0}(a, b=None):\n    return [a, b, {0}, {{'key': a}}]\n\n\n".format(index)
+                   for index in range(nfunctions))
+    for index in range(nmodules):
+        with open(os.path.join(package, "mod{}.py".format(index)), "w") as f:
+            f.write(body)
+    with open(os.path.join(package, "__init__.py"), "w") as f:
+        f.write("".join("from benchdep import mod{}\n".format(index) for index in range(nmodules)))
+    with open(os.path.join(service, "__init__.py"), "w") as f:
+        f.write("")
+    with open(os.path.join(service, "{}_service.py".format(SERVICE_NAME)), "w") as f:
+        f.write("import benchdep\nservice_class = None\n")
+    return service
+
+
+def bench(name, service, repeat=5):
+    """Time the best of a few cold imports."""
+    timings = []
+    for _ in range(repeat):
+        start = time.time()
+        subprocess.check_call([sys.executable, "-B", "-c", IMPORT_SERVICE.format(service)])
+        timings.append(time.time() - start)
+    print("{:<24} {:.3f}s".format(name, min(timings)))
+    return min(timings)
+
+
+def main(nmodules=300, nfunctions=50):
+    """Run benchmark."""
+    root = tempfile.mkdtemp(prefix="honeycomb_bench_")
+    try:
+        print("{} dependency modules of {} functions".format(nmodules, nfunctions))
+        service = make_service(os.path.join(root, "source"), nmodules, nfunctions)
+        reference = bench("source", service)
+
+        for name, unchecked_hash, pack in [("compiled (timestamp)", False, False),
+                                           ("compiled (unchecked)", True, False),
+                                           ("zipped deps", True, True)]:
+            service = make_service(os.path.join(root, name.split()[0] + str(unchecked_hash)), nmodules, nfunctions)
+            if pack:
+                plugin_utils.zip_deps(service)
+            plugin_utils.compile_plugin(service, unchecked_hash=unchecked_hash)
+            elapsed = bench(name, service)
+            print("{:<24} {:.1f}x".format("", reference / elapsed))
+    finally:
+        shutil.rmtree(root)
+
+
+if __name__ == "__main__":
+    main(*[int(_) for _ in sys.argv[1:]])
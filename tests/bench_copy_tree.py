@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+"""Benchmark plugin_utils.copy_tree against a userspace read/write copy on a plugin sized tree.
+
+Usage: python -m tests.bench_copy_tree [nfiles] [file_kb]
+"""
+
+from __future__ import absolute_import, print_function
+
+import os
+import sys
+import time
+import shutil
+import tempfile
+
+from honeycomb.utils import plugin_utils
+
+
+def make_tree(root, nfiles, file_kb):
+    """Create nfiles files of file_kb KiB spread over a few folders."""
+    data = os.urandom(file_kb * 1024)
+    for index in range(nfiles):
+        dirname = os.path.join(root, "pkg{}".format(index % 20))
+        if not os.path.exists(dirname):
+            os.makedirs(dirname)
+        with open(os.path.join(dirname, "mod{}.py".format(index)), "wb") as f:
+            f.write(data)
+
+
+def read_write_copy_tree(src, dst):
+    """Copy a tree serially through userspace (previous copy_tree behaviour, used as a reference)."""
+    os.makedirs(dst)
+    for name in os.listdir(src):
+        srcname, dstname = os.path.join(src, name), os.path.join(dst, name)
+        if os.path.isdir(srcname):
+            read_write_copy_tree(srcname, dstname)
+        else:
+            fin = os.open(srcname, os.O_RDONLY)
+            fout = os.open(dstname, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, os.fstat(fin).st_mode)
+            for x in iter(lambda: os.read(fin, plugin_utils.BUFFER_SIZE), b""):
+                os.write(fout, x)
+            os.close(fin)
+            os.close(fout)
+
+
+def bench(name, func, src, dst, repeat=5, **kwargs):
+    """Time the best of a few copies."""
+    timings = []
+    for _ in range(repeat):
+        start = time.time()
+        func(src, dst, **kwargs)
+        timings.append(time.time() - start)
+        shutil.rmtree(dst)
+    print("{:<24} {:.3f}s".format(name, min(timings)))
+    return min(timings)
+
+
+def main(nfiles=2000, file_kb=16):
+    """Run benchmark."""
+    root = tempfile.mkdtemp(prefix="honeycomb_bench_")
+    try:
+        src, dst = os.path.join(root, "src"), os.path.join(root, "dst")
+        make_tree(src, nfiles, file_kb)
+        methods = [method.__name__ for method in plugin_utils._copy_methods]
+        print("{} files of {}KiB, copy methods: {}".format(nfiles, file_kb, methods))
+        reference = bench("read/write", read_write_copy_tree, src, dst)
+        for name, kwargs in [("copy_tree", {}), ("copy_tree (hardlink)", {"link": True})]:
+            elapsed = bench(name, plugin_utils.copy_tree, src, dst, **kwargs)
+            print("{:<24} {:.1f}x".format("", reference / elapsed))
+    finally:
+        shutil.rmtree(root)
+
+
+if __name__ == "__main__":
+    main(*[int(_) for _ in sys.argv[1:]])
@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+"""Benchmark compiled log rules against matching each rule in turn.
+
+Usage: python -m tests.bench_log_rules [nrules] [nlines]
+"""
+
+from __future__ import absolute_import, print_function
+
+import re
+import sys
+import time
+import random
+
+from honeycomb.servicemanager.log_rules import LogRules
+
+
+def make_rules(nrules):
+    """Return nrules rules with distinct keywords."""
+    return [{"event_type": "event{}".format(i),
+             "pattern": r"keyword{}\b.* from (?P<originating_ip>[\d.]+)".format(i)} for i in range(nrules)]
+
+
+def sequential_match(compiled, line):
+    """Try every rule in turn (the hand written parse_line approach)."""
+    for event_type, regex in compiled:
+        match = regex.search(line)
+        if match:
+            alert = match.groupdict()
+            alert["event_type"] = event_type
+            return alert
+    return None
+
+
+def main():
+    """Run the benchmark."""
+    nrules = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    nlines = int(sys.argv[2]) if len(sys.argv) > 2 else 200000
+    rules = make_rules(nrules)
+    random.seed(0)
+    lines = ["2019-02-16 12:00:00 keyword{} GET / from 10.0.0.{}".format(random.randint(0, nrules * 10), i % 255)
+             for i in range(nlines)]
+
+    compiled = [(rule["event_type"], re.compile(rule["pattern"])) for rule in rules]
+    start = time.time()
+    sequential = [sequential_match(compiled, line) for line in lines]
+    sequential_time = time.time() - start
+
+    log_rules = LogRules(rules)
+    start = time.time()
+    combined = [log_rules.match(line) for line in lines]
+    combined_time = time.time() - start
+
+    assert sequential == combined
+    print("{} rules, {} lines: sequential {:.3f}s, combined {:.3f}s ({:.1f}x)".format(
+        nrules, nlines, sequential_time, combined_time, sequential_time / combined_time))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+"""Benchmark the tailer initial "last N lines" read on a large log file.
+
+Usage: python -m tests.bench_tailer [size_in_mb] [nlines]
+"""
+
+from __future__ import absolute_import, print_function
+
+import os
+import sys
+import time
+import tempfile
+
+from honeycomb.utils.tailer import find_tail_offset
+
+LINE = b"2019-02-16 12:00:00,000 INFO simple_http: GET / HTTP/1.1 200 - 127.0.0.1\n"
+
+
+def make_logfile(path, size_mb):
+    """Write a log file of roughly size_mb megabytes."""
+    chunk = LINE * (1024 * 1024 // len(LINE))
+    with open(path, "wb") as fh:
+        for _ in range(size_mb):
+            fh.write(chunk)
+
+
+def bytewise_tail_offset(fh, nlines):
+    """Seek backwards one byte at a time (previous Tailer behaviour, used as a reference)."""
+    fh.seek(0, os.SEEK_END)
+    end_position = curr_position = fh.tell()
+    line_count = 0
+    while curr_position >= 0:
+        fh.seek(curr_position)
+        if fh.read(1) == b"\n" and curr_position != end_position - 1:
+            line_count += 1
+            if line_count == nlines:
+                return curr_position + 1
+        curr_position -= 1
+    return 0
+
+
+def main():
+    """Run the benchmark."""
+    size_mb = int(sys.argv[1]) if len(sys.argv) > 1 else 2048
+    nlines = int(sys.argv[2]) if len(sys.argv) > 2 else 10000
+    path = os.path.join(tempfile.mkdtemp(prefix="honeycomb_bench_"), "stdout.log")
+    make_logfile(path, size_mb)
+    try:
+        for name, func in [("bytewise", bytewise_tail_offset), ("blocks", find_tail_offset)]:
+            with open(path, "rb") as fh:
+                start = time.time()
+                offset = func(fh, nlines)
+                fh.seek(offset)
+                count = sum(1 for _ in fh)
+                print("{:10} {:>8} lines from {} MB in {:.4f}s".format(name, count, size_mb, time.time() - start))
+    finally:
+        os.remove(path)
+        os.rmdir(os.path.dirname(path))
+
+
+if __name__ == "__main__":
+    main()
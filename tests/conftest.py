@@ -0,0 +1,28 @@
+# -*- coding: utf-8 -*-
+"""Honeycomb test configuration."""
+
+from __future__ import absolute_import, unicode_literals
+
+import logging
+
+import pytest
+
+from honeycomb import defs
+from honeycomb.cli import MyLogger
+
+from tests.utils.http_server import RepoServer
+from tests.utils.plugins import make_zip
+
+# honeycomb exceptions log with extra fields that only the CLI logger class accepts, install it before any logger
+# is created in case a test raises them without running the CLI first
+logging.setLoggerClass(MyLogger)
+
+
+@pytest.fixture
+def repo(monkeypatch):
+    """Run a local stand-in for the online repository, serving an empty plugin as services/plugin.zip."""
+    server = RepoServer().start()
+    server.files["/services/plugin.zip"] = make_zip()
+    monkeypatch.setattr(defs, "GITHUB_RAW", server.url)
+    yield server
+    server.stop()
@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+"""Honeycomb offline bundle tests."""
+
+from __future__ import absolute_import, unicode_literals
+
+import io
+import os
+import tarfile
+
+import pytest
+
+from honeycomb import defs, exceptions
+from honeycomb.utils import bundle
+
+
+@pytest.fixture
+def home(tmpdir):
+    """Honeycomb home with a configured service whose dependencies share a file."""
+    plugin = tmpdir.join("home", "services", "plugin")
+    plugin.join("config.json").write("{}", ensure=True)
+    plugin.join(defs.ARGS_JSON).write('{"port": 8080}')
+    plugin.join("logs", "stdout.log").write("running\n", ensure=True)
+    plugin.join("venv", "dep", "__init__.py").write("VALUE = 1\n", ensure=True)
+    os.link(str(plugin.join("venv", "dep", "__init__.py")), str(plugin.join("venv", "dep", "copy.py")))
+    os.utime(str(plugin.join("config.json")), (1000000000, 1000000000))
+    tmpdir.join("home", "integrations").ensure(dir=True)
+    tmpdir.join("honeycomb.yml").write("version: 1\n")
+    return tmpdir.join("home")
+
+
+def test_bundle_roundtrip(tmpdir, home):
+    """Test plugins are loaded with their dependencies, arguments, hardlinks and mtimes, but not their logs."""
+    bundle.create_bundle(str(home), str(tmpdir.join("b.tgz")), config=str(tmpdir.join("honeycomb.yml")))
+    assert tmpdir.join("b.tgz" + defs.CHECKSUM_SUFFIX).exists()
+
+    target = tmpdir.join("target")
+    services, integrations, config = bundle.load_bundle(str(tmpdir.join("b.tgz")), str(target))
+    assert (services, integrations) == (["plugin"], [])
+    assert config == str(target.join("honeycomb.yml"))
+    plugin = target.join("services", "plugin")
+    assert plugin.join(defs.ARGS_JSON).read() == '{"port": 8080}'
+    assert plugin.join("venv", "dep", "__init__.py").stat().ino == plugin.join("venv", "dep", "copy.py").stat().ino
+    assert plugin.join("config.json").mtime() == 1000000000
+    assert not plugin.join("logs").exists()
+    assert sorted(_.basename for _ in target.listdir()) == ["honeycomb.yml", "services"]
+
+    with pytest.raises(exceptions.PluginAlreadyInstalled):
+        bundle.load_bundle(str(tmpdir.join("b.tgz")), str(target))
+    plugin.join(defs.ARGS_JSON).write("{}")
+    bundle.load_bundle(str(tmpdir.join("b.tgz")), str(target), force=True)
+    assert plugin.join(defs.ARGS_JSON).read() == '{"port": 8080}'
+
+
+def test_bundle_checksum_mismatch(tmpdir, home):
+    """Test a bundle not matching its checksum installs nothing."""
+    bundle.create_bundle(str(home), str(tmpdir.join("b.tgz")))
+    with pytest.raises(exceptions.BundleChecksumMismatch):
+        bundle.load_bundle(str(tmpdir.join("b.tgz")), str(tmpdir.ensure("target", dir=True)), "0" * 64)
+    assert tmpdir.join("target").listdir() == []
+
+
+def test_bundle_file_mismatch(tmpdir):
+    """Test files not matching the bundle manifest are refused, even without a checksum for the whole bundle."""
+    with tarfile.open(str(tmpdir.join("b.tgz")), "w:gz") as tar:
+        for name, data in [("services/plugin/config.json", b"{}"),
+                           (bundle.BUNDLE_MANIFEST, b'{"version": 1, "files": {"services/plugin/config.json": ""}}')]:
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            tar.addfile(info, io.BytesIO(data))
+    with pytest.raises(exceptions.BundleChecksumMismatch):
+        bundle.load_bundle(str(tmpdir.join("b.tgz")), str(tmpdir.ensure("target", dir=True)))
+    assert tmpdir.join("target").listdir() == []
+
+
+@pytest.mark.parametrize("name", ["../evil", "/tmp/evil", "services/../../evil", "evil"])
+def test_bundle_unexpected_files(tmpdir, name):
+    """Test files outside of plugin folders are refused."""
+    with tarfile.open(str(tmpdir.join("b.tgz")), "w:gz") as tar:
+        tar.addfile(tarfile.TarInfo(name), io.BytesIO())
+    with pytest.raises(exceptions.InvalidBundle):
+        bundle.load_bundle(str(tmpdir.join("b.tgz")), str(tmpdir.ensure("target", dir=True)))
+    assert tmpdir.join("target").listdir() == []
+
+
+@pytest.mark.parametrize("members", [
+    [("services/a/link", "../b")],
+    [("services/a/link", "/tmp")],
+    [("services/a/d/e/f/g/s2", "../../../../x"), ("services/a/s1", "d/e/f/g/s2/../../../../../escaped"),
+     ("services/a/s1", None)],
+    [("services/a/d", "."), ("services/a/d/s", "d/d/d"), ("services/a/d/s", None)],
+    [("services/a", "a")],
+])
+def test_bundle_symlinks_outside_of_plugin(tmpdir, members):
+    """Test symlinks cannot lead files out of their plugin folder."""
+    with tarfile.open(str(tmpdir.join("b.tgz")), "w:gz") as tar:
+        for name, linkname in members:
+            info = tarfile.TarInfo(name)
+            if linkname is not None:
+                info.type, info.linkname = tarfile.SYMTYPE, linkname
+            tar.addfile(info, io.BytesIO())
+    target = tmpdir.ensure("work", "target", dir=True)
+    with pytest.raises(exceptions.InvalidBundle):
+        bundle.load_bundle(str(tmpdir.join("b.tgz")), str(target))
+    assert target.listdir() == []
+    assert sorted(_.basename for _ in tmpdir.join("work").listdir()) == ["target"]
@@ -0,0 +1,141 @@
+# -*- coding: utf-8 -*-
+"""Honeycomb plugin cache tests."""
+
+from __future__ import absolute_import, unicode_literals
+
+import os
+import base64
+import shutil
+import hashlib
+import zipfile
+
+import pytest
+
+from honeycomb import defs, exceptions
+from honeycomb.utils import plugin_utils
+from honeycomb.utils.cache import PluginCache
+
+from tests.utils.plugins import make_zip, register_plugin
+
+
+def install(tmpdir, cache):
+    """Install the test plugin from the repository and uninstall it."""
+    install_path = str(tmpdir.join("services"))
+    plugin_utils.install_plugin("plugin", defs.SERVICE, install_path, register_plugin, cache)
+    shutil.rmtree(install_path)
+
+
+def test_cache_add_lookup(tmpdir):
+    """Test zips are stored once per content hash."""
+    cache = PluginCache(str(tmpdir.join("cache")))
+    pkgzip = tmpdir.join("plugin.zip")
+    pkgzip.write_binary(make_zip())
+
+    assert cache.lookup("service", "plugin") is None
+    assert not tmpdir.join("cache").exists()  # created when something is added
+    blob = cache.add("service", "plugin", str(pkgzip), etag="x")
+    assert cache.add("service", "other", str(pkgzip)) == blob
+    assert pkgzip.exists()
+    assert os.path.basename(blob) == hashlib.sha256(make_zip()).hexdigest() + ".zip"
+    assert cache.lookup("service", "plugin") == {"sha256": hashlib.sha256(make_zip()).hexdigest(), "etag": "x"}
+    assert len(tmpdir.join("cache", "blobs").listdir()) == 1
+
+    tmpdir.join("cache", "downloads").ensure(dir=True).chmod(0o777)
+    assert cache.download_path("service", "plugin") == str(tmpdir.join("cache", "downloads", "service_plugin.zip"))
+    assert tmpdir.join("cache", "downloads").stat().mode & 0o777 == 0o700
+
+
+def test_cache_lru_eviction(tmpdir):
+    """Test the least recently used zips are evicted when the cache is full."""
+    zips = [make_zip(str(index) * 1000) for index in range(3)]
+    cache = PluginCache(str(tmpdir.join("cache")), max_size=sum(len(_) for _ in zips[:2]))
+    for index, data in enumerate(zips):
+        tmpdir.join("{}.zip".format(index)).write_binary(data)
+
+    cache.add("service", "a", str(tmpdir.join("0.zip")))
+    cache.add("service", "b", str(tmpdir.join("1.zip")))
+    assert cache.lookup("service", "a")
+    cache.add("service", "c", str(tmpdir.join("2.zip")))
+
+    assert cache.lookup("service", "a")
+    assert cache.lookup("service", "b") is None
+    assert cache.lookup("service", "c")
+    assert len(tmpdir.join("cache", "blobs").listdir()) == 2
+
+
+def test_install_from_repo_etag(repo, tmpdir):
+    """Test a cached plugin is revalidated with its ETag instead of downloaded again."""
+    cache = PluginCache(str(tmpdir.join("cache")))
+    install(tmpdir, cache)
+    install(tmpdir, cache)
+
+    downloads = [headers for path, headers in repo.requests if path == "/services/plugin.zip"]
+    assert "If-None-Match" not in downloads[0]
+    assert "If-None-Match" in downloads[1]
+    assert len(tmpdir.join("cache", "blobs").listdir()) == 1
+
+    # the plugin changed
+    repo.files["/services/plugin.zip"] = make_zip('{"version": 2}')
+    install(tmpdir, cache)
+    assert len(tmpdir.join("cache", "blobs").listdir()) == 2
+
+
+def test_install_from_repo_checksum(repo, tmpdir):
+    """Test a cached plugin matching the published checksum is not downloaded again."""
+    repo.files["/services/plugin.zip.sha256"] = hashlib.sha256(make_zip()).hexdigest().encode()
+    cache = PluginCache(str(tmpdir.join("cache")))
+    install(tmpdir, cache)
+    install(tmpdir, cache)
+
+    assert [path for path, _ in repo.requests].count("/services/plugin.zip") == 1
+
+
+def test_install_offline(repo, tmpdir):
+    """Test offline installs only use the cache."""
+    cache = PluginCache(str(tmpdir.join("cache")), offline=True)
+    with pytest.raises(exceptions.PluginNotCached):
+        install(tmpdir, cache)
+
+    cache.offline = False
+    install(tmpdir, cache)
+    cache.offline = True
+    repo.requests[:] = []
+    install(tmpdir, cache)
+    assert repo.requests == []
+
+
+def make_wheel(wheelhouse):
+    """Build a minimal pure python wheel into wheelhouse without touching the network."""
+    files = {
+        "hcfake/__init__.py": b"VALUE = 1\n",
+        "hcfake-1.0.dist-info/METADATA": b"Metadata-Version: 2.1\nName: hcfake\nVersion: 1.0\n",
+        "hcfake-1.0.dist-info/WHEEL": b"Wheel-Version: 1.0\nGenerator: test\nRoot-Is-Purelib: true\n"
+                                      b"Tag: py2.py3-none-any\n",
+    }
+    record = ["{},sha256={},{}".format(name, base64.urlsafe_b64encode(hashlib.sha256(data).digest()).rstrip(b"=")
+                                       .decode(), len(data)) for name, data in files.items()]
+    files["hcfake-1.0.dist-info/RECORD"] = "\n".join(record + ["hcfake-1.0.dist-info/RECORD,,"]).encode()
+    with zipfile.ZipFile(os.path.join(wheelhouse, "hcfake-1.0-py2.py3-none-any.whl"), "w") as wheel:
+        for name, data in files.items():
+            wheel.writestr(name, data)
+
+
+def test_install_deps_shared(tmpdir):
+    """Test dependencies come from the shared wheelhouse and identical files are stored once."""
+    cache = PluginCache(str(tmpdir.join("cache")), offline=True)
+    make_wheel(cache.wheelhouse)
+    for name in ("one", "two"):
+        tmpdir.join(name, "requirements.txt").write("hcfake\n", ensure=True)
+        assert plugin_utils.install_deps(str(tmpdir.join(name)), quiet=True, cache=cache) == 0
+
+    module = os.path.join(defs.DEPS_DIR, "hcfake", "__init__.py")
+    one, two = (os.stat(str(tmpdir.join(name, module))) for name in ("one", "two"))
+    assert (one.st_dev, one.st_ino) == (two.st_dev, two.st_ino)
+    assert one.st_nlink == 3  # both plugins and the store
+
+    shutil.rmtree(str(tmpdir.join("one")))
+    cache.prune_store()
+    assert os.stat(str(tmpdir.join("two", module))).st_nlink == 2
+    shutil.rmtree(str(tmpdir.join("two")))
+    assert cache.prune_store() > 0
+    assert not [filenames for _, _, filenames in os.walk(str(tmpdir.join("cache", "store"))) if filenames]
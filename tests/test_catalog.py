@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+"""Honeycomb remote catalog tests."""
+
+from __future__ import absolute_import, unicode_literals
+
+import copy
+import json
+import hashlib
+
+import pytest
+
+from honeycomb import defs, exceptions
+from honeycomb.utils import catalog, plugin_utils
+from honeycomb.utils.cache import PluginCache
+
+from tests.utils.plugins import register_plugin
+
+CATALOG = {defs.SERVICES: {"plugin": {"label": "Plugin", "version": "1.0", "requirements": ["six"]}},
+           defs.INTEGRATIONS: {}}
+
+
+@pytest.fixture
+def repo(repo):
+    """Publish a catalog in the repository."""
+    repo.catalog = copy.deepcopy(CATALOG)
+    repo.catalog[defs.SERVICES]["plugin"]["sha256"] = hashlib.sha256(repo.files["/services/plugin.zip"]).hexdigest()
+    repo.files["/" + defs.CATALOG_FILE] = json.dumps(repo.catalog).encode()
+    repo.files["/services/services.txt"] = b"plugin\nother\n"
+    return repo
+
+
+def requested(repo):
+    """Return the paths requested so far."""
+    return [path for path, _ in repo.requests]
+
+
+def test_catalog_cached(repo, tmpdir):
+    """Test the catalog is fetched once per ttl and revalidated with its ETag."""
+    cache = PluginCache(str(tmpdir))
+    assert catalog.get_catalog(cache) == repo.catalog
+    assert catalog.get_catalog(cache) == repo.catalog
+    assert requested(repo) == ["/catalog.json"]
+
+    assert catalog.get_plugin_info(defs.SERVICES, "plugin", cache, ttl=0)["version"] == "1.0"
+    assert repo.requests[-1][1]["If-None-Match"]
+    assert catalog.get_plugin_info(defs.SERVICES, "other", cache) is None
+
+    repo.stop()
+    offline = PluginCache(str(tmpdir), offline=True)
+    assert catalog.get_catalog(offline) == repo.catalog
+    assert catalog.get_catalog(cache, ttl=0) == repo.catalog  # stale, but better than nothing
+
+
+def test_catalog_offline_not_cached(tmpdir):
+    """Test offline listing without a cached catalog fails."""
+    with pytest.raises(exceptions.PluginNotCached):
+        catalog.get_catalog(PluginCache(str(tmpdir), offline=True))
+
+
+def test_list_remote_without_catalog(repo, tmpdir, capsys):
+    """Test repositories without a catalog are listed from their text list, and not asked for it again."""
+    del repo.files["/" + defs.CATALOG_FILE]
+    cache = PluginCache(str(tmpdir))
+    for _ in range(2):
+        plugin_utils.list_remote_plugins(["plugin"], defs.SERVICE, cache)
+        assert capsys.readouterr().out.splitlines()[-1] == "other"
+    assert requested(repo) == ["/catalog.json", "/services/services.txt", "/services/services.txt"]
+
+
+def test_install_uses_catalog_checksum(repo, tmpdir):
+    """Test installs verify downloads against the catalog instead of fetching a checksum file."""
+    plugin_utils.install_plugin("plugin", defs.SERVICE, str(tmpdir.join("services")), register_plugin,
+                                PluginCache(str(tmpdir.join("cache"))))
+    assert requested(repo) == ["/catalog.json", "/services/plugin.zip"]
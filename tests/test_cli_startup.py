@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+"""Honeycomb CLI startup tests."""
+
+from __future__ import absolute_import, unicode_literals
+
+import sys
+import subprocess
+
+import pytest
+
+from honeycomb import commands
+from honeycomb.commands import _manifest
+
+# generous for slow CI machines, honeycomb.cli imports in about 60ms on a laptop
+IMPORT_BUDGET_MS = 250
+HEAVY_MODULES = ("requests", "docker", "yaml", "daemon")
+
+
+def import_times(args):
+    """Run honeycomb with -X importtime, return {module: cumulative import time in ms}."""
+    output = subprocess.run([sys.executable, "-X", "importtime", "-m", "honeycomb"] + args,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE).stderr.decode("utf-8")
+    times = {}
+    for line in output.splitlines():
+        if line.startswith("import time:") and "|" in line:
+            _, cumulative, name = line.split("|")
+            if cumulative.strip().isdigit():
+                times[name.strip()] = int(cumulative) / 1000.0
+    return times
+
+
+@pytest.mark.skipif(sys.version_info < (3, 7), reason="-X importtime is python 3.7+")
+@pytest.mark.parametrize("args", [["--help"], ["service", "--help"], ["service", "status", "--show-all"]])
+def test_cli_import_budget(tmpdir, args):
+    """Test commands that do not need them do not import heavy modules, and the CLI imports within budget."""
+    times = import_times(["--iamroot", "--home", str(tmpdir)] + args)
+    assert "honeycomb.cli" in times
+    assert [_ for _ in times if _.split(".")[0] in HEAVY_MODULES] == []
+    assert times["honeycomb.cli"] < IMPORT_BUDGET_MS
+
+
+def test_command_manifest_up_to_date():
+    """Test the command manifest lists every command, run `python -m honeycomb.commands` if this fails."""
+    assert commands.build_manifest() == (_manifest.GROUPS, _manifest.COMMANDS)
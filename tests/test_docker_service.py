@@ -0,0 +1,155 @@
+# -*- coding: utf-8 -*-
+"""Honeycomb DockerService tests."""
+
+from __future__ import absolute_import, unicode_literals
+
+import docker
+import pytest
+from six.moves.queue import Queue
+
+from honeycomb.servicemanager.base_service import DockerService
+
+from tests.utils.fake_docker import FakeDockerClient
+
+
+class EchoService(DockerService):
+    """Docker service reporting every line with ALERT in it."""
+
+    @property
+    def docker_image_name(self):
+        """Return docker image name."""
+        return "honeycomb/echo"
+
+    def parse_line(self, line):
+        """Report lines with ALERT."""
+        if "ALERT" in line:
+            return {"event_type": "echo", "request": line}
+
+
+@pytest.fixture
+def docker_client(monkeypatch):
+    """Provide a fake docker client to every DockerService."""
+    client = FakeDockerClient()
+    monkeypatch.setattr(docker, "from_env", lambda: client)
+    return client
+
+
+def test_get_line_batches(docker_client):
+    """Test container log chunks are reassembled into complete lines."""
+    docker_client.containers.log_chunks = [b"first ALE", b"RT\nsecond\nthird ", "☃ ALERT".encode("utf-8")[:3],
+                                           "☃ ALERT".encode("utf-8")[3:] + b"\n", b"no newline"]
+    service = EchoService(alert_types=[])
+    service._container = docker_client.containers.run(service.docker_image_name)
+
+    batches = list(service.get_line_batches())
+    assert batches == [["first ALERT", "second"], ["third ☃ ALERT"], ["no newline"]]
+    assert service.parse_lines(sum(batches, [])) == [{"event_type": "echo", "request": "first ALERT"},
+                                                     {"event_type": "echo", "request": "third ☃ ALERT"}]
+
+    # text lines, e.g. from read_lines, come without their newline as well
+    assert list(service.get_line_batches(["first ALERT\n", "no newline"])) == [["first ALERT"], ["no newline"]]
+
+
+def test_pull_image(docker_client):
+    """Test the image is pulled only when it is missing."""
+    service = EchoService(alert_types=[])
+    assert service.pull_image()
+    assert not service.pull_image()
+    assert docker_client.images.pulls == ["honeycomb/echo:latest"]
+
+
+def test_remove_container(docker_client):
+    """Test the container is removed on shutdown by default."""
+    service = EchoService(alert_types=[])
+    service._container = service.start_container()
+    assert [phase for phase, _ in service.startup_times[0]] == ["image", "create"]
+    assert service._container.labels["honeycomb.service"] == "EchoService"
+
+    service.on_server_shutdown()
+    assert docker_client.containers.all == []
+
+
+def test_keep_container(docker_client):
+    """Test a kept container is restarted on the next run and only its new logs are read."""
+    docker_client.containers.log_chunks = [b"old ALE", b"RT\n"]
+    service = EchoService(alert_types=[])
+    service.keep_container = True
+    service._container = container = service.start_container()
+    assert list(service.get_line_batches()) == [["old ALERT"]]
+    assert container.logs_kwargs == {}
+    service.on_server_shutdown()
+    assert container.status == "exited"
+
+    service = EchoService(alert_types=[])
+    service.keep_container = True
+    service._container = service.start_container()
+    # the fake ignores since, like docker does for the lines logged earlier in the same second
+    container.log_chunks.append(b"new ALERT\n")
+    assert service._container is container
+    assert container.status == "running"
+    assert [phase for phase, _ in service.startup_times[0]] == ["lookup", "restart"]
+    assert list(service.get_line_batches()) == [["new ALERT"]]
+    assert "since" in container.logs_kwargs
+
+
+def test_keep_container_params_changed(docker_client):
+    """Test a kept container is replaced when the docker parameters changed."""
+    service = EchoService(alert_types=[])
+    service.keep_container = True
+    old_container = service.start_container()
+    old_container.stop()
+
+    class PortsService(EchoService):
+        service_name = "EchoService"
+
+        @property
+        def docker_params(self):
+            return {"ports": {80: 8080}}
+
+    service = PortsService(alert_types=[])
+    service.keep_container = True
+    service._container = service.start_container()
+    assert service._container is not old_container
+    assert old_container.removed
+    assert docker_client.containers.all == [service._container]
+
+
+class PortsService(EchoService):
+    """Echo service with published ports."""
+
+    @property
+    def docker_params(self):
+        """Publish two ports."""
+        return {"ports": {80: 8080, 443: ("127.0.0.1", 8443), 53: None}}
+
+
+def test_replica_docker_params(docker_client):
+    """Test replicas are assigned consecutive, non overlapping host port ranges."""
+    service = PortsService(alert_types=[])
+    assert service.replica_docker_params(0) == service.docker_params
+    assert service.replica_docker_params(2) == {"ports": {80: 8080 + 2 * 364, 443: ("127.0.0.1", 8443 + 2 * 364),
+                                                          53: None}}
+
+
+def test_replicas(docker_client):
+    """Test alerts from every replica are parsed by one loop and tagged with the replica name."""
+    docker_client.containers.log_chunks = [b"ALERT one\nnothing\n", b"ALERT two\n"]
+    service = PortsService(alert_types=[])
+    service.replicas = 3
+    service.alerts_queue = Queue()
+    service.on_server_start()
+
+    assert len(docker_client.containers.all) == 3
+    assert [_.kwargs["ports"][80] for _ in docker_client.containers.all] == [8080, 8444, 8808]
+    assert [_.labels["honeycomb.replica"] for _ in docker_client.containers.all] == ["0", "1", "2"]
+    assert {index: [phase for phase, _ in phases] for index, phases in service.startup_times.items()} == {
+        index: ["image", "create"] for index in range(3)}
+
+    alerts = []
+    while not service.alerts_queue.empty():
+        alerts.append(service.alerts_queue.get())
+    assert sorted((_["decoy_name"], _["request"]) for _ in alerts) == [
+        ("PortsService-{}".format(index), line) for index in range(3) for line in ("ALERT one", "ALERT two")]
+
+    service.on_server_shutdown()
+    assert docker_client.containers.all == []
@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+"""Honeycomb declarative log rules tests."""
+
+from __future__ import absolute_import, unicode_literals
+
+import docker
+import pytest
+
+from honeycomb.exceptions import ConfigFieldValidationError
+from honeycomb.servicemanager.base_service import DockerService
+from honeycomb.servicemanager.log_rules import LogRules, validate_log_rules
+
+from tests.utils.fake_docker import FakeDockerClient
+
+RULES = [
+    {"event_type": "login", "pattern": r"Failed password for (?P<username>\S+) from (?P<originating_ip>[\d.]+)",
+     "fields": {"transport_protocol": "TCP"}},
+    {"event_type": "request", "pattern": r"(?P<request>(?P<q>['\"]).*?(?P=q)) from (?P<originating_ip>[\d.]+)"},
+    {"event_type": "login", "pattern": r"^invalid user|^bad user"},
+]
+
+
+def test_log_rules_match():
+    """Test every rule dispatches to its event type and fields."""
+    rules = LogRules(RULES)
+    assert rules.match("sshd: Failed password for root from 10.0.0.1 port 22") == {
+        "event_type": "login", "username": "root", "originating_ip": "10.0.0.1", "transport_protocol": "TCP"}
+    assert rules.match("'GET /' from 10.0.0.2") == {
+        "event_type": "request", "request": "'GET /'", "q": "'", "originating_ip": "10.0.0.2"}
+    assert rules.match("bad user") == {"event_type": "login"}
+    assert rules.match("nothing to see here, bad user") is None
+    assert rules.match_lines(["a", "\"x\" from 1.2.3.4", "b"]) == [
+        {"event_type": "request", "request": "\"x\"", "q": "\"", "originating_ip": "1.2.3.4"}]
+
+
+def test_log_rules_scoped():
+    """Test numbered backreferences, conditionals and inline flags only apply to their own rule."""
+    rules = LogRules(RULES + [
+        {"event_type": "request", "pattern": r"(\w+)=\1 from (?P<originating_ip>\S+)"},
+        {"event_type": "login", "pattern": r"(?i)^(<)?USER (?P<username>\w+)(?(1)>)$"},
+    ])
+    assert rules.match("a=a from 10.0.0.3") == {"event_type": "request", "originating_ip": "10.0.0.3"}
+    assert rules.match("a=b from 10.0.0.3") is None
+    assert rules.match("user root") == {"event_type": "login", "username": "root"}
+    assert rules.match("<User root>") == {"event_type": "login", "username": "root"}
+    assert rules.match("<user root") is None
+    assert rules.match("FAILED PASSWORD FOR root FROM 10.0.0.1") is None
+
+
+@pytest.mark.parametrize("rules", [
+    {},
+    [{"event_type": "login"}],
+    [{"event_type": "nosuchevent", "pattern": "x"}],
+    [{"event_type": "login", "pattern": "("}],
+    [{"event_type": "login", "pattern": "(?P<nosuchfield>x)"}],
+    [{"event_type": "login", "pattern": "x", "fields": {"nosuchfield": 1}}],
+])
+def test_log_rules_validation(rules):
+    """Test invalid rules are rejected."""
+    with pytest.raises(ConfigFieldValidationError):
+        validate_log_rules(rules, ["login", "request"])
+
+
+def test_docker_service_log_rules(monkeypatch):
+    """Test a DockerService without parse_line uses its log rules."""
+    class RuleService(DockerService):
+        docker_image_name = "honeycomb/rules"
+
+    monkeypatch.setattr(docker, "from_env", FakeDockerClient)
+    service = RuleService(alert_types=[], log_rules=RULES)
+    assert service.parse_lines(["Failed password for admin from 1.1.1.1", "noise"]) == [
+        {"event_type": "login", "username": "admin", "originating_ip": "1.1.1.1", "transport_protocol": "TCP"}]
+    assert service.parse_line("noise") is None
@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+"""Honeycomb plugin index tests."""
+
+from __future__ import absolute_import, unicode_literals
+
+import os
+import json
+
+import pytest
+
+from honeycomb.exceptions import ConfigFieldValidationError
+from honeycomb.utils import plugin_index
+from honeycomb.utils.plugin_index import PluginIndex
+
+
+class Validator(object):
+    """Count validations."""
+
+    def __init__(self):
+        """Start counting."""
+        self.calls = 0
+
+    def __call__(self, config_json):
+        """Validate config."""
+        self.calls += 1
+        if "name" not in config_json:
+            raise ConfigFieldValidationError("name", None, "missing")
+
+
+@pytest.fixture
+def home(tmpdir):
+    """Honeycomb home with one plugin."""
+    tmpdir.join("services", "plugin", "config.json").write(json.dumps({"name": "plugin"}), ensure=True)
+    return tmpdir
+
+
+def config_path(home):
+    """Path of the plugin config."""
+    return str(home.join("services", "plugin", "config.json"))
+
+
+def test_index_skips_validation(home):
+    """Test a config is validated once and then served from the index, also by a new process."""
+    validate = Validator()
+    assert PluginIndex(str(home)).load_config(config_path(home), validate) == {"name": "plugin"}
+    assert PluginIndex(str(home)).load_config(config_path(home), validate) == {"name": "plugin"}
+    assert validate.calls == 1
+
+
+def test_index_touched_config(home):
+    """Test a config whose mtime changed is not revalidated unless its content changed."""
+    validate = Validator()
+    index = PluginIndex(str(home))
+    index.load_config(config_path(home), validate)
+
+    os.utime(config_path(home), (0, 0))
+    assert index.load_config(config_path(home), validate) == {"name": "plugin"}
+    assert validate.calls == 1
+
+    home.join("services", "plugin", "config.json").write(json.dumps({"name": "changed"}))
+    assert PluginIndex(str(home)).load_config(config_path(home), validate) == {"name": "changed"}
+    assert validate.calls == 2
+
+
+def test_index_invalid_config(home):
+    """Test invalid configs are not indexed."""
+    home.join("services", "plugin", "config.json").write("{}")
+    validate = Validator()
+    for _ in range(2):
+        with pytest.raises(ConfigFieldValidationError):
+            PluginIndex(str(home)).load_config(config_path(home), validate)
+    assert validate.calls == 2
+
+
+def test_index_version(home, monkeypatch):
+    """Test indexes written by another honeycomb version are discarded."""
+    validate = Validator()
+    PluginIndex(str(home)).load_config(config_path(home), validate)
+    monkeypatch.setattr(plugin_index, "__version__", "0.0.0")
+    PluginIndex(str(home)).load_config(config_path(home), validate)
+    assert validate.calls == 2
+
+
+def test_index_batch_prunes_removed_plugins(home):
+    """Test a batch writes the index once and drops plugins that no longer exist."""
+    home.join("services", "other", "config.json").write(json.dumps({"name": "other"}), ensure=True)
+    validate = Validator()
+    index = PluginIndex(str(home))
+    with index.batch():
+        index.load_config(config_path(home), validate)
+        index.load_config(str(home.join("services", "other", "config.json")), validate)
+        assert not home.join(plugin_index.INDEX_FILE).exists()
+
+    home.join("services", "other").remove()
+    home.join("services", "plugin", "config.json").write(json.dumps({"name": "changed"}))
+    index.load_config(config_path(home), validate)
+    entries = json.loads(home.join(plugin_index.INDEX_FILE).read())[plugin_index.ENTRIES]
+    assert list(entries) == [os.path.realpath(config_path(home))]
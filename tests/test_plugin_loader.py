@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+"""Honeycomb plugin loader tests."""
+
+from __future__ import absolute_import, unicode_literals
+
+import sys
+import zipfile
+
+import pytest
+
+from honeycomb import defs
+from honeycomb.utils import plugin_loader
+from honeycomb.servicemanager.base_service import ServerCustomService
+from honeycomb.servicemanager.registration import get_service_module
+from honeycomb.integrationmanager.registration import get_integration_module
+
+SERVICE = """
+import json
+import dep
+import dep.sub
+from base_service import ServerCustomService
+from {name}.helper import HELPER
+import helper
+
+class Service(ServerCustomService):
+    pass
+
+service_class = Service
+"""
+
+
+@pytest.fixture(autouse=True)
+def unload():
+    """Drop the plugins loaded by a test."""
+    yield
+    for name in [_ for _ in sys.modules if _.startswith(plugin_loader.PLUGINS_PACKAGE)]:
+        del sys.modules[name]
+
+
+def make_service(root, name, version):
+    """Create a service with a local module and a dependency."""
+    plugin = root.join(name)
+    plugin.join("{}_service.py".format(name)).write(SERVICE.format(name=name), ensure=True)
+    plugin.join("helper.py").write("HELPER = {!r}\n".format(name))
+    plugin.join("venv", "dep", "__init__.py").write("VERSION = {}\n".format(version), ensure=True)
+    plugin.join("venv", "dep", "sub.py").write("from dep import VERSION\n")
+    return plugin
+
+
+def test_plugins_isolated(tmpdir):
+    """Test plugins with different versions of a dependency load side by side without growing sys.path."""
+    path = list(sys.path)
+    one = get_service_module(str(make_service(tmpdir, "one", 1)))
+    two = get_service_module(str(make_service(tmpdir, "two", 2)))
+
+    assert (one.dep.VERSION, two.dep.VERSION) == (1, 2)
+    assert (one.dep.sub.VERSION, two.dep.sub.VERSION) == (1, 2)
+    assert (one.HELPER, two.HELPER) == ("one", "two")
+    assert one.helper is sys.modules["honeycomb_plugins.services.one.helper"]
+    assert one.ServerCustomService is ServerCustomService
+    assert one.json is sys.modules["json"]
+    assert sys.path == path
+    assert "dep" not in sys.modules and "helper" not in sys.modules
+    assert get_service_module(str(tmpdir.join("one"))) is one
+
+
+def test_plugin_zipped_deps(tmpdir):
+    """Test dependencies packed into venv.zip are imported from it."""
+    plugin = make_service(tmpdir, "zipped", 3)
+    with zipfile.ZipFile(str(plugin.join(defs.DEPS_ZIP)), "w") as depszip:
+        depszip.writestr("dep/__init__.py", "VERSION = 4\n")
+        depszip.writestr("dep/sub.py", "from dep import VERSION\n")
+    plugin.join("venv").remove()
+    assert get_service_module(str(plugin)).dep.sub.VERSION == 4
+
+
+def test_plugin_moved(tmpdir):
+    """Test a plugin loaded again from another folder (e.g. installed after running it in editable mode) reloads."""
+    get_service_module(str(make_service(tmpdir.join("a"), "moved", 1)))
+    assert get_service_module(str(make_service(tmpdir.join("b"), "moved", 2))).dep.VERSION == 2
+
+
+def test_integration_legacy_imports(tmpdir):
+    """Test integrations importing honeycomb modules by their old top level names get the honeycomb modules."""
+    from honeycomb.integrationmanager import integration_utils
+    tmpdir.join("legacy", "integration.py").write(
+        "import integrationmanager.integration_utils\n"
+        "from integrationmanager.integration_utils import BaseIntegration\n", ensure=True)
+    module = get_integration_module(str(tmpdir.join("legacy")))
+    assert module.BaseIntegration is integration_utils.BaseIntegration
+    assert module.integrationmanager.integration_utils is integration_utils
@@ -0,0 +1,326 @@
+# -*- coding: utf-8 -*-
+"""Honeycomb plugin utils tests."""
+
+from __future__ import absolute_import, unicode_literals
+
+import os
+import sys
+import time
+import errno
+import threading
+import json
+import hashlib
+import zipfile
+import subprocess
+from functools import partial
+
+import pytest
+import requests
+
+from honeycomb import defs, exceptions
+from honeycomb.utils import plugin_utils
+from honeycomb.utils.cache import PluginCache
+
+from tests.utils.plugins import make_zip, register_plugin
+
+CONTENT = os.urandom(300 * 1024)
+SHA256 = hashlib.sha256(CONTENT).hexdigest()
+
+
+def download(repo, tmpdir, sha256sum=SHA256):
+    """Download the test file and return its content."""
+    repo.files["/services/plugin.zip"] = CONTENT
+    path = str(tmpdir.join("plugin.zip"))
+    plugin_utils.download_file(requests.Session(), repo.url + "/services/plugin.zip", path, "plugin", sha256sum)
+    assert not os.path.exists(path + ".part")
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def test_download(repo, tmpdir):
+    """Test a plain download is a single request in large chunks."""
+    assert download(repo, tmpdir) == CONTENT
+    assert len(repo.requests) == 1
+
+
+def test_download_resume_partial_file(repo, tmpdir):
+    """Test an existing partial file is completed with a Range request."""
+    tmpdir.join("plugin.zip.part").write_binary(CONTENT[:1000])
+    assert download(repo, tmpdir) == CONTENT
+    assert repo.requests[0][1]["Range"] == "bytes=1000-"
+
+
+def test_download_partial_symlink(repo, tmpdir):
+    """Test a symlink planted as the partial file is neither resumed nor written through."""
+    tmpdir.join("victim").write_binary(CONTENT[:1000])
+    tmpdir.join("plugin.zip.part").mksymlinkto(tmpdir.join("victim"))
+    assert download(repo, tmpdir) == CONTENT
+    assert "Range" not in repo.requests[0][1]
+    assert tmpdir.join("victim").read_binary() == CONTENT[:1000]
+
+
+def test_download_resume_dropped_connection(repo, tmpdir):
+    """Test a dropped connection is resumed where it stopped."""
+    repo.drop_after = 100 * 1024
+    assert download(repo, tmpdir) == CONTENT
+    assert len(repo.requests) == 2
+    offset = int(repo.requests[1][1]["Range"][len("bytes="):-1])
+    assert 0 < offset <= 100 * 1024
+
+
+def test_download_range_not_supported(repo, tmpdir):
+    """Test the download starts over when the server ignores the Range header."""
+    repo.ranges = False
+    tmpdir.join("plugin.zip.part").write_binary(b"garbage")
+    assert download(repo, tmpdir) == CONTENT
+
+
+def test_download_stale_partial_file(repo, tmpdir):
+    """Test a partial file that does not match the checksum is discarded and downloaded again."""
+    tmpdir.join("plugin.zip.part").write_binary(b"x" * 1000)
+    assert download(repo, tmpdir) == CONTENT
+    assert "Range" not in repo.requests[-1][1]
+
+
+def test_download_checksum_mismatch(repo, tmpdir):
+    """Test a download that does not match the published checksum is rejected."""
+    with pytest.raises(exceptions.PluginChecksumMismatch):
+        download(repo, tmpdir, sha256sum="0" * 64)
+    assert tmpdir.listdir() == []
+
+
+def test_published_checksum(repo):
+    """Test the checksum is read from the .sha256 file, if published."""
+    url = repo.url + "/services/plugin.zip"
+    assert plugin_utils.get_published_checksum(requests.Session(), url) is None
+    repo.files["/services/plugin.zip.sha256"] = "{}  plugin.zip\n".format(SHA256.upper()).encode()
+    assert plugin_utils.get_published_checksum(requests.Session(), url) == SHA256
+
+
+def test_install_plugins(tmpdir):
+    """Test plugins are installed in parallel and failures are isolated."""
+    names = ["plugin{}".format(index) for index in range(4)] + ["broken"]
+    for name in names[:4]:
+        tmpdir.join("src", name, "config.json").write(json.dumps({"name": name}), ensure=True)
+    tmpdir.join("src", "broken").ensure(dir=True)
+    installed = []
+
+    start = time.time()
+    errors = plugin_utils.install_plugins([str(tmpdir.join("src", name)) for name in names], "service",
+                                          str(tmpdir.join("services")), partial(register_plugin, delay=0.3), jobs=5,
+                                          post_install=installed.append)
+    assert time.time() - start < 1
+
+    assert [(os.path.basename(pkgpath), type(exc)) for pkgpath, exc in errors] == [
+        ("broken", exceptions.ConfigFileNotFound)]
+    assert sorted(os.path.basename(_) for _ in installed) == names[:4]
+    assert sorted(tmpdir.join("services").listdir()) == [tmpdir.join("services", name) for name in names[:4]]
+
+
+def test_install_deps_quiet_failure(tmpdir, caplog):
+    """Test the pip output of a failed quiet dependency install is logged."""
+    tmpdir.join("plugin", plugin_utils.REQUIREMENTS_FILE).write("honeycomb-no-such-package\n", ensure=True)
+    with pytest.raises(subprocess.CalledProcessError):
+        plugin_utils.install_deps(str(tmpdir.join("plugin")), quiet=True,
+                                  cache=PluginCache(str(tmpdir.join("cache")), offline=True))
+    assert [_ for _ in caplog.records if _.levelname == "ERROR" and "honeycomb-no-such-package" in _.getMessage()]
+
+
+def make_tree(root, nfiles):
+    """Create a plugin like folder tree."""
+    for index in range(nfiles):
+        content = "# {}\n".format(index) * index
+        root.join("pkg{}".format(index % 5), "mod{}.py".format(index)).write(content, ensure=True)
+    root.join("run.sh").write("#!/bin/sh\n")
+    root.join("run.sh").chmod(0o755)
+
+
+@pytest.mark.parametrize("nfiles", [3, plugin_utils.PARALLEL_COPY_MIN_FILES * 2])
+def test_copy_tree(tmpdir, nfiles):
+    """Test copying a tree serially and with the thread pool."""
+    make_tree(tmpdir.join("src"), nfiles)
+    plugin_utils.copy_tree(str(tmpdir.join("src")), str(tmpdir.join("dst")))
+
+    for src in tmpdir.join("src").visit():
+        dst = tmpdir.join("dst", src.relto(tmpdir.join("src")))
+        assert src.isdir() == dst.isdir()
+        if src.isfile():
+            assert src.read_binary() == dst.read_binary()
+            assert src.stat().mode == dst.stat().mode
+            assert src.stat().ino != dst.stat().ino
+
+
+def test_copy_file_fallback(tmpdir, monkeypatch):
+    """Test copy methods the OS does not support are skipped."""
+    def unsupported(fin, fout, size):
+        raise OSError(errno.ENOSYS, "not implemented")
+
+    monkeypatch.setattr(plugin_utils, "_copy_methods", [unsupported])
+    monkeypatch.setattr(plugin_utils, "_unsupported_methods", set())
+    tmpdir.join("src").write_binary(CONTENT)
+    plugin_utils.copy_file(str(tmpdir.join("src")), str(tmpdir.join("dst")))
+    assert tmpdir.join("dst").read_binary() == CONTENT
+    assert plugin_utils._unsupported_methods == {(unsupported, tmpdir.join("src").stat().dev)}
+
+
+def test_copy_tree_link(tmpdir):
+    """Test files of a temporary tree are hardlinked."""
+    make_tree(tmpdir.join("src"), 3)
+    plugin_utils.copy_tree(str(tmpdir.join("src")), str(tmpdir.join("dst")), link=True)
+    assert tmpdir.join("src", "run.sh").stat().ino == tmpdir.join("dst", "run.sh").stat().ino
+
+
+def test_install_plugins_bytecode(tmpdir, monkeypatch):
+    """Test plugins installed in parallel are compiled once the install threads are gone."""
+    compiled = []
+    monkeypatch.setattr(plugin_utils, "compile_plugin",
+                        lambda plugin_path, **kwargs: compiled.append((plugin_path, threading.active_count())))
+    for name in ("one", "two"):
+        tmpdir.join("src", name, "config.json").write(json.dumps({"name": name}), ensure=True)
+    assert not plugin_utils.install_plugins([str(tmpdir.join("src", _)) for _ in ("one", "two")], "service",
+                                            str(tmpdir.join("services")), register_plugin, jobs=2,
+                                            bytecode=plugin_utils.BYTECODE_UNCHECKED_HASH)
+    assert sorted(compiled) == [(str(tmpdir.join("services", _)), 1) for _ in ("one", "two")]
+
+
+def test_install_editable(tmpdir):
+    """Test editable installs link the plugin folder and uninstall keeps it."""
+    tmpdir.join("src", "plugin", "config.json").write("{}", ensure=True)
+    home = tmpdir.join("home")
+    plugin_path = plugin_utils.install_plugin(str(tmpdir.join("src", "plugin")), "service", str(home.join("services")),
+                                              register_plugin, editable=True)
+    assert os.path.islink(plugin_path)
+    assert tmpdir.join("src", "plugin").samefile(plugin_path)
+
+    plugin_utils.uninstall_plugin(plugin_utils.get_plugin_path(str(home), "services", "plugin"), True)
+    assert not os.path.lexists(plugin_path)
+    assert tmpdir.join("src", "plugin", "config.json").exists()
+
+
+def test_install_from_zip(tmpdir):
+    """Test zips are extracted once into a staging folder and renamed into place."""
+    def register(path):
+        assert os.listdir(path) == [defs.CONFIG_FILE_NAME]  # validated before the rest is extracted
+        return register_plugin(path)
+
+    make_zip(files={"pkg/mod.py": "# mod\n"}, path=str(tmpdir.join("plugin.zip")))
+    services = tmpdir.join("services")
+    services.join(defs.STAGING_PREFIX + "999999999-x").ensure(dir=True)  # left by an interrupted install
+    umask = os.umask(0o022)
+    try:
+        _, plugin_path = plugin_utils.install_from_zip(str(tmpdir.join("plugin.zip")), str(services), register)
+    finally:
+        os.umask(umask)
+    assert plugin_path == str(services.join("plugin"))
+    assert services.join("plugin", "pkg", "mod.py").read() == "# mod\n"
+    assert services.listdir() == [services.join("plugin")]
+    assert services.join("plugin").stat().mode & 0o777 == 0o755
+
+    with pytest.raises(exceptions.PluginAlreadyInstalled):
+        plugin_utils.install_from_zip(str(tmpdir.join("plugin.zip")), str(services), register)
+    assert services.listdir() == [services.join("plugin")]
+
+
+def test_install_from_zip_invalid(tmpdir):
+    """Test nothing is left behind when a zip fails validation."""
+    make_zip(None, {"pkg/mod.py": "# mod\n"}, str(tmpdir.join("plugin.zip")))
+    with pytest.raises(exceptions.ConfigFileNotFound):
+        plugin_utils.install_from_zip(str(tmpdir.join("plugin.zip")), str(tmpdir.join("services")), register_plugin)
+    assert tmpdir.join("services").listdir() == []
+
+
+def test_compile_plugin(tmpdir):
+    """Test plugin and dependency modules are compiled to unchecked hash pycs."""
+    tmpdir.join("plugin", "plugin_service.py").write("import dep\n", ensure=True)
+    tmpdir.join("plugin", "venv", "dep", "__init__.py").write("VALUE = 1\n", ensure=True)
+    tmpdir.join("plugin", "py2only.py").write("print 'hello'\n")
+    assert not plugin_utils.compile_plugin(str(tmpdir.join("plugin")), unchecked_hash=True)
+
+    pycs = [_ for _ in tmpdir.join("plugin").visit("*.pyc")]
+    assert sorted(_.purebasename.split(".")[0] for _ in pycs) == ["__init__", "plugin_service"]
+    if sys.version_info >= (3, 7):
+        assert all(_.read_binary()[4:8] == b"\x01\x00\x00\x00" for _ in pycs)  # hash based, unchecked
+
+
+def test_zip_deps(tmpdir, monkeypatch):
+    """Test pure python dependencies are packed with their bytecode and imported from the zip."""
+    deps = tmpdir.join("plugin", "venv")
+    deps.join("zipdep", "__init__.py").write("from zipdep.sub import VALUE\n", ensure=True)
+    deps.join("zipdep", "sub.py").write("VALUE = 42\n")
+    deps.join("zipdep", "data.txt").write("data")
+    assert plugin_utils.zip_deps(str(tmpdir.join("plugin")))
+    assert not deps.exists()
+
+    with zipfile.ZipFile(str(tmpdir.join("plugin", "venv.zip"))) as depszip:
+        assert sorted(depszip.namelist()) == ["zipdep/__init__.py", "zipdep/__init__.pyc", "zipdep/data.txt",
+                                              "zipdep/sub.py", "zipdep/sub.pyc"]
+    monkeypatch.syspath_prepend(str(tmpdir.join("plugin", "venv.zip")))
+    monkeypatch.delitem(sys.modules, "zipdep", raising=False)
+    import zipdep
+    assert zipdep.VALUE == 42
+    assert zipdep.__file__.startswith(str(tmpdir.join("plugin", "venv.zip")))
+    del sys.modules["zipdep"], sys.modules["zipdep.sub"]
+
+
+def test_zip_deps_extension_modules(tmpdir):
+    """Test dependencies with extension modules are left unpacked."""
+    tmpdir.join("plugin", "venv", "dep", "_speedups.so").write_binary(b"\x7fELF", ensure=True)
+    assert not plugin_utils.zip_deps(str(tmpdir.join("plugin")))
+    assert tmpdir.join("plugin", "venv", "dep", "_speedups.so").exists()
+    assert not tmpdir.join("plugin", "venv.zip").exists()
+
+
+@pytest.fixture
+def installed(tmpdir, monkeypatch):
+    """Install a plugin with a dependency, return its path."""
+    src = tmpdir.join("src")
+    src.join("config.json").write("{}", ensure=True)
+    src.join("plugin_service.py").write("VERSION = 1\n")
+    src.join("pkg", "util.py").write("# util\n", ensure=True)
+    src.join("requirements.txt").write("dep\n")
+    plugin = tmpdir.join("services", "plugin")
+    with monkeypatch.context() as m:
+        m.setattr(plugin_utils, "install_deps", lambda *args: plugin.join("venv", "dep.py").write("", ensure=True) or 0)
+        plugin_path = plugin_utils.install_plugin(str(src), "service", str(tmpdir.join("services")), register_plugin)
+    return plugin, plugin_path
+
+
+def test_upgrade_plugin(tmpdir, installed, monkeypatch):
+    """Test only changed files are copied and dependencies are kept when requirements did not change."""
+    plugin, plugin_path = installed
+    plugin.join("logs", "stdout.log").write("running\n", ensure=True)
+    inodes = {name: plugin.join(*name.split("/")).stat().ino for name in ("pkg/util.py", "venv/dep.py",
+                                                                          "logs/stdout.log")}
+    monkeypatch.setattr(plugin_utils, "install_deps", lambda *args: pytest.fail("dependencies reinstalled"))
+    make_zip(files={"plugin_service.py": "VERSION = 2\n", "pkg/util.py": "# util\n", "requirements.txt": "dep\n"},
+             path=str(tmpdir.join("plugin.zip")))
+
+    assert plugin_utils.upgrade_plugin(str(tmpdir.join("plugin.zip")), "service", str(tmpdir.join("services")),
+                                       register_plugin) == plugin_path
+    assert plugin.join("plugin_service.py").read() == "VERSION = 2\n"
+    assert {name: plugin.join(*name.split("/")).stat().ino for name in inodes} == inodes
+    assert sorted(plugin_utils.read_manifest(plugin_path)) == ["config.json", "pkg/util.py", "plugin_service.py",
+                                                               "requirements.txt"]
+    assert tmpdir.join("services").listdir() == [plugin]
+
+
+def test_upgrade_plugin_requirements_changed(tmpdir, installed, monkeypatch):
+    """Test dependencies are reinstalled when requirements.txt changed."""
+    plugin, plugin_path = installed
+    calls = []
+    monkeypatch.setattr(plugin_utils, "install_deps", lambda pkgpath, *args: calls.append(pkgpath) or 0)
+    tmpdir.join("src", "requirements.txt").write("dep>=2\n")
+
+    plugin_utils.upgrade_plugin(str(tmpdir.join("src")), "service", str(tmpdir.join("services")), register_plugin)
+    assert len(calls) == 1
+    assert not plugin.join("venv").exists()
+    assert plugin.join("requirements.txt").read() == "dep>=2\n"
+
+
+def test_upgrade_plugin_not_installed(tmpdir):
+    """Test upgrading a plugin that is not installed fails and leaves nothing behind."""
+    tmpdir.join("src", "config.json").write("{}", ensure=True)
+    tmpdir.join("services").ensure(dir=True)
+    with pytest.raises(exceptions.PluginNotInstalled):
+        plugin_utils.upgrade_plugin(str(tmpdir.join("src")), "service", str(tmpdir.join("services")), register_plugin)
+    assert tmpdir.join("services").listdir() == []
@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+"""Honeycomb plugin repository tests."""
+
+from __future__ import absolute_import, unicode_literals
+
+import json
+
+import pytest
+
+from honeycomb import defs
+from honeycomb.utils import repo, plugin_utils
+
+from tests.utils.plugins import register_plugin
+
+
+@pytest.fixture
+def upstream(request, monkeypatch):
+    """Run a repository without a catalog."""
+    server = request.getfixturevalue("repo")
+    server.files["/services/services.txt"] = b"plugin\n"
+    monkeypatch.setattr(defs, "GITHUB_RAW", "http://127.0.0.1:1")  # nothing should go to the default repository
+    return server
+
+
+def test_repo_url(tmpdir):
+    """Test local paths become file URLs."""
+    assert repo.get_repo_url("http://mirror/plugins/") == "http://mirror/plugins"
+    assert repo.get_local_path(repo.get_repo_url(str(tmpdir))) == str(tmpdir)
+    assert repo.get_local_path("http://mirror/plugins") is None
+
+
+def test_file_adapter(tmpdir):
+    """Test file URLs are served like a web server would."""
+    tmpdir.join("services", "plugin.zip").write_binary(b"0123456789", ensure=True)
+    url = repo.plugin_url(defs.SERVICE, "plugin", str(tmpdir))
+    rsession = repo.get_session()
+
+    r = rsession.get(url)
+    assert (r.status_code, r.content) == (200, b"0123456789")
+    assert rsession.get(url, headers={"If-None-Match": r.headers["ETag"]}).status_code == 304
+    r = rsession.get(url, headers={"Range": "bytes=4-"}, stream=True)
+    assert (r.status_code, r.headers["Content-Range"], r.raw.read()) == (206, "bytes 4-9/10", b"456789")
+    assert rsession.get(url, headers={"Range": "bytes=10-"}).status_code == 416
+    assert rsession.get(repo.plugin_url(defs.SERVICE, "other", str(tmpdir))).status_code == 404
+
+
+def test_mirror(upstream, tmpdir):
+    """Test mirroring downloads changed plugins only and writes a catalog."""
+    mirror = tmpdir.join("mirror")
+    assert repo.mirror(str(mirror), upstream.url) == (["services/plugin"], [], [])
+    assert mirror.join("services", "plugin.zip").read_binary() == upstream.files["/services/plugin.zip"]
+    catalog = json.loads(mirror.join(defs.CATALOG_FILE).read())
+    assert catalog[defs.SERVICES]["plugin"]["size"] == len(upstream.files["/services/plugin.zip"])
+    assert catalog[defs.INTEGRATIONS] == {}
+
+    assert repo.mirror(str(mirror), upstream.url) == ([], ["services/plugin"], [])
+
+    upstream.files["/services/services.txt"] = b"plugin\n../../escaped\n"
+    assert repo.mirror(str(mirror), upstream.url) == ([], ["services/plugin"], ["services/../../escaped"])
+    assert mirror.join("services", "services.txt").read() == "plugin\n"
+    assert not tmpdir.join("escaped.zip").exists()
+
+    upstream.files["/services/services.txt"] = b""
+    assert repo.mirror(str(mirror), upstream.url) == ([], [], [])
+    assert not mirror.join("services", "plugin.zip").exists()
+
+
+def test_install_from_mirror(upstream, tmpdir, capsys):
+    """Test plugins are listed and installed from a local mirror without going online."""
+    repo.mirror(str(tmpdir.join("mirror")), upstream.url)
+    upstream.stop()
+
+    plugin_utils.list_remote_plugins([], defs.SERVICE, repo=str(tmpdir.join("mirror")))
+    assert capsys.readouterr().out.splitlines()[-1] == "plugin"
+
+    plugin_utils.install_plugin("plugin", defs.SERVICE, str(tmpdir.join("services")), register_plugin,
+                                repo=str(tmpdir.join("mirror")))
+    assert tmpdir.join("services", "plugin", defs.CONFIG_FILE_NAME).exists()
+    assert tmpdir.join("mirror", "services", "plugin.zip").exists()
@@ -0,0 +1,214 @@
+# -*- coding: utf-8 -*-
+"""Honeycomb service supervisor tests."""
+
+from __future__ import absolute_import, unicode_literals
+
+import os
+import sys
+import json
+import time
+import socket
+import subprocess
+import multiprocessing
+
+import click
+import pytest
+from click.testing import CliRunner
+
+from honeycomb.cli import cli
+from honeycomb.defs import SERVICE
+from honeycomb.servicemanager import exceptions
+from honeycomb.servicemanager.supervisor import Supervisor, SupervisorClient, get_supervisor, start_services
+from honeycomb.utils.wait import wait_until
+
+from tests.utils.defs import commands, args
+from tests.utils.test_utils import sanity_check
+
+CONFIG = {
+    "version": 1,
+    "service": {"name": "echo", "label": "Echo", "allow_many": False, "conflicts_with": [],
+                "supported_os_families": "All", "ports": [{"protocol": "TCP", "port": 8888}]},
+    "event_types": [{"name": "echo", "label": "Echo", "fields": ["originating_ip"], "policy": "Alert"}],
+    "parameters": [{"type": "integer", "value": "port", "label": "Port", "required": True},
+                   {"type": "boolean", "value": "crash", "label": "Crash", "default": False, "required": False},
+                   {"type": "integer", "value": "delay", "label": "Delay", "default": 0, "required": False}],
+    "log_rules": [{"event_type": "echo", "pattern": "echo"}],
+}
+
+ECHO_SERVICE = """
+import os
+import time
+import socket
+from base_service import ServerCustomService
+
+with open(os.path.join(os.path.dirname(__file__), "imports"), "a") as f:
+    f.write("imported\\n")
+
+
+class EchoService(ServerCustomService):
+    def on_server_start(self):
+        if self.service_args["crash"]:
+            os._exit(3)
+        time.sleep(self.service_args["delay"])
+        self.sock = socket.socket()
+        self.sock.bind(("127.0.0.1", self.service_args["port"]))
+        self.sock.listen(5)
+        self.signal_ready()
+        while True:
+            conn, addr = self.sock.accept()
+            conn.close()
+            self.add_alert_to_queue({"event_type": "echo", "originating_ip": addr[0]})
+
+    def on_server_shutdown(self):
+        self.sock.shutdown(socket.SHUT_RDWR)
+        self.sock.close()
+
+    def test(self):
+        time.sleep(self.service_args["delay"])
+        socket.create_connection(("127.0.0.1", self.service_args["port"])).close()
+        return [rule["event_type"] for rule in self.log_rules]
+
+
+service_class = EchoService
+"""
+
+
+def free_port():
+    """Return a TCP port nothing listens on."""
+    s = socket.socket()
+    s.bind(("127.0.0.1", 0))
+    port = s.getsockname()[1]
+    s.close()
+    return port
+
+
+def install_echo(home, name="echo"):
+    """Install the echo service in home under name."""
+    config = dict(CONFIG, service=dict(CONFIG["service"], name=name))
+    home.join("services", name, "config.json").write(json.dumps(config), ensure=True)
+    home.join("services", name, "{}_service.py".format(name)).write(ECHO_SERVICE)
+
+
+@pytest.fixture
+def honeycombd(tmpdir):
+    """Run honeycombd in the foreground for a home with the echo service installed, yield a client."""
+    home = tmpdir.join("home")
+    install_echo(home)
+
+    p = subprocess.Popen([sys.executable, "-m", "honeycomb", args.IAMROOT, "--home", str(home), "supervisor", "start"])
+    client = SupervisorClient(str(home))
+    assert wait_until(client.ping, total_timeout=10)
+    yield client
+
+    client.call("shutdown")
+    p.wait()
+    assert not os.path.exists(client.socket_path)
+
+
+def test_supervisor_not_running(tmpdir):
+    """Test clients report honeycombd is not running and commands fall back to pidfiles."""
+    assert get_supervisor(str(tmpdir)) is None
+    with pytest.raises(exceptions.SupervisorNotRunning):
+        SupervisorClient(str(tmpdir)).call("ping")
+
+
+def test_supervisor_service(honeycombd):
+    """Test a service started by honeycombd is tested, restarted and stopped without importing it again."""
+    port = free_port()
+    info = start_services(honeycombd, [{"service": "echo", "args": ["port={}".format(port)]}], timeout=10)["echo"]
+    assert info["ready"]
+
+    result = CliRunner().invoke(cli, args=args.COMMON_ARGS + [honeycombd.home, SERVICE, commands.STATUS, "echo"])
+    sanity_check(result)
+    assert "echo - running (pid: {}".format(info["pid"]) in result.output, result.output
+    with pytest.raises(click.ClickException, match="already running"):
+        honeycombd.call("start", service="echo", args=["port={}".format(port)])
+
+    assert honeycombd.call("test", service="echo") == ["echo"]
+    restarted = honeycombd.call("restart", service="echo")
+    assert restarted["running"] and restarted["pid"] != info["pid"]
+
+    metrics = honeycombd.call("metrics")
+    assert metrics["pid"] != restarted["pid"]
+    assert metrics["services"]["echo"]["rss"] > 0
+
+    assert not honeycombd.call("stop", service="echo")["running"]
+    with pytest.raises(click.ClickException, match="echo is not running"):
+        honeycombd.call("stop", service="echo")
+    with open(os.path.join(honeycombd.home, "services", "echo", "imports")) as f:
+        assert f.read() == "imported\n"
+
+
+def test_supervisor_answers_during_test(honeycombd):
+    """Test honeycombd keeps answering while a service test runs, and gives up on clients that send nothing."""
+    start_services(honeycombd, [{"service": "echo", "args": ["port={}".format(free_port()), "delay=1"]}], timeout=10)
+    testing = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    testing.connect(honeycombd.socket_path)
+    testing.sendall(json.dumps({"command": "test", "params": {"service": "echo"}}).encode("utf-8") + b"\n")
+
+    start = time.time()
+    assert honeycombd.call("status")["echo"]["running"]
+    assert time.time() - start < 0.5
+    assert json.loads(testing.makefile("rb").readline().decode("utf-8")) == {"result": ["echo"]}
+    testing.close()
+
+    silent = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    silent.connect(honeycombd.socket_path)
+    assert honeycombd.call("ping")
+    assert not silent.recv(1)
+    silent.close()
+
+
+def test_supervisor_restarts_crashed_service(honeycombd):
+    """Test a service that exits on its own is restarted after a backoff."""
+    honeycombd.call("start", service="echo", args=["port={}".format(free_port()), "crash=true"])
+
+    def restarted():
+        return honeycombd.call("status")["echo"]["restarts"] > 0
+
+    assert wait_until(restarted, total_timeout=10)
+    echo = honeycombd.call("status", services=["echo"])["echo"]
+    assert echo["exitcode"] == 3
+    assert echo["active"]
+
+
+def test_supervisor_forks_services(tmpdir):
+    """Test services are forked, inheriting their plugin package, when the default start method is spawn."""
+    install_echo(tmpdir.join("home"))
+    start_method = multiprocessing.get_start_method(allow_none=True)
+    multiprocessing.set_start_method("spawn", force=True)
+    supervisor = Supervisor(str(tmpdir.join("home")))
+    supervisor.bind()
+    try:
+        status = start_services(supervisor, [{"service": "echo", "args": ["port={}".format(free_port())]}], timeout=10)
+        assert status["echo"]["ready"]
+    finally:
+        supervisor.close()
+        multiprocessing.set_start_method(start_method, force=True)
+    assert tmpdir.join("home", "services", "echo", "imports").read() == "imported\n"
+
+
+def test_start_services_concurrently(tmpdir):
+    """Test services are started at once and waited for until they signal ready or exit."""
+    home = tmpdir.join("home")
+    for name in ["echo", "echo2", "crash"]:
+        install_echo(home, name)
+
+    supervisor = Supervisor(str(home))
+    supervisor.bind()
+    try:
+        start = time.time()
+        status = start_services(supervisor, [
+            {"service": "echo", "args": ["port={}".format(free_port()), "delay=1"]},
+            {"service": "echo2", "args": ["port={}".format(free_port()), "delay=1"]},
+            {"service": "crash", "args": ["port={}".format(free_port()), "crash=true"]},
+        ], timeout=10)
+        assert time.time() - start < 1.8
+        assert status["echo"]["ready"] and status["echo2"]["ready"]
+        assert not status["crash"]["ready"] and not status["crash"]["running"]
+
+        with pytest.raises(click.ClickException):
+            start_services(supervisor, [{"service": "echo", "args": []}])
+    finally:
+        supervisor.close()
+    assert not os.path.exists(supervisor.socket_path)
@@ -0,0 +1,154 @@
+# -*- coding: utf-8 -*-
+"""Honeycomb tailer tests."""
+
+from __future__ import absolute_import, unicode_literals
+
+import io
+import os
+import time
+from datetime import datetime, timedelta
+
+import pytest
+from click.testing import CliRunner
+
+from honeycomb import defs
+from honeycomb.cli import cli
+from honeycomb.servicemanager.defs import LOGS_DIR, STDOUTLOG
+from honeycomb.utils.tailer import (Tailer, MultiTailer, LineBuffer, ReorderBuffer, find_tail_offset,
+                                    parse_timestamp, bisect_log, read_window)
+
+from tests.utils.defs import commands, args
+from tests.utils.test_utils import sanity_check
+
+
+def write_service_log(home, service, lines):
+    """Write a stdout log for service in honeycomb home."""
+    logdir = os.path.join(str(home), defs.SERVICES, service, LOGS_DIR)
+    os.makedirs(logdir)
+    path = os.path.join(logdir, STDOUTLOG)
+    with open(path, "w") as fh:
+        fh.write("\n".join(lines) + "\n")
+    return path
+
+
+@pytest.mark.parametrize("content", [b"", b"\n", b"one", b"one\ntwo\nthree\n", b"one\ntwo\nthree", b"\n\na\n\n"])
+@pytest.mark.parametrize("nlines", [0, 1, 2, 5])
+@pytest.mark.parametrize("block_size", [1, 3, 64])
+def test_find_tail_offset(content, nlines, block_size):
+    """Test the block based reverse reader against splitting the whole file."""
+    fh = io.BytesIO(content)
+    fh.seek(find_tail_offset(fh, nlines, block_size=block_size))
+    lines = content.splitlines(True)
+    expected = lines[-nlines:] if nlines else []
+    assert fh.readlines() == expected
+
+
+def test_tailer_last_lines(tmpdir):
+    """Test the tailer prints the last lines of a file."""
+    logfile = tmpdir.join("stdout.log")
+    logfile.write("\n".join("line {}".format(i) for i in range(1000)) + "\n")
+    outfile = io.StringIO()
+    Tailer(name="test", filepath=str(logfile), nlines=3, outfile=outfile, show_name=False)
+    assert outfile.getvalue().splitlines() == ["line 997", "line 998", "line 999"]
+
+
+@pytest.mark.parametrize("line, expected", [
+    ("INFO     [2019-02-16 12:00:01,250 simple_http] started", datetime(2019, 2, 16, 12, 0, 1, 250000)),
+    ("2019-02-16T12:00:01.5 started", datetime(2019, 2, 16, 12, 0, 1, 500000)),
+    ('127.0.0.1 - - [16/Feb/2019:12:00:01 +0000] "GET / HTTP/1.1" 200 -', datetime(2019, 2, 16, 12, 0, 1)),
+    ("Traceback (most recent call last):", None),
+])
+def test_parse_timestamp(line, expected):
+    """Test log line timestamp parsing."""
+    assert parse_timestamp(line) == expected
+
+
+def test_line_buffer():
+    """Test lines split across chunks (and inside a multi-byte character) are reassembled."""
+    data = "first\nsecond ☃\nthird\npartial".encode("utf-8")
+    buf = LineBuffer()
+    lines = []
+    for i in range(0, len(data), 4):
+        lines.extend(buf.feed(data[i:i + 4]))
+    assert lines == ["first", "second ☃", "third"]
+    assert buf.flush() == ["partial"]
+
+
+def test_reorder_buffer():
+    """Test the reorder buffer releases held lines in timestamp order."""
+    reorder = ReorderBuffer(window=1)
+    reorder.push(2, "late arrival, newer", now=0)
+    reorder.push(1, "late arrival, older", now=0.5)
+    assert reorder.pop_ready(now=0.9) == []
+    assert reorder.pop_ready(now=1.6) == ["late arrival, older", "late arrival, newer"]
+    assert not len(reorder)
+
+
+def test_multitailer_backlog_merged(tmpdir):
+    """Test lines from several files are merged by timestamp, untimestamped lines stick to their predecessor."""
+    first = write_service_log(tmpdir, "first", ["2019-02-16 12:00:01 a1", "2019-02-16 12:00:03 a3", "traceback a3"])
+    second = write_service_log(tmpdir, "second", ["2019-02-16 12:00:02 b2", "2019-02-16 12:00:04 b4"])
+    outfile = io.StringIO()
+    MultiTailer(filepaths={"first": first, "second": second}, outfile=outfile, show_name=False).run()
+    assert [_.split()[-1] for _ in outfile.getvalue().splitlines()] == ["a1", "b2", "a3", "a3", "b4"]
+
+
+def test_service_logs(tmpdir):
+    """Test the service logs command prints the last lines of multiple services."""
+    home = str(tmpdir)
+    write_service_log(home, "first", ["2019-02-16 12:00:0{} first {}".format(i, i) for i in range(1, 6, 2)])
+    write_service_log(home, "second", ["2019-02-16 12:00:0{} second {}".format(i, i) for i in range(2, 7, 2)])
+    result = CliRunner().invoke(cli, args=args.COMMON_ARGS + [home, defs.SERVICE, commands.LOGS,
+                                                              args.NUM, "2", "first", "second"])
+    sanity_check(result, home)
+    assert [_.split()[-1] for _ in result.output.splitlines()[-4:]] == ["3", "4", "5", "6"], result.output
+
+    result = CliRunner().invoke(cli, args=args.COMMON_ARGS + [home, defs.SERVICE, commands.LOGS, "--since",
+                                                              "2019-02-16 12:00:02", "--until", "2019-02-16 12:00:04",
+                                                              "first", "second"])
+    sanity_check(result, home)
+    assert [_.split()[-1] for _ in result.output.splitlines()[-3:]] == ["2", "3", "4"], result.output
+
+
+def stamped(second, text):
+    """Return a log line logged at second past 2019-02-16 12:00."""
+    return "{} {}".format(datetime(2019, 2, 16, 12) + timedelta(seconds=second), text)
+
+
+@pytest.mark.parametrize("after", [False, True])
+def test_bisect_log(after):
+    """Test binary search finds the same line as a linear scan, skipping lines without a timestamp."""
+    lines = []
+    for second in range(0, 200, 2):
+        lines.append(stamped(second, "x" * (second % 7)))
+        if second % 10 == 0:
+            lines.append("  continuation")
+    content = ("\n".join(lines) + "\n").encode("utf-8")
+    fh = io.BytesIO(content)
+
+    for second in range(-1, 202):
+        target = datetime(2019, 2, 16, 12) + timedelta(seconds=second)
+        offset = 0
+        for line in content.splitlines(True):
+            timestamp = parse_timestamp(line.decode("utf-8"))
+            if timestamp and (timestamp > target if after else timestamp >= target):
+                break
+            offset += len(line)
+        assert bisect_log(fh, target, after=after) == offset, second
+
+
+def test_read_window_rotated(tmpdir):
+    """Test since/until windows span rotated segments."""
+    logfile = tmpdir.join("stdout.log")
+    tmpdir.join("stdout.log.2").write("\n".join(stamped(i, i) for i in range(0, 10)) + "\n")
+    tmpdir.join("stdout.log.1").write("\n".join(stamped(i, i) for i in range(10, 20)) + "\n")
+    tmpdir.join("stdout.log.2.gz").write("not a log")
+    logfile.write("\n".join(stamped(i, i) for i in range(20, 30)) + "\n")
+    now = time.time()
+    for age, name in enumerate(["stdout.log", "stdout.log.1", "stdout.log.2"]):
+        os.utime(str(tmpdir.join(name)), (now - age * 10, now - age * 10))
+
+    since = datetime(2019, 2, 16, 12, 0, 8)
+    until = datetime(2019, 2, 16, 12, 0, 21)
+    assert [int(_.split()[-1]) for _ in read_window(str(logfile), since, until)] == list(range(8, 22))
+    assert len(list(read_window(str(logfile)))) == 30
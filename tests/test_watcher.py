@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+"""Honeycomb file watcher tests."""
+
+from __future__ import absolute_import, unicode_literals
+
+import os
+import threading
+
+import pytest
+
+from honeycomb.utils.watcher import FileWatcher, FileFollower
+
+
+@pytest.fixture(params=[True, False], ids=["inotify", "poll"])
+def watcher(request):
+    """Provide a file watcher for each backend."""
+    watcher = FileWatcher(interval=0.05, use_inotify=request.param)
+    yield watcher
+    watcher.stop()
+
+
+def read_until(follower, expected, timeout=5):
+    """Read from follower until expected bytes were received."""
+    data = b""
+    for _ in range(int(timeout / 0.1)):
+        data += follower.read()
+        if len(data) >= len(expected):
+            break
+        follower.wait(0.1)
+    return data
+
+
+def test_watcher_wakes_on_write(watcher, tmpdir):
+    """Test a write wakes up the reader and idle waits time out."""
+    logfile = tmpdir.join("stdout.log")
+    logfile.write("")
+    watch = watcher.watch(str(logfile))
+    watch.wait(0.2)
+
+    assert not watch.wait(0.2)
+    logfile.write("new line\n", mode="a")
+    assert watch.wait(2)
+
+
+def test_watcher_shared_event(watcher, tmpdir):
+    """Test one event serves many files."""
+    event = threading.Event()
+    files = [tmpdir.join("{}.log".format(i)) for i in range(3)]
+    for f in files:
+        f.write("")
+        watcher.watch(str(f), event)
+
+    event.clear()
+    files[2].write("data\n", mode="a")
+    assert event.wait(2)
+
+
+def test_follower_rotation_and_truncation(watcher, tmpdir):
+    """Test the follower reopens rotated files and rewinds truncated files."""
+    logfile = tmpdir.join("stdout.log")
+    logfile.write("old\n")
+    follower = FileFollower(str(logfile), watcher=watcher)
+    try:
+        logfile.write("one\n", mode="a")
+        assert read_until(follower, b"one\n") == b"one\n"
+
+        os.rename(str(logfile), str(tmpdir.join("stdout.log.1")))
+        logfile.write("two\n")
+        assert read_until(follower, b"two\n") == b"two\n"
+
+        logfile.write("3\n")
+        assert read_until(follower, b"3\n") == b"3\n"
+    finally:
+        follower.close()
@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+"""Local fake Docker client, lets DockerService be tested without a Docker daemon."""
+
+from __future__ import absolute_import, unicode_literals
+
+import itertools
+
+import docker.errors
+
+
+class FakeContainer(object):
+    """Fake docker container."""
+
+    _ids = itertools.count()
+
+    def __init__(self, client, image, name=None, labels=None, log_chunks=None, **kwargs):
+        """Create a created (not running) container."""
+        self.client = client
+        self.id = "fake{:08x}".format(next(self._ids))
+        self.image = image
+        self.name = name or self.id
+        self.labels = labels or {}
+        self.kwargs = kwargs
+        self.status = "created"
+        self.removed = False
+        self.log_chunks = list(log_chunks or [])
+        self.logs_kwargs = None
+
+    def logs(self, stream=False, **kwargs):
+        """Return the configured log chunks, as a generator when streaming."""
+        self.logs_kwargs = kwargs
+        if stream:
+            return iter(self.log_chunks)
+        return b"".join(self.log_chunks)
+
+    def start(self):
+        """Start container."""
+        self.status = "running"
+
+    def stop(self, **kwargs):
+        """Stop container."""
+        self.status = "exited"
+
+    def reload(self):
+        """Refresh container state (noop)."""
+
+    def remove(self, v=False, force=False):
+        """Remove container."""
+        if self.status == "running" and not force:
+            raise docker.errors.APIError("container is running")
+        self.removed = True
+        self.client.containers.all.remove(self)
+
+
+class FakeContainers(object):
+    """Fake ``client.containers`` collection."""
+
+    def __init__(self, client):
+        """Create an empty collection."""
+        self.client = client
+        self.all = []
+        self.log_chunks = []
+        """Log chunks given to every new container."""
+
+    def create(self, image, name=None, labels=None, **kwargs):
+        """Create a container."""
+        self.client.images.get(image)
+        container = FakeContainer(self.client, image, name=name, labels=labels, log_chunks=self.log_chunks,
+                                  **kwargs)
+        self.all.append(container)
+        return container
+
+    def run(self, image, detach=False, **kwargs):
+        """Create and start a container, pulling the image if needed."""
+        try:
+            container = self.create(image, **kwargs)
+        except docker.errors.ImageNotFound:
+            self.client.images.pull(image)
+            container = self.create(image, **kwargs)
+        container.start()
+        return container
+
+    def get(self, container_id):
+        """Get container by id or name."""
+        for container in self.all:
+            if container_id in (container.id, container.name):
+                return container
+        raise docker.errors.NotFound(container_id)
+
+    def list(self, all=False, filters=None):
+        """List containers, supports the ``label`` filter."""
+        containers = [_ for _ in self.all if all or _.status == "running"]
+        labels = (filters or {}).get("label", [])
+        for label in [labels] if not isinstance(labels, list) else labels:
+            key, _, value = label.partition("=")
+            containers = [_ for _ in containers if key in _.labels and (not value or _.labels[key] == value)]
+        return containers
+
+
+def _image_name(name):
+    """Add the implicit latest tag to an image name."""
+    return name if ":" in name.rsplit("/", 1)[-1] else name + ":latest"
+
+
+class FakeImages(object):
+    """Fake ``client.images`` collection."""
+
+    def __init__(self):
+        """Create an empty image store."""
+        self.local = set()
+        self.pulls = []
+
+    def get(self, name):
+        """Get a local image."""
+        if _image_name(name) not in self.local:
+            raise docker.errors.ImageNotFound(name)
+        return name
+
+    def pull(self, repository, tag=None):
+        """Pull an image."""
+        name = _image_name("{}:{}".format(repository, tag) if tag else repository)
+        self.pulls.append(name)
+        self.local.add(name)
+        return name
+
+
+class FakeDockerClient(object):
+    """Fake ``docker.DockerClient``."""
+
+    def __init__(self):
+        """Create a client with no containers or images."""
+        self.images = FakeImages()
+        self.containers = FakeContainers(self)
@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+"""Local HTTP server standing in for the online plugin repository."""
+
+from __future__ import absolute_import, unicode_literals
+
+import re
+import hashlib
+import threading
+
+from six.moves import BaseHTTPServer, socketserver
+
+RANGE_RE = re.compile(r"bytes=(\d+)-$")
+
+
+class RepoRequestHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+    """Serve :attr:`RepoServer.files`, supporting ETags and single open ended Range requests."""
+
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        """Keep test output quiet."""
+
+    def do_GET(self):
+        """Serve a file."""
+        server = self.server
+        server.requests.append((self.path, dict(self.headers)))
+        content = server.files.get(self.path.split("?")[0])
+        if content is None:
+            self.send_response(404)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        etag = '"{}"'.format(hashlib.sha1(content).hexdigest())
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        offset = 0
+        match = RANGE_RE.match(self.headers.get("Range", ""))
+        if match and server.ranges:
+            offset = int(match.group(1))
+            if offset >= len(content):
+                self.send_response(416)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            self.send_response(206)
+            self.send_header("Content-Range", "bytes {}-{}/{}".format(offset, len(content) - 1, len(content)))
+        else:
+            self.send_response(200)
+        self.send_header("ETag", etag)
+        self.send_header("Content-Length", str(len(content) - offset))
+        self.end_headers()
+
+        body = content[offset:]
+        if server.drop_after is not None:
+            # simulate a dropped connection once
+            body, server.drop_after = body[:server.drop_after], None
+            self.wfile.write(body)
+            self.close_connection = True
+            return
+        self.wfile.write(body)
+
+
+class RepoServer(socketserver.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+    """Threaded HTTP server with a dictionary of files."""
+
+    daemon_threads = True
+
+    def __init__(self):
+        """Listen on a random local port."""
+        BaseHTTPServer.HTTPServer.__init__(self, ("127.0.0.1", 0), RepoRequestHandler)
+        self.files = {}
+        """Dictionary of url path to content."""
+        self.requests = []
+        """List of (path, headers) tuples of the requests served."""
+        self.ranges = True
+        """Honor Range requests."""
+        self.drop_after = None
+        """Close the connection after sending this many bytes of the next response."""
+
+    @property
+    def url(self):
+        """Return the base url of the server."""
+        return "http://{}:{}".format(*self.server_address)
+
+    def start(self):
+        """Serve from a background thread."""
+        thread = threading.Thread(target=self.serve_forever, kwargs={"poll_interval": 0.05})
+        thread.daemon = True
+        thread.start()
+        return self
+
+    def stop(self):
+        """Stop serving."""
+        self.shutdown()
+        self.server_close()
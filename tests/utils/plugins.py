@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+"""Plugin stand-ins for plugin install tests."""
+
+from __future__ import absolute_import, unicode_literals
+
+import io
+import os
+import json
+import time
+import zipfile
+from collections import namedtuple
+
+from honeycomb import defs, exceptions
+
+Plugin = namedtuple("Plugin", ["name"])
+"""Registered plugin stand-in."""
+
+
+def register_plugin(path, delay=0):
+    """Register a plugin folder, a stand-in for register_service and register_integration.
+
+    The plugin is named after the ``name`` in its config.json, ``plugin`` if it has none.
+
+    :param delay: Seconds registering takes
+    """
+    time.sleep(delay)
+    config = os.path.join(path, defs.CONFIG_FILE_NAME)
+    if not os.path.exists(config):
+        raise exceptions.ConfigFileNotFound(path)
+    with open(config) as f:
+        return Plugin(json.load(f).get("name", "plugin"))
+
+
+def make_zip(config="{}", files=None, path=None):
+    """Return a plugin zip as bytes, or write it to path.
+
+    :param config: Content of config.json, None for a zip without it
+    :param files: Dictionary of other files in the zip and their content
+    """
+    data = io.BytesIO()
+    with zipfile.ZipFile(path or data, "w") as pkgzip:
+        if config is not None:
+            pkgzip.writestr(defs.CONFIG_FILE_NAME, config)
+        for name, content in (files or {}).items():
+            pkgzip.writestr(name, content)
+    return data.getvalue()